@@ -4,10 +4,8 @@ matplotlib implementation of the gki kernel class
 
 
 
-import math
 import numpy
 import tkinter
-import matplotlib
 # (done in mca file) matplotlib.use('TkAgg') # set backend
 from matplotlib.lines import Line2D
 from matplotlib.figure import Figure
@@ -15,46 +13,20 @@ from matplotlib.patches import Rectangle
 
 from . import gki
 from . import gkitkbase
-from . import textattrib
 from . import gkigcur
 from . import MplCanvasAdapter as mca
 from .wutil import moveCursorTo
+from . import GkiMplFile
+# conversion tables are shared with the headless (file) kernel
+from .GkiMplFile import (MPL_MAJ_MIN, GKI_TO_MPL_LINEWIDTH,  # noqa: F401
+                         GKI_TO_MPL_LINESTYLE, GKI_TO_MPL_HALIGN,
+                         GKI_TO_MPL_VALIGN, GKI_TEXT_Y_OFFSET,
+                         GKI_TO_MPL_MARKTYPE, GKI_TO_MPL_FONTATTR)
 try:
     import readline
 except ImportError:
     readline = None
 
-# MPL version
-MPL_MAJ_MIN = matplotlib.__version__.split('.')  # tmp var
-MPL_MAJ_MIN = float(MPL_MAJ_MIN[0] + '.' + MPL_MAJ_MIN[1])
-
-# MPL linewidths seem to be thicker by default
-GKI_TO_MPL_LINEWIDTH = 0.65
-
-# GKI seems to use: 0: clear, 1: solid, 2: dash, 3: dot, 4: dot-dash, 5: ?
-GKI_TO_MPL_LINESTYLE = ['None', '-', '--', ':', '-.', 'steps']
-
-# Convert GKI alignment int values to MPL (idx 0 = default), 0 is invalid
-GKI_TO_MPL_HALIGN = ['left', 'center', 'left', 'right', 0, 0, 0, 0]
-GKI_TO_MPL_VALIGN = ['bottom', 'center', 0, 0, 0, 0, 'top', 'bottom']
-# "surface dev$pix" uses idx=5, though that's not allowed
-GKI_TO_MPL_VALIGN[4] = 'top'
-GKI_TO_MPL_VALIGN[5] = 'bottom'
-
-# some text is coming out too high by about this much
-GKI_TEXT_Y_OFFSET = 0.005
-
-# marktype seems unused at present (most markers are polylines), but for
-# future use, the GIO document lists:
-#    'Acceptable choices are "point", "box", "plus", "cross", "circle" '
-GKI_TO_MPL_MARKTYPE = ['.', 's', '+', 'x', 'o']
-
-# Convert other GKI font attributes to MPL (cannot do bold italic?)
-GKI_TO_MPL_FONTATTR = [
-    'normal', 1, 2, 3, 4, 5, 6, 7, 'roman', 'greek', 'italic', 'bold', 'low',
-    'medium', 'high'
-]
-
 # -----------------------------------------------
 
 
@@ -105,29 +77,8 @@ class GkiMplKernel(gkitkbase.GkiInteractiveTkBase):
     def getTextPointSize(self, gkiTextScaleFactor, winWidth, winHeight):
         """ Make a decision on the best font size (point) based on the
             size of the graphics window and other factors """
-        # The default point size for the initial window size
-        dfltPtSz = 8.0
-        WIN_SZ_FACTOR = 300.0  # honestly just trying a number that looks good
-
-        # The contribution to the sizing from the window itself, could
-        # be taken from just the height, but that would leave odd font
-        # sizes in the very tall/thin windows.  Another option is to average
-        # the w & h.  We will try taking the minimum.
-        winSzContrib = min(winWidth, winHeight)
-        ptSz = dfltPtSz * (winSzContrib / WIN_SZ_FACTOR)
-
-        # The above gives us a proportionally sized font, but it can be larger
-        # than what we are used to with the standard gkitkplot, so trim down
-        # the large sizes.
-        if (ptSz > dfltPtSz):
-            ptSz = (ptSz + dfltPtSz) / 2.0
-
-        # Now that the best standard size for this window has been
-        # determined, apply the GKI text scale factor used to it (deflt: 1.0)
-        ptSz = ptSz * gkiTextScaleFactor
-
-        # leave as float (not N.float64), it'll get truncated by Text if needed
-        return float(ptSz)
+        return GkiMplFile.getTextPointSize(gkiTextScaleFactor, winWidth,
+                                           winHeight)
 
     def clearMplData(self):
         """ Clear all lines, patches, text, etc. from the figure as well
@@ -442,28 +393,8 @@ class GkiMplKernel(gkitkbase.GkiInteractiveTkBase):
 
     def calculateMplTextAngle(self, charUp, textPath):
         """ From the given GKI charUp and textPath values, calculate the
-        rotation angle to be used for text.  Oddly, it seems that textPath
-        and charUp both serve similar purposes, so we will have to look at
-        them both in order to figure the rotation angle.  One might have
-        assumed that textPath could have meant "L to R" vs. "R to L", but
-        that does not seem to be the case - it seems to be rotation angle. """
-
-        # charUp range
-        if charUp < 0:
-            charUp += 360.
-        charUp = math.fmod(charUp, 360.)
-
-        # get angle from textPath
-        angle = charUp + 270.  # deflt CHARPATH_RIGHT
-        if textPath == textattrib.CHARPATH_UP:
-            angle = charUp
-        elif textPath == textattrib.CHARPATH_LEFT:
-            angle = charUp + 90.
-        elif textPath == textattrib.CHARPATH_DOWN:
-            angle = charUp + 180.
-
-        # return from 0-360
-        return math.fmod(angle, 360.)
+        rotation angle to be used for text. """
+        return GkiMplFile.calculateMplTextAngle(charUp, textPath)
 
     def gki_text(self, arg):
         """ Instructed to draw some GKI text """
@@ -0,0 +1,426 @@
+"""
+matplotlib implementation of a non-interactive (file) gki kernel class
+
+GkiMplFileKernel renders GKI metacode straight into a matplotlib Figure
+and writes each page to a PNG, SVG or PDF file.  It needs no Tk toplevel
+and no display, so it can be used for batch plot production.  It is
+selected by setting stdgraph to one of the devices in gki.mplFileDevices
+(e.g. "set stdgraph=mplpng"), and the output file names are built from
+the gkiplotfile environment variable.  Saved metacode files can also be
+rendered directly with gki.render_files().
+"""
+
+
+import math
+import os
+import numpy
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+from matplotlib.patches import Polygon
+
+from . import gki
+from . import irafgwcs
+from . import textattrib
+
+# MPL version
+MPL_MAJ_MIN = matplotlib.__version__.split('.')  # tmp var
+MPL_MAJ_MIN = float(MPL_MAJ_MIN[0] + '.' + MPL_MAJ_MIN[1])
+
+# MPL linewidths seem to be thicker by default
+GKI_TO_MPL_LINEWIDTH = 0.65
+
+# GKI seems to use: 0: clear, 1: solid, 2: dash, 3: dot, 4: dot-dash, 5: ?
+GKI_TO_MPL_LINESTYLE = ['None', '-', '--', ':', '-.', 'steps']
+
+# Convert GKI alignment int values to MPL (idx 0 = default), 0 is invalid
+GKI_TO_MPL_HALIGN = ['left', 'center', 'left', 'right', 0, 0, 0, 0]
+GKI_TO_MPL_VALIGN = ['bottom', 'center', 0, 0, 0, 0, 'top', 'bottom']
+# "surface dev$pix" uses idx=5, though that's not allowed
+GKI_TO_MPL_VALIGN[4] = 'top'
+GKI_TO_MPL_VALIGN[5] = 'bottom'
+
+# some text is coming out too high by about this much
+GKI_TEXT_Y_OFFSET = 0.005
+
+# marktype seems unused at present (most markers are polylines), but for
+# future use, the GIO document lists:
+#    'Acceptable choices are "point", "box", "plus", "cross", "circle" '
+GKI_TO_MPL_MARKTYPE = ['.', 's', '+', 'x', 'o']
+
+# Convert other GKI font attributes to MPL (cannot do bold italic?)
+GKI_TO_MPL_FONTATTR = [
+    'normal', 1, 2, 3, 4, 5, 6, 7, 'roman', 'greek', 'italic', 'bold', 'low',
+    'medium', 'high'
+]
+
+# Output formats supported by this kernel
+FILE_FORMATS = ('png', 'svg', 'pdf')
+
+
+def calculateMplTextAngle(charUp, textPath):
+    """ From the given GKI charUp and textPath values, calculate the
+    rotation angle to be used for text.  Oddly, it seems that textPath
+    and charUp both serve similar purposes, so we will have to look at
+    them both in order to figure the rotation angle.  One might have
+    assumed that textPath could have meant "L to R" vs. "R to L", but
+    that does not seem to be the case - it seems to be rotation angle. """
+
+    # charUp range
+    if charUp < 0:
+        charUp += 360.
+    charUp = math.fmod(charUp, 360.)
+
+    # get angle from textPath
+    angle = charUp + 270.  # deflt CHARPATH_RIGHT
+    if textPath == textattrib.CHARPATH_UP:
+        angle = charUp
+    elif textPath == textattrib.CHARPATH_LEFT:
+        angle = charUp + 90.
+    elif textPath == textattrib.CHARPATH_DOWN:
+        angle = charUp + 180.
+
+    # return from 0-360
+    return math.fmod(angle, 360.)
+
+
+def getTextPointSize(gkiTextScaleFactor, winWidth, winHeight):
+    """ Make a decision on the best font size (point) based on the
+        size of the graphics window and other factors """
+    # The default point size for the initial window size
+    dfltPtSz = 8.0
+    WIN_SZ_FACTOR = 300.0  # honestly just trying a number that looks good
+
+    # The contribution to the sizing from the window itself, could
+    # be taken from just the height, but that would leave odd font
+    # sizes in the very tall/thin windows.  Another option is to average
+    # the w & h.  We will try taking the minimum.
+    winSzContrib = min(winWidth, winHeight)
+    ptSz = dfltPtSz * (winSzContrib / WIN_SZ_FACTOR)
+
+    # The above gives us a proportionally sized font, but it can be larger
+    # than what we are used to with the standard gkitkplot, so trim down
+    # the large sizes.
+    if (ptSz > dfltPtSz):
+        ptSz = (ptSz + dfltPtSz) / 2.0
+
+    # Now that the best standard size for this window has been
+    # determined, apply the GKI text scale factor used to it (deflt: 1.0)
+    ptSz = ptSz * gkiTextScaleFactor
+
+    # leave as float (not N.float64), it'll get truncated by Text if needed
+    return float(ptSz)
+
+
+def irafColorToMpl(config, irafColorIndex):
+    """Return the specified iraf color as a hex string usable by mpl"""
+    color = config.defaultColors[irafColorIndex]
+    red = int(255 * color[0])
+    green = int(255 * color[1])
+    blue = int(255 * color[2])
+    return f"#{red:02x}{green:02x}{blue:02x}"
+
+
+# -----------------------------------------------
+
+
+class GkiMplFileKernel(gki.GkiKernel):
+    """matplotlib graphics kernel writing each page to an image file
+
+    Pages are written to files named root + NNNN + '.' + fmt, where
+    NNNN is the page number (starting at 1).  A page is written when it
+    is closed (closews), when the kernel is flushed and at the end of a
+    task; a page that gets more graphics afterwards (e.g. an overplot in
+    append mode) is simply rewritten.  The list of files written so far
+    is kept in the outputFiles attribute.
+    """
+
+    def __init__(self, fmt='png', root=None, width=800, height=600, dpi=100):
+
+        fmt = fmt.lower()
+        if fmt not in FILE_FORMATS:
+            raise ValueError(f"Unsupported plot file format `{fmt}' "
+                             f"(must be one of {', '.join(FILE_FORMATS)})")
+        gki.GkiKernel.__init__(self)
+        self.name = 'MplFile'
+        self.fmt = fmt
+        if root is None:
+            root = gki.iraf.osfn(gki.iraf.envget('gkiplotfile', 'pyrafplot'))
+        self.root = root
+        self.width = width
+        self.height = height
+        self.irafGkiConfig = gki._irafGkiConfig
+        self.wcs = irafgwcs.IrafGWcs()
+        self.textAttributes = gki.TextAttributes()
+        self.lineAttributes = gki.LineAttributes()
+        self.fillAttributes = gki.FillAttributes()
+        self.markerAttributes = gki.MarkerAttributes()
+        # the attribute defaults are GKI codes, convert them to mpl values
+        ta = self.textAttributes
+        ta.set(ta.charUp, ta.charSize, ta.charSpace, ta.textPath,
+               GKI_TO_MPL_HALIGN[ta.textHorizontalJust],
+               GKI_TO_MPL_VALIGN[ta.textVerticalJust],
+               GKI_TO_MPL_FONTATTR[ta.textFont],
+               GKI_TO_MPL_FONTATTR[ta.textQuality],
+               self._color(ta.textColor))
+        la = self.lineAttributes
+        la.set(GKI_TO_MPL_LINESTYLE[la.linestyle], la.linewidth,
+               self._color(la.color))
+        self.fillAttributes.set(self.fillAttributes.fillstyle,
+                                self._color(self.fillAttributes.color))
+        self.markerAttributes.set(0, 0,
+                                  self._color(self.markerAttributes.color))
+        self.outputFiles = []
+        self._fig = Figure(figsize=(width / float(dpi), height / float(dpi)),
+                           dpi=dpi)
+        self._fig.set_facecolor(self._color(0))
+        self._pageNumber = 1
+        self._pageBlank = True
+        self._pageDirty = False
+
+    # -----------------------------------------------
+    # page handling
+
+    def getPageFilename(self, page=None):
+        """Return output file name for the given (default current) page"""
+        if page is None:
+            page = self._pageNumber
+        return f"{self.root}{page:04d}.{self.fmt}"
+
+    def isPageBlank(self):
+        """Returns true if the current page is blank"""
+        return self._pageBlank
+
+    def startNewPage(self):
+        """Write out the current page (if needed) and clear the figure"""
+        self.writePage()
+        if not self._pageBlank:
+            self._pageNumber = self._pageNumber + 1
+        self._fig.clear()
+        self._fig.set_facecolor(self._color(0))
+        self.wcs.clearPending()
+        self.wcs = irafgwcs.IrafGWcs()
+        self._pageBlank = True
+        self._pageDirty = False
+
+    def writePage(self):
+        """Write the current page to its file if it changed since the
+        last write"""
+        if self._pageDirty and not self._pageBlank:
+            fname = self.getPageFilename()
+            self._fig.savefig(fname,
+                              format=self.fmt,
+                              facecolor=self._fig.get_facecolor())
+            if fname not in self.outputFiles:
+                self.outputFiles.append(fname)
+        self._pageDirty = False
+
+    def _changed(self):
+        self._pageBlank = False
+        self._pageDirty = True
+
+    def _color(self, irafColorIndex):
+        return irafColorToMpl(self.irafGkiConfig, irafColorIndex)
+
+    # -----------------------------------------------
+    # GkiKernel implementation
+
+    def translate(self, gkiMetacode, redraw=0):
+        gki.gkiTranslate(gkiMetacode, self.functionTable)
+        # the figure holds the page, so translated metacode is not kept
+        if gkiMetacode is self.gkibuffer:
+            self.gkibuffer.reset()
+
+    def flush(self):
+        self.writePage()
+
+    def clear(self):
+        self.gkibuffer.reset()
+        self.startNewPage()
+
+    def taskDone(self, name):
+        self.writePage()
+
+    def control_openws(self, arg):
+        mode = arg[0]
+        if mode == 5:
+            # clear the display
+            self.startNewPage()
+
+    def control_clearws(self, arg):
+        self.startNewPage()
+
+    def control_closews(self, arg):
+        self.writePage()
+
+    def control_setwcs(self, arg):
+        self.wcs.set(arg)
+
+    def control_getwcs(self, arg):
+        if self.returnData:
+            self.returnData = self.returnData + self.wcs.pack()
+        else:
+            self.returnData = self.wcs.pack()
+
+    def gki_clearws(self, arg):
+        self.startNewPage()
+
+    def gki_cancel(self, arg):
+        self.startNewPage()
+
+    def gki_closews(self, arg):
+        self.writePage()
+
+    def gki_setwcs(self, arg):
+        # see GkiInteractiveTkBase.gki_setwcs: saved metacode only
+        # has the gki_setwcs opcode
+        self.wcs.set(arg)
+
+    def gki_polyline(self, arg):
+        # commit pending WCS changes when draw is found
+        self.wcs.commit()
+        verts = gki.ndc(arg[1:]).reshape(arg[0], 2)
+        la = self.lineAttributes
+        self._fig.add_artist(
+            Line2D(verts[:, 0],
+                   verts[:, 1],
+                   linestyle=la.linestyle,
+                   linewidth=GKI_TO_MPL_LINEWIDTH * la.linewidth,
+                   color=la.color,
+                   transform=self._fig.transFigure))
+        self._changed()
+
+    def gki_polymarker(self, arg):
+        # IRAF only implements points for polymarker
+        self.wcs.commit()
+        verts = gki.ndc(arg[1:]).reshape(arg[0], 2)
+        color = self.markerAttributes.color
+        self._fig.add_artist(
+            Line2D(verts[:, 0],
+                   verts[:, 1],
+                   linestyle='',
+                   marker='.',
+                   markersize=3.0,
+                   markeredgewidth=0.0,
+                   markerfacecolor=color,
+                   color=color,
+                   transform=self._fig.transFigure))
+        self._changed()
+
+    def gki_text(self, arg):
+        self.wcs.commit()
+        x = gki.ndc(arg[0])
+        y = gki.ndc(arg[1])
+        text = arg[3:].astype(numpy.int8).tobytes().decode('ascii')
+        ta = self.textAttributes
+        # same font weight rules as GkiMplKernel.gki_text
+        weight = 'normal'
+        if (MPL_MAJ_MIN < 0.91) or (abs(ta.charSize - 1.0) > .0001):
+            if ta.textFont.find('bold') >= 0:
+                weight = 'bold'
+        style = 'italic'
+        if ta.textFont.find('italic') < 0:
+            style = 'normal'
+        fsz = getTextPointSize(ta.charSize, self.width, self.height)
+        rot = calculateMplTextAngle(ta.charUp, ta.textPath)
+        yOffset = 0.0
+        if abs(rot) < .0001 and ta.textHorizontalJust == 'center':
+            yOffset = GKI_TEXT_Y_OFFSET
+        self._fig.text(x,
+                       y - yOffset,
+                       text,
+                       color=ta.textColor,
+                       rotation=rot,
+                       horizontalalignment=ta.textHorizontalJust,
+                       verticalalignment=ta.textVerticalJust,
+                       fontweight=weight,
+                       fontstyle=style,
+                       fontsize=fsz)
+        self._changed()
+
+    def gki_fillarea(self, arg):
+        self.wcs.commit()
+        fa = self.fillAttributes
+        verts = gki.ndc(arg[1:]).reshape(arg[0], 2)
+        # fillstyle 0=clear,  1=hollow,  2=solid,  3-6=hatch
+        ec = fa.color
+        fc = fa.color
+        fll = True
+        if fa.fillstyle == 0:
+            ec = fc = self._color(0)
+        elif fa.fillstyle == 1:
+            fc = 'none'
+            fll = False
+        self._fig.add_artist(
+            Polygon(verts,
+                    closed=True,
+                    edgecolor=ec,
+                    facecolor=fc,
+                    fill=fll,
+                    transform=self._fig.transFigure))
+        self._changed()
+
+    def gki_putcellarray(self, arg):
+        self.wcs.commit()
+        self.errorMessage(gki.standardNotImplemented % "GKI_PUTCELLARRAY")
+
+    def gki_plset(self, arg):
+        # Handle case where some terms (eg. xgterm) allow higher values,
+        # by looping over the possible visible patterns.  (ticket #172)
+        arg0 = arg[0]
+        if arg0 >= len(GKI_TO_MPL_LINESTYLE):
+            num_visible = len(GKI_TO_MPL_LINESTYLE) - 1
+            arg0 = 1 + (arg0 % num_visible)
+        self.lineAttributes.set(GKI_TO_MPL_LINESTYLE[arg0],
+                                arg[1] / gki.GKI_FLOAT_FACTOR,
+                                self._color(arg[2]))
+
+    def gki_pmset(self, arg):
+        self.markerAttributes.set(0, 0, self._color(arg[2]))
+
+    def gki_txset(self, arg):
+        charUp = float(arg[0])
+        charSize = max(0.5, arg[1] / gki.GKI_FLOAT_FACTOR)
+        charSpace = arg[2] / gki.GKI_FLOAT_FACTOR
+        textPath = arg[3]
+        self.textAttributes.set(charUp, charSize, charSpace, textPath,
+                                GKI_TO_MPL_HALIGN[arg[4]],
+                                GKI_TO_MPL_VALIGN[arg[5]],
+                                GKI_TO_MPL_FONTATTR[arg[6]],
+                                GKI_TO_MPL_FONTATTR[arg[7]],
+                                self._color(arg[8]))
+
+    def gki_faset(self, arg):
+        self.fillAttributes.set(arg[0], self._color(arg[1]))
+
+    def gki_getcursor(self, arg):
+        raise NotImplementedError(gki.standardNotImplemented % "GKI_GETCURSOR")
+
+    def gki_getcellarray(self, arg):
+        raise NotImplementedError(gki.standardNotImplemented %
+                                  "GKI_GETCELLARRAY")
+
+    def gki_unknown(self, arg):
+        self.errorMessage(gki.standardWarning % "GKI_UNKNOWN")
+
+
+# -----------------------------------------------
+
+
+def renderFile(path, fmt='png', root=None):
+    """Render the saved metacode file path to fmt files, one per page
+
+    path may be a plain or an indexed metacode file (see gki.MetacodeFile).
+
+    The output files are named after path (without its extension) unless
+    root is given.  Returns the list of files written.
+    """
+    if root is None:
+        root = os.path.splitext(path)[0] + '_'
+    kernel = GkiMplFileKernel(fmt, root=root)
+    with gki.MetacodeFile(path) as mfile:
+        for i in range(len(mfile)):
+            kernel.translate(mfile.getPage(i))
+            kernel.startNewPage()
+    kernel.flush()
+    return kernel.outputFiles
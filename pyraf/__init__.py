@@ -26,12 +26,14 @@ from . import cllinecache  # noqa: F401
 from . import irafnames  # noqa: F401
 from . import irafexecute  # noqa: F401
 from . import clcache
+from . import iraftask
 
 
 # set up exit handler to close caches
 def _cleanup():
     if iraf:
         iraf.gflush()
+        iraftask.flushParLists()
     if hasattr(irafexecute, 'processCache'):
         del irafexecute.processCache
     if hasattr(clcache, 'codeCache'):
@@ -14,6 +14,9 @@ scanners list can be used by several different ContextSensitiveScanner
 objects.
 
 I also added the re match object as an argument to the action function.
+The action is found from the group that matched (m.lastindex), and the
+same scanner is kept for consecutive tokens until an action changes
+the state.
 
 Created 1999 September 10 by R. White
 """
@@ -36,21 +39,34 @@ class ContextSensitiveScanner:
         self.current = [start]
         iend = 0
         slen = len(s)
+        scanners = self.scanners
         while iend < slen:
-            if not self.current:
-                self.current = [start]
-            scanner = self.scanners[self.current[-1]]
-            m = scanner.re.match(s, iend)
-            assert m
-            groups = m.groups()
-            for i in scanner.indexlist:
-                if groups[i] is not None:
-                    scanner.index2func[i](groups[i], m, self)
-                    # assume there is only a single match
+            current = self.current
+            if not current:
+                current = self.current = [start]
+            state = current[-1]
+            scanner = scanners[state]
+            match = scanner.re.match
+            group2func = scanner.group2func
+            skipgroups = scanner.skipgroups
+            # keep using this scanner until an action changes the state
+            while True:
+                m = match(s, iend)
+                assert m
+                i = m.lastindex
+                if i in skipgroups:
+                    iend = m.end()
+                    if iend >= slen:
+                        break
+                    continue
+                func = group2func.get(i)
+                if func is None:
+                    print('cgeneric: No group found in match?')
+                    print('Returning match object for debug')
+                    self.rv = m
+                    return
+                func(m.group(i), m, self)
+                iend = m.end()
+                if (iend >= slen or self.current is not current or
+                        not current or current[-1] != state):
                     break
-            else:
-                print('cgeneric: No group found in match?')
-                print('Returning match object for debug')
-                self.rv = m
-                return
-            iend = m.end()
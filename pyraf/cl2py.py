@@ -8,7 +8,7 @@ import io
 import os
 import sys
 
-from .generic import GenericASTTraversal
+from .generic import GenericASTTraversal, fusedTraversal
 from .clast import AST
 from .cltoken import Token
 from . import clscan
@@ -113,10 +113,16 @@ def cl2py(filename=None,
         clInput = string
         efilename = 'string_proc'  # revisit this setting (tik #24), maybe '' ?
         if usecache:
-            index, pycode = codeCache.get(None, mode=mode, source=clInput)
+            index, pycode = codeCache.get(None,
+                                          mode=mode,
+                                          source=clInput,
+                                          local_vars_dict=local_vars_dict,
+                                          local_vars_list=local_vars_list)
             if pycode is not None:
                 if Verbose > 3:
                     print("Found in CL script cache: ", clInput.strip()[:20])
+                    if mode == "single":
+                        print(codeCache.singleCacheInfo())
                 return pycode
         else:
             index = None
@@ -137,15 +143,16 @@ def cl2py(filename=None,
 
     # first pass -- get variables
     vars = VarList(tree, mode, local_vars_list, local_vars_dict, parlist)
+    if mode == "single" and len(vars.local_vars_list) > vars.local_vars_count:
+        # declarations must be processed every time the statement is run
+        index = None
 
     # check variable list for consistency with the given parlist
     # this may change the vars list
     _checkVars(vars, parlist, parfile)
 
-    # second pass -- check all expression types
-    # type info is added to tree
-    TypeCheck(tree, vars, efilename)
-
+    # second pass -- check expression types, GOTO structure and task
+    # argument lists (done by Tree2Python)
     # third pass -- generate python code
     tree2python = Tree2Python(tree, vars, efilename, taskObj)
 
@@ -571,6 +578,7 @@ class ExtractDeclInfo(GenericASTTraversal, ErrorTracker):
                 self.error(f"Variable `{name}' is multiply declared",
                            node)
                 self.prune()
+                return
             else:
                 # existing but undefined entry comes from procedure line
                 # set mode = "a" by default
@@ -1025,13 +1033,15 @@ def _getCLVarType(name):
 
 
 class TypeCheck(GenericASTTraversal):
-    """Determine types of all expressions"""
+    """Determine types of all expressions
+
+    This is a postorder traversal.  It is run by TreeAnalysis.
+    """
 
     def __init__(self, ast, vars, filename):
         GenericASTTraversal.__init__(self, ast)
         self.vars = vars
         self.filename = filename
-        self.postorder()
 
     # atoms
 
@@ -1175,7 +1185,8 @@ class GoToAnalyze(GenericASTTraversal, ErrorTracker):
 
     Analyze GOTO structure looking for branches into blocks (which are forbidden),
     backward branches (which are not supported), and other errors.  Adds information
-    to the AST that is used to generate Python equivalent code.
+    to the AST that is used to generate Python equivalent code.  This is a
+    preorder traversal run by TreeAnalysis, which calls checkLabels afterwards.
     """
 
     def __init__(self, ast):
@@ -1186,8 +1197,8 @@ class GoToAnalyze(GenericASTTraversal, ErrorTracker):
         self.goto_nodelist = {}
         self.current_blockid = -1
 
-        # walk the tree
-        self.preorder()
+    def checkLabels(self):
+        """Check labels and add label counts to blocks after the walk"""
 
         # check for missing labels
         for label in self.goto_blockidlist.keys():
@@ -1446,7 +1457,11 @@ def _convFunc(var, value):
 
 
 class CheckArgList(GenericASTTraversal, ErrorTracker):
-    """Check task argument list for errors"""
+    """Check task argument lists for errors
+
+    Only task calls and the function calls in their arguments are
+    checked.  This is a preorder traversal run by TreeAnalysis.
+    """
 
     def __init__(self, ast):
         GenericASTTraversal.__init__(self, ast)
@@ -1455,7 +1470,6 @@ class CheckArgList(GenericASTTraversal, ErrorTracker):
         self.keywords = []
         self.taskname = []
         self.tasknode = []
-        self.preorder()
         # note that we count on the Tree2Python class to print any errors
 
     def n_task_call_stmt(self, node):
@@ -1469,16 +1483,20 @@ class CheckArgList(GenericASTTraversal, ErrorTracker):
         self.keywords.pop()
 
     def n_function_call(self, node):
-        self.taskname.append(node[0].attr)
-        self.tasknode.append(node)
-        self.keywords.append({})
+        if self.keywords:
+            self.taskname.append(node[0].attr)
+            self.tasknode.append(node)
+            self.keywords.append({})
 
     def n_function_call_exit(self, node):
-        self.taskname.pop()
-        self.tasknode.pop()
-        self.keywords.pop()
+        if self.tasknode and self.tasknode[-1] is node:
+            self.taskname.pop()
+            self.tasknode.pop()
+            self.keywords.pop()
 
     def n_param_name(self, node):
+        if not self.keywords:
+            return
         keyword = node[0].attr
         if keyword in self.keywords[-1]:
             self.error(f"Duplicate keyword `{keyword}' "
@@ -1487,6 +1505,8 @@ class CheckArgList(GenericASTTraversal, ErrorTracker):
             self.keywords[-1][keyword] = 1
 
     def n_non_empty_arg(self, node):
+        if not self.keywords:
+            return
         if node[0].type not in [
                 'keyword_arg', 'bool_arg', 'redir_arg', 'non_expr_arg'
         ] and self.keywords[-1]:
@@ -1494,12 +1514,32 @@ class CheckArgList(GenericASTTraversal, ErrorTracker):
                        f"in call to {self.taskname[-1]}", node)
 
     def n_empty_arg(self, node):
-        if self.keywords[-1]:
+        if self.keywords and self.keywords[-1]:
             # empty args don't have line number, so use task line
             self.error("Non-keyword (empty) arg after keyword arg "
                        f"in call to {self.taskname[-1]}", self.tasknode[-1])
 
 
+class TreeAnalysis(ErrorTracker):
+    """Check expression types, GOTO structure and task argument lists
+
+    The three analyses are independent, so they share a single walk of
+    the tree.  Type info and GOTO label counts are added to the tree.
+    Errors are collected here; we count on Tree2Python to print them.
+    """
+
+    def __init__(self, ast, vars, filename):
+        self.filename = filename
+        self.gotos = GoToAnalyze(ast)
+        arglists = CheckArgList(ast)
+        fusedTraversal(ast,
+                       preorder=(self.gotos, arglists),
+                       postorder=(TypeCheck(ast, vars, filename),))
+        self.gotos.checkLabels()
+        self.errorappend(self.gotos)
+        self.errorappend(arglists)
+
+
 class Tree2Python(GenericASTTraversal, ErrorTracker):
 
     def __init__(self, ast, vars, filename='', taskObj=None):
@@ -1541,13 +1581,14 @@ class Tree2Python(GenericASTTraversal, ErrorTracker):
         if taskObj and self._ecl_iferr_entered:
             self.write(f"taskObj = iraf.getTask('{taskObj}')\n")
 
-        # analyze goto structure
-        # this assigns the label_count field for statement blocks
-        self.gotos = GoToAnalyze(ast)
+        # check types and analyze goto structure
+        # this assigns the type and label_count fields used below
+        analysis = TreeAnalysis(ast, vars, filename)
+        self.gotos = analysis.gotos
 
-        # propagate any errors from goto analysis, but continue to see
+        # propagate any errors from the analysis, but continue to see
         # if we can identify more problems
-        self.errorappend(self.gotos)
+        self.errorappend(analysis)
 
         # This performs the actual translation.  It traverses the
         # abstract syntax tree.  self has methods called n_WHATEVER
@@ -2293,7 +2334,6 @@ class Tree2Python(GenericASTTraversal, ErrorTracker):
     # ------------------------------
 
     def n_task_call_stmt(self, node):
-        self.errorappend(CheckArgList(node))
         taskname = node[0].attr
         self.currentTaskname = taskname
         # '$' prefix means print time required for task (just ignore it for now)
@@ -27,12 +27,19 @@
 #  Minimal AST class -- N-ary trees.
 #
 
-from .tools import compmixin
+import sys
 
 
-class AST(compmixin.ComparableMixin):
+class AST:
+
+    # exprType, requireType, label_count, parent and filename are added
+    # by cl2py
+    __slots__ = ('type', '_kids', 'exprType', 'requireType', 'label_count',
+                 'parent', 'filename')
 
     def __init__(self, type=None):
+        if type is not None:
+            type = sys.intern(type)
         self.type = type
         self._kids = []
 
@@ -42,7 +49,7 @@ class AST(compmixin.ComparableMixin):
     #  __getitem__          GenericASTTraversal, GenericASTMatcher
     #  __len__              GenericASTBuilder
     #  __setslice__         GenericASTBuilder
-    #  _compare             GenericASTMatcher
+    #  comparisons          GenericASTMatcher
     #
     def __getitem__(self, i):
         return self._kids[i]
@@ -50,6 +57,12 @@ class AST(compmixin.ComparableMixin):
     def __len__(self):
         return len(self._kids)
 
+    def __iter__(self):
+        return iter(self._kids)
+
+    def __reversed__(self):
+        return reversed(self._kids)
+
     # __setslice__ is deprec.d, out in PY3K; use __setitem__ instead
     def __setslice__(self, low, high, seq):
         self._kids[low:high] = seq
@@ -60,8 +73,34 @@ class AST(compmixin.ComparableMixin):
     def __repr__(self):
         return self.type
 
-    def _compare(self, other, method):
+    #  nodes compare by type, with other nodes or with type strings
+
+    def __eq__(self, other):
+        if isinstance(other, AST):
+            return self.type == other.type
+        return self.type == other
+
+    def __ne__(self, other):
+        if isinstance(other, AST):
+            return self.type != other.type
+        return self.type != other
+
+    def __lt__(self, other):
+        if isinstance(other, AST):
+            return self.type < other.type
+        return self.type < other
+
+    def __le__(self, other):
+        if isinstance(other, AST):
+            return self.type <= other.type
+        return self.type <= other
+
+    def __gt__(self, other):
+        if isinstance(other, AST):
+            return self.type > other.type
+        return self.type > other
+
+    def __ge__(self, other):
         if isinstance(other, AST):
-            return method(self.type, other.type)
-        else:
-            return method(self.type, other)
+            return self.type >= other.type
+        return self.type >= other
@@ -5,6 +5,7 @@ R. White, 2000 January 19
 import os
 import sys
 import hashlib
+from collections import OrderedDict, namedtuple
 
 from .tools.irafglobals import Verbose, userIrafHome
 
@@ -48,7 +49,7 @@ else:
 
 
 def _currentVersion():
-    v = "4e" if pyrafglobals._use_ecl else "4c"
+    v = "5e" if pyrafglobals._use_ecl else "5c"
     return v + str(sqliteshelve.pickle_protocol)
 
 
@@ -59,6 +60,9 @@ class _FileContentsCache(filecache.FileCacheDict):
         filecache.FileCacheDict.__init__(self, filecache.MD5Cache)
 
 
+_CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
 class _CodeCache:
     """Python code cache class
 
@@ -66,9 +70,20 @@ class _CodeCache:
     removed in this system.  That's because another CL
     script might still exist with the same code.  Need a
     utility to clean up the cache by looking for unused keys...
+
+    Translations of single CL statements ("single" mode) are not
+    saved in the cache files.  The most recently used ones are kept
+    in memory instead, keyed by the statement and the local variables
+    that were declared when it was translated.
     """
 
+    # number of single-mode statements kept in memory
+    singleCacheSize = 256
+
     def __init__(self, cacheFileList):
+        self.singleCache = OrderedDict()
+        self.singleHits = 0
+        self.singleMisses = 0
         self.writeCache = None
         self.cacheList = []
         self.cacheFileList = []
@@ -139,20 +154,50 @@ class _CodeCache:
             h.update(source.encode())
             return h.hexdigest() + _currentVersion()
 
+    def getSingleIndex(self, source, local_vars_dict=None,
+                       local_vars_list=None):
+        """Get in-memory cache key for a single-mode statement"""
+
+        # the translation depends on the declarations of local variables
+        # (they are referenced through Vars) but not on their values
+        local_vars = []
+        for name in local_vars_list or ():
+            v = local_vars_dict[name]
+            local_vars.append((name, v.type, v.shape, v.list_flag))
+        return (source, tuple(local_vars), _currentVersion())
+
     def add(self, index, pycode):
         """Add pycode to cache with key = index.  Ignores if index=None."""
-        if index is not None and self.writeCache is not None:
+        if isinstance(index, tuple):
+            self.singleCache[index] = pycode
+            if len(self.singleCache) > self.singleCacheSize:
+                self.singleCache.popitem(last=False)
+        elif index is not None and self.writeCache is not None:
             self.writeCache[index] = pycode
 
-    def get(self, filename, mode="proc", source=None):
+    def get(self, filename, mode="proc", source=None, local_vars_dict=None,
+            local_vars_list=None):
         """Get pycode from cache for this file.
 
         Returns tuple (index, pycode).  Pycode=None if not found
-        in cache.  If mode != "proc", assumes that the code should not be
-        cached.
+        in cache.  If mode is "single", source is a CL statement
+        translated with the given local variables and only the
+        in-memory cache is used.
         """
 
-        if mode != "proc":
+        if mode == "single":
+            if not source:
+                return None, None
+            index = self.getSingleIndex(source, local_vars_dict,
+                                        local_vars_list)
+            pycode = self.singleCache.get(index)
+            if pycode is None:
+                self.singleMisses += 1
+            else:
+                self.singleHits += 1
+                self.singleCache.move_to_end(index)
+            return index, pycode
+        elif mode != "proc":
             return None, None
 
         index = self.getIndex(filename, source=source)
@@ -168,6 +213,17 @@ class _CodeCache:
         else:
             return index, None
 
+    def singleCacheInfo(self):
+        """Return hits, misses, maxsize and currsize of single-mode cache"""
+        return _CacheInfo(self.singleHits, self.singleMisses,
+                          self.singleCacheSize, len(self.singleCache))
+
+    def clearSingle(self):
+        """Clear the single-mode cache and its statistics"""
+        self.singleCache.clear()
+        self.singleHits = 0
+        self.singleMisses = 0
+
     def remove(self, filename):
         """Remove pycode from cache for this file or IrafTask object.
 
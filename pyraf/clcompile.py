@@ -0,0 +1,236 @@
+"""clcompile.py: Ahead-of-time compilation of CL packages to Python modules
+
+pyraf-compile translates every CL script under a source directory and
+writes the translations as modules of a Python package, together with
+their bytecode in __pycache__.  The package __init__ records the
+source directory and, for each script, the module name and the MD5
+digests of the script and of its parameter file.
+
+Directories listed in compiledPath (initialized from the colon-separated
+PYRAF_COMPILED_PATH environment variable) are searched by getPycode,
+which IrafCLTask.initTask calls before translating a script.  A compiled
+module is only used if the digests still match the files on disk, so
+stale packages fall back to the usual cl2py translation.
+"""
+
+import argparse
+import compileall
+import importlib.machinery
+import keyword
+import os
+import pickle
+import re
+import sys
+
+from . import cl2py, filecache, irafpar, pyrafglobals
+
+if 'PYRAF_COMPILED_PATH' in os.environ:
+    compiledPath = [
+        d for d in os.environ['PYRAF_COMPILED_PATH'].split(':') if d
+    ]
+else:
+    compiledPath = []
+
+# compiled package indices, keyed by directory name
+_packages = {}
+
+# md5 digests of parameter files
+_parFileDict = filecache.FileCacheDict(filecache.MD5Cache)
+
+
+def _parIndex(parfile):
+    """Return md5 digest of parameter file or None if there is none"""
+
+    if parfile and os.path.exists(parfile):
+        return _parFileDict.get(parfile)
+    return None
+
+
+def _moduleName(relpath, names):
+    """Return a unique module name for the CL script relpath"""
+
+    name = re.sub(r'\W', '_', os.path.splitext(relpath)[0])
+    if name[:1].isdigit() or keyword.iskeyword(name):
+        name = 'cl_' + name
+    base = name
+    i = 1
+    while name in names:
+        i += 1
+        name = f'{base}_{i}'
+    names.add(name)
+    return name
+
+
+def compileScript(filename):
+    """Translate CL script filename to the source of a Python module
+
+    The parameter file with the same root name, if there is one,
+    defines the parameters just as it does for the task.  Returns
+    tuple (module source, index, parIndex).
+    """
+
+    parfile = os.path.splitext(filename)[0] + '.par'
+    if os.path.exists(parfile):
+        taskname = os.path.splitext(os.path.basename(filename))[0]
+        parlist = irafpar.IrafParList(taskname, parfile)
+    else:
+        parfile = ""
+        parlist = None
+    pycode = cl2py.cl2py(filename, parlist=parlist, parfile=parfile)
+    index = cl2py.codeCache.getIndex(filename)
+    parIndex = _parIndex(parfile)
+    # the module itself holds the code, so do not pickle it twice
+    code = pycode.code
+    pycode.code = None
+    try:
+        pvars = pickle.dumps(pycode, pickle.HIGHEST_PROTOCOL)
+    finally:
+        pycode.code = code
+    # the data goes after the code, which has to start on line 1 for
+    # the ECL line maps to hold
+    trailer = [
+        '', '', f'# {os.path.basename(filename)}: CL script compiled by '
+        'pyraf-compile', '', 'import pickle as _pickle', '',
+        f'_index = {index!r}', f'_parIndex = {parIndex!r}',
+        f'_pycode = _pickle.loads({pvars!r})', ''
+    ]
+    return code + '\n'.join(trailer), index, parIndex
+
+
+def compilePackage(sourceDir, outputDir, verbose=0):
+    """Compile all CL scripts under sourceDir to package outputDir
+
+    Returns tuple (number compiled, number failed).
+    """
+
+    sourceDir = os.path.realpath(sourceDir)
+    os.makedirs(outputDir, exist_ok=True)
+    modules = {}
+    names = set()
+    nfail = 0
+    for root, dirs, files in os.walk(sourceDir):
+        dirs.sort()
+        for fname in sorted(files):
+            if not fname.endswith('.cl'):
+                continue
+            filename = os.path.join(root, fname)
+            relpath = os.path.relpath(filename, sourceDir)
+            try:
+                source, index, parIndex = compileScript(filename)
+            except Exception as e:
+                nfail += 1
+                if verbose:
+                    print(f"{relpath}: {e}", file=sys.stderr)
+                continue
+            modname = _moduleName(relpath, names)
+            with open(os.path.join(outputDir, modname + '.py'), 'w') as fh:
+                fh.write(source)
+            modules[relpath] = (modname, index, parIndex)
+            if verbose > 1:
+                print(f"{relpath} -> {modname}")
+    lines = [
+        f'"""CL scripts in {sourceDir} compiled by pyraf-compile"""', '',
+        f'sourceDir = {sourceDir!r}', '', 'modules = {'
+    ]
+    for relpath in sorted(modules):
+        lines.append(f'    {relpath!r}: {modules[relpath]!r},')
+    lines.append('}')
+    with open(os.path.join(outputDir, '__init__.py'), 'w') as fh:
+        fh.write('\n'.join(lines) + '\n')
+    compileall.compile_dir(outputDir, maxlevels=0, quiet=1)
+    _packages.pop(outputDir, None)
+    return len(modules), nfail
+
+
+def _loadCode(dirname, modname):
+    """Return code object for module modname in directory dirname
+
+    The loader uses the bytecode in __pycache__ if it is up-to-date.
+    """
+
+    path = os.path.join(dirname, modname + '.py')
+    fullname = f'{os.path.basename(dirname)}.{modname}'
+    return importlib.machinery.SourceFileLoader(fullname,
+                                                path).get_code(fullname)
+
+
+def _getPackage(dirname):
+    """Return (sourceDir, modules) index for compiled package dirname"""
+
+    if dirname not in _packages:
+        namespace = {}
+        try:
+            exec(_loadCode(dirname, '__init__'), namespace)
+            _packages[dirname] = (namespace['sourceDir'],
+                                  namespace['modules'])
+        except (OSError, ImportError, SyntaxError, KeyError):
+            _packages[dirname] = None
+    return _packages[dirname]
+
+
+def getPycode(filename, parfile=""):
+    """Return Pycode object for CL script filename from a compiled package
+
+    Returns None if no package in compiledPath includes the script or
+    if the script or its parameter file has changed since it was
+    compiled.  The code object for the module is returned as
+    pycode.compiled = (module filename, code object).
+    """
+
+    if not (compiledPath and isinstance(filename, str)):
+        return None
+    filename = os.path.realpath(os.path.expanduser(filename))
+    for dirname in compiledPath:
+        package = _getPackage(dirname)
+        if package is None:
+            continue
+        sourceDir, modules = package
+        entry = modules.get(os.path.relpath(filename, sourceDir))
+        if entry is None:
+            continue
+        modname, index, parIndex = entry
+        if (index != cl2py.codeCache.getIndex(filename) or
+                parIndex != _parIndex(parfile)):
+            continue
+        try:
+            codeObject = _loadCode(dirname, modname)
+        except (OSError, ImportError, SyntaxError):
+            continue
+        namespace = {}
+        exec(codeObject, namespace)
+        if namespace['_index'] != index:
+            # module rewritten after the package index was read
+            continue
+        pycode = namespace['_pycode']
+        with open(codeObject.co_filename) as fh:
+            pycode.code = fh.read()
+        pycode.index = index
+        pycode.setFilename(filename)
+        pycode.compiled = (codeObject.co_filename, codeObject)
+        return pycode
+    return None
+
+
+def main(args=None):
+    """pyraf-compile entry point"""
+
+    parser = argparse.ArgumentParser(
+        prog='pyraf-compile',
+        description='Compile the CL scripts of IRAF packages to a Python '
+        'package for use with PYRAF_COMPILED_PATH.')
+    parser.add_argument('source', help='directory tree with CL scripts')
+    parser.add_argument('output', help='output package directory')
+    parser.add_argument('-e', '--ecl', action='store_true',
+                        help='compile for the ECL environment')
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help='list failed (-vv: all) scripts')
+    args = parser.parse_args(args)
+    pyrafglobals._use_ecl = args.ecl
+    ncompiled, nfail = compilePackage(args.source, args.output,
+                                      verbose=args.verbose)
+    print(f"Compiled: {ncompiled}, Failed: {nfail}")
+    return 1 if nfail and not ncompiled else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
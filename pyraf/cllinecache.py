@@ -92,6 +92,25 @@ def updateCLscript(filename):
         return []
 
 
+def getCLlines(filename):
+    """Return list of lines in CL source file filename
+
+    The lines are kept in the linecache cache and reread only when
+    the file size or modification time changes.  Raises OSError if
+    the file cannot be read.
+    """
+
+    stat = os.stat(filename)
+    entry = linecache.cache.get(filename)
+    # same entry format as linecache so its checkcache can validate it
+    if entry is not None and entry[:2] == (stat.st_size, stat.st_mtime):
+        return entry[2]
+    with open(filename, errors="ignore") as fh:
+        lines = fh.readlines()
+    linecache.cache[filename] = stat.st_size, stat.st_mtime, lines, filename
+    return lines
+
+
 # insert these symbols into standard linecache module
 
 _original_checkcache = linecache.checkcache
@@ -489,6 +489,8 @@ def getParser():
         _parser = EclParser(AST)
     else:
         _parser = CLParser(AST)
+    # LALR tables are cached next to the CL translations
+    _parser.tableCacheName = 'lalrtables'
     return _parser
 
 
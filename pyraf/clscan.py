@@ -61,6 +61,8 @@ def filterEscapes(instr):
 class _BasicScanner_1(GenericScanner):
     """Scanner class for tokens that can be recognized late"""
 
+    ignore = ('whitespace',)
+
     def t_whitespace(self, s, m, parent):
         r'[ \t]+'
         pass
@@ -702,6 +704,8 @@ class _StrictAcceptRedirScanner(_BasicScanner_3, _BasicScanner_2,
                                 _BasicScanner_1):
     """Strict scanner class where redirection is allowed"""
 
+    ignore = ('whitespace', 'ignore_spaces')
+
     def t_accept_redir(self, s, m, parent):
         r' < | >>? ([GIP]+|&?) | \|&? '
         if s[0] == '|':
@@ -773,6 +777,9 @@ _boolDict = {
     'no': 1,
 }
 
+# token types that addToken handles specially
+_specialTokens = frozenset([None, 'NEWLINE', 'PIPE', '}'])
+
 # list of scanners for each state
 # only need to create these once, since they are designed to
 # contain no state information
@@ -851,6 +858,11 @@ class CLScanner(ContextSensitiveScanner):
     def addToken(self, type, attr=None):
         # add a token to the list (with some twists to simplify parsing)
 
+        if type not in _specialTokens:
+            # most tokens just get appended
+            self.rv.append(Token(type=type, attr=attr, lineno=self.lineno))
+            return
+
         if type is None:
             return
 
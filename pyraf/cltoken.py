@@ -27,15 +27,23 @@
 #       Token class for IRAF CL parsing
 #
 
+import sys
+
 from .tools.irafglobals import INDEF
-from .tools import compmixin
 
 verbose = 0
 
 
-class Token(compmixin.ComparableMixin):
+class Token:
+
+    # exprType, requireType and trunc_int_div are added by cl2py
+    __slots__ = ('type', 'attr', 'lineno', 'exprType', 'requireType',
+                 'trunc_int_div')
 
     def __init__(self, type=None, attr=None, lineno=None):
+        # interned types make comparisons with grammar symbols cheap
+        if type is not None:
+            type = sys.intern(type)
         self.type = type
         self.attr = attr
         self.lineno = lineno
@@ -43,17 +51,43 @@ class Token(compmixin.ComparableMixin):
     #
     #  Not all these may be needed:
     #
-    #  _compare     required for GenericParser, required for
+    #  comparisons  required for GenericParser, required for
     #                       GenericASTMatcher only if your ASTs are
     #                       heterogeneous (i.e., AST nodes and tokens)
     #  __repr__     recommended for nice error messages in GenericParser
     #  __getitem__  only if you have heterogeneous ASTs
     #
-    def _compare(self, other, method):
+    #  Tokens compare by type, with other tokens or with type strings.
+    #
+    def __eq__(self, other):
         if isinstance(other, Token):
-            return method(self.type, other.type)
-        else:
-            return method(self.type, other)
+            return self.type == other.type
+        return self.type == other
+
+    def __ne__(self, other):
+        if isinstance(other, Token):
+            return self.type != other.type
+        return self.type != other
+
+    def __lt__(self, other):
+        if isinstance(other, Token):
+            return self.type < other.type
+        return self.type < other
+
+    def __le__(self, other):
+        if isinstance(other, Token):
+            return self.type <= other.type
+        return self.type <= other
+
+    def __gt__(self, other):
+        if isinstance(other, Token):
+            return self.type > other.type
+        return self.type > other
+
+    def __ge__(self, other):
+        if isinstance(other, Token):
+            return self.type >= other.type
+        return self.type >= other
 
     def __hash__(self):
         return hash(self.type)
@@ -24,14 +24,23 @@ instance) of the objects to be created for each entry.  New files
 are added with the add() method, and values are retrieved by
 index (cachedict[filename]) or using the .get() method.
 
+PersistentCache keeps data derived from files between sessions, in a
+shelve in the CL cache directory (see clcache.py and openCache).  Its
+entries are only returned while the size and modification time of the
+file they came from are unchanged.
+
 R. White, 2000 October 1
 """
 
 import os
+import pickle
+import sqlite3
 import stat
 import sys
 import hashlib
 
+from . import sqliteshelve
+
 
 class FileCache:
     """File cache base class"""
@@ -179,3 +188,73 @@ class FileCacheDict:
 
     def keys(self):
         return self.data.keys()
+
+
+class PersistentCache:
+    """Data derived from files, kept in a shelve between sessions
+
+    Entries are keyed by a string.  If the os.stat result of the file
+    the data came from is given to add, the entry also holds the size
+    and modification time of the file, and get only returns it for a
+    matching stat result.  Every entry records the version given to
+    the constructor as well; entries of other versions are ignored.
+    The shelve is opened on first use; if it cannot be written an
+    in-memory dictionary is used instead.
+    """
+
+    def __init__(self, filename, version=0):
+        self.filename = filename
+        self.version = version
+        self.db = None
+
+    def _open(self):
+        if self.db is None:
+            self.db = {}
+            if self.filename:
+                try:
+                    self.db = sqliteshelve.open(self.filename, 'w')
+                except (OSError, sqlite3.Error):
+                    pass
+        return self.db
+
+    def _signature(self, fileStat):
+        if fileStat is None:
+            return (self.version, None, None)
+        return (self.version, fileStat.st_size, fileStat.st_mtime_ns)
+
+    def get(self, key, fileStat=None):
+        """Return data for key or None if it is missing or out of date"""
+        try:
+            entry = self._open().get(key)
+        except (sqlite3.Error, pickle.UnpicklingError, AttributeError,
+                ImportError, EOFError):
+            # written by an incompatible version
+            return None
+        if isinstance(entry, tuple) and len(entry) == 4 and \
+                entry[:3] == self._signature(fileStat):
+            return entry[3]
+        return None
+
+    def add(self, key, value, fileStat=None):
+        try:
+            self._open()[key] = self._signature(fileStat) + (value,)
+        except (OSError, sqlite3.Error):
+            pass
+
+    def close(self):
+        if self.db is not None and not isinstance(self.db, dict):
+            self.db.close()
+        self.db = None
+
+
+def openCache(name, version=0):
+    """Return PersistentCache stored as name in the CL cache directory
+
+    An in-memory cache is returned if the CL cache is disabled.
+    """
+    from .clcache import clcache_path
+    if clcache_path:
+        filename = os.path.join(clcache_path[0], name)
+    else:
+        filename = None
+    return PersistentCache(filename, version)
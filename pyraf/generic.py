@@ -32,13 +32,21 @@
 #     the pattern.)
 # - Add optional value parameter to GenericParser.error.
 # - Add check for assertion error in ambiguity resolution.
+#
+# Later modifications:
+# - Add a table-driven LALR(1) parser generated from the same rules.
+#   GenericParser.parse uses it and falls back to the Earley parser
+#   only for syntax errors and for input that the LALR(1) tables
+#   cannot parse deterministically (see parseLALR).
 
 
 
 __version__ = 'SPARK-0.6.1rlw'
 
+import hashlib
 import re
 from . import cltoken
+from . import filecache
 
 
 def _namelist(instance):
@@ -53,11 +61,22 @@ def _namelist(instance):
     return namelist
 
 
+# compiled master patterns for each scanner class
+_scannerPatterns = {}
+
+
 class GenericScanner:
 
+    # names of t_ patterns whose actions do nothing (e.g. whitespace);
+    # tokenize skips over them without calling the action
+    ignore = ()
+
     def __init__(self):
-        pattern = self.reflect()
-        self.re = re.compile(pattern, re.VERBOSE)
+        cls = self.__class__
+        self.re = _scannerPatterns.get(cls)
+        if self.re is None:
+            pattern = self.reflect()
+            self.re = _scannerPatterns[cls] = re.compile(pattern, re.VERBOSE)
 
         self.index2func = {}
         self.indexlist = []
@@ -66,6 +85,14 @@ class GenericScanner:
             if hasattr(self, 't_' + name):
                 self.index2func[number - 1] = getattr(self, 't_' + name)
                 self.indexlist.append(number - 1)
+        # Each t_ pattern is one alternative wrapped in its own group,
+        # so the group that closed last (m.lastindex) is the one that
+        # matched.  group2func maps it to the action.
+        self.group2func = {}
+        for i, func in self.index2func.items():
+            self.group2func[i + 1] = func
+        self.skipgroups = frozenset(self.re.groupindex[name]
+                                    for name in self.ignore)
 
     def makeRE(self, name):
         doc = getattr(self, name).__doc__
@@ -88,19 +115,15 @@ class GenericScanner:
         pos = 0
         n = len(s)
         match = self.re.match
-        indexlist = self.indexlist
-        index2func = self.index2func
+        group2func = self.group2func
+        skipgroups = self.skipgroups
         while pos < n:
             m = match(s, pos)
             if m is None:
                 self.error(s, pos)
-
-            groups = m.groups()
-            for i in indexlist:
-                if groups[i] is not None:
-                    index2func[i](groups[i])
-                    # assume there is only a single match
-                    break
+            i = m.lastindex
+            if i not in skipgroups:
+                group2func[i](m.group(i))
             pos = m.end()
 
     def t_default(self, s):
@@ -110,6 +133,16 @@ class GenericScanner:
 
 class GenericParser:
 
+    # use the LALR(1) parser when possible
+    useLALR = 1
+    # name of the filecache.openCache cache where LALR(1) tables are
+    # kept between sessions (None for no cache)
+    tableCacheName = None
+    # maximum number of tokens examined to settle an LALR(1) conflict
+    maxConflictLookahead = 16
+    # LALR(1) tables already built in this process, keyed by grammar
+    _lalrTables = {}
+
     def __init__(self, start):
         self.rules = {}
         self.rule2func = {}
@@ -117,9 +150,11 @@ class GenericParser:
         self.collectRules()
         self.startRule = self.augment(start)
         self.ruleschanged = 1
+        self.lalrchanged = 1
 
     _START = 'START'
     _EOF = 'EOF'
+    _END = '$end'
 
     #
     #  A hook for GenericASTBuilder and GenericASTMatcher.
@@ -150,6 +185,7 @@ class GenericParser:
             self.rule2func[rule] = fn
             self.rule2name[rule] = func.__name__[2:]
         self.ruleschanged = 1
+        self.lalrchanged = 1
 
     def collectRules(self):
         for name in _namelist(self):
@@ -260,6 +296,298 @@ class GenericParser:
                             tokenRules[(nextSymbol, nextToken)].append(prule)
         self.tokenRules = tokenRules
 
+    #
+    #  LALR(1) parser.  The tables are built from the same rules with
+    #  the usual LR(0) automaton plus lookahead propagation (Aho, Sethi
+    #  and Ullman, "Compilers", section 4.7).  Conflicts stay in the
+    #  tables as tuples of alternative actions; see parseLALR.
+    #
+
+    def makeLALR(self):
+        # tables are cached under the parser class name, with a digest
+        # of the grammar as the version, so a changed grammar replaces
+        # the old tables
+        prods = [self.startRule]
+        for lhs, rules in self.rules.items():
+            for rule in rules:
+                if rule != self.startRule:
+                    prods.append(rule)
+        key = hashlib.md5(repr(prods).encode()).hexdigest()
+        tables = self._lalrTables.get(key)
+        if tables is None:
+            cache = None
+            if self.tableCacheName:
+                cache = filecache.openCache(self.tableCacheName, key)
+                tables = cache.get(self.__class__.__name__)
+            if tables is None or tables[0] != prods:
+                tables = (prods,) + self.buildLALR(prods)
+                if cache is not None:
+                    cache.add(self.__class__.__name__, tables)
+            if cache is not None:
+                cache.close()
+        self._lalrTables[key] = tables
+        prods, self.lalrAction, self.lalrGoto = tables
+        self.lalrProds = [(lhs, len(rhs)) for lhs, rhs in prods]
+        self.lalrFuncs = [self.rule2func[rule] for rule in prods]
+
+    def buildLALR(self, prods):
+        """Return (action, goto) tables for the productions prods
+
+        prods[0] is the start rule.  action[state] maps terminals to
+        a state to shift to (n >= 0), a production to reduce (-1-p)
+        or a tuple of such actions if there is a conflict; reducing
+        the start rule accepts.  goto[state] maps nonterminals to
+        states.
+        """
+        nonterms = self.rules
+        byLhs = {}
+        for i, (lhs, rhs) in enumerate(prods):
+            byLhs.setdefault(lhs, []).append(i)
+
+        # nullable nonterminals and FIRST sets
+        nullable = {}
+        first = {}
+        for lhs in nonterms:
+            first[lhs] = set()
+        changed = 1
+        while changed:
+            changed = 0
+            for lhs, rhs in prods:
+                f = first[lhs]
+                n = len(f)
+                for sym in rhs:
+                    if sym in nonterms:
+                        f.update(first[sym])
+                        if sym not in nullable:
+                            break
+                    else:
+                        f.add(sym)
+                        break
+                else:
+                    if lhs not in nullable:
+                        nullable[lhs] = 1
+                        changed = 1
+                if len(f) != n:
+                    changed = 1
+
+        def firstSeq(seq, lookahead):
+            result = set()
+            for sym in seq:
+                if sym in nonterms:
+                    result.update(first[sym])
+                    if sym not in nullable:
+                        return result
+                else:
+                    result.add(sym)
+                    return result
+            result.add(lookahead)
+            return result
+
+        def closure(items):
+            # LR(1) closure of (item, lookahead) pairs
+            result = set(items)
+            todo = list(items)
+            while todo:
+                (p, dot), lookahead = todo.pop()
+                rhs = prods[p][1]
+                if dot < len(rhs) and rhs[dot] in nonterms:
+                    for b in firstSeq(rhs[dot + 1:], lookahead):
+                        for q in byLhs[rhs[dot]]:
+                            new = ((q, 0), b)
+                            if new not in result:
+                                result.add(new)
+                                todo.append(new)
+            return result
+
+        # LR(0) automaton: states are identified by their kernel items
+        states = [frozenset([(0, 0)])]
+        index = {states[0]: 0}
+        transitions = []
+        i = 0
+        while i < len(states):
+            kernels = {}
+            for (p, dot), b in closure([(item, None) for item in states[i]]):
+                rhs = prods[p][1]
+                if dot < len(rhs):
+                    kernels.setdefault(rhs[dot], set()).add((p, dot + 1))
+            trans = {}
+            for sym, kernel in kernels.items():
+                kernel = frozenset(kernel)
+                if kernel not in index:
+                    index[kernel] = len(states)
+                    states.append(kernel)
+                trans[sym] = index[kernel]
+            transitions.append(trans)
+            i = i + 1
+
+        # lookaheads of kernel items: spontaneous ones and propagation
+        # links, found with a dummy lookahead '#'
+        lookaheads = {}
+        for i, kernel in enumerate(states):
+            for item in kernel:
+                lookaheads[(i, item)] = set()
+        lookaheads[(0, (0, 0))].add(self._END)
+        propagate = {}
+        itemClosures = {}
+        for i, kernel in enumerate(states):
+            for item in kernel:
+                itemClosure = closure([(item, '#')])
+                itemClosures[(i, item)] = itemClosure
+                for (p, dot), b in itemClosure:
+                    rhs = prods[p][1]
+                    if dot < len(rhs):
+                        target = (transitions[i][rhs[dot]], (p, dot + 1))
+                        if b == '#':
+                            propagate.setdefault((i, item), []).append(target)
+                        else:
+                            lookaheads[target].add(b)
+        changed = 1
+        while changed:
+            changed = 0
+            for source, targets in propagate.items():
+                la = lookaheads[source]
+                for target in targets:
+                    if not la <= lookaheads[target]:
+                        lookaheads[target].update(la)
+                        changed = 1
+
+        action = []
+        goto = []
+        for i, kernel in enumerate(states):
+            actions = {}
+            for item in kernel:
+                la = lookaheads[(i, item)]
+                for (p, dot), b in itemClosures[(i, item)]:
+                    rhs = prods[p][1]
+                    if dot < len(rhs):
+                        if rhs[dot] not in nonterms:
+                            actions.setdefault(rhs[dot], set()).add(
+                                transitions[i][rhs[dot]])
+                    elif b == '#':
+                        for a in la:
+                            actions.setdefault(a, set()).add(-1 - p)
+                    else:
+                        actions.setdefault(b, set()).add(-1 - p)
+            row = {}
+            for sym, acts in actions.items():
+                if len(acts) == 1:
+                    row[sym] = acts.pop()
+                else:
+                    row[sym] = tuple(sorted(acts))
+            action.append(row)
+            goto.append(dict((sym, state)
+                             for sym, state in transitions[i].items()
+                             if sym in nonterms))
+        return action, goto
+
+    def parseLALR(self, tokens):
+        """Parse tokens with the LALR(1) tables
+
+        Returns None if the tokens cannot be parsed deterministically:
+        for a syntax error, or when more than one of the alternative
+        actions of a table conflict is still viable after looking
+        maxConflictLookahead tokens ahead (e.g. a truly ambiguous
+        construct).  The caller then uses the Earley parser, which
+        reports errors and resolves ambiguities.  Otherwise the parse
+        is the only one possible, so the result is the same as from
+        the Earley parser.
+        """
+        if self.lalrchanged:
+            self.makeLALR()
+            self.lalrchanged = 0
+        action = self.lalrAction
+        goto = self.lalrGoto
+        prods = self.lalrProds
+        funcs = self.lalrFuncs
+        ntokens = len(tokens)
+        stack = [0]
+        values = []
+        i = 0
+        while 1:
+            if i < ntokens:
+                token = tokens[i]
+                act = action[stack[-1]].get(token.type)
+            elif i == ntokens:
+                token = cltoken.Token(self._EOF)
+                act = action[stack[-1]].get(self._EOF)
+            else:
+                act = action[stack[-1]].get(self._END)
+            if act is None:
+                return None
+            if act.__class__ is tuple:
+                act = self.resolveLALR(stack, tokens, i, act)
+                if act is None:
+                    return None
+            if act >= 0:
+                stack.append(act)
+                values.append(token)
+                i = i + 1
+            else:
+                p = -1 - act
+                lhs, n = prods[p]
+                if n:
+                    args = values[-n:]
+                    del values[-n:]
+                    del stack[-n:]
+                else:
+                    args = []
+                result = funcs[p](args)
+                if p == 0:
+                    return result
+                values.append(result)
+                stack.append(goto[stack[-1]][lhs])
+
+    def resolveLALR(self, stack, tokens, i, acts):
+        # keep the alternatives that survive n more tokens, doubling n
+        # until only one is left
+        n = 2
+        while n <= self.maxConflictLookahead:
+            acts = [
+                act for act in acts
+                if self._simulateLALR(list(stack), tokens, i, act, i + n)
+            ]
+            if len(acts) <= 1:
+                break
+            n = 2 * n
+        if len(acts) == 1:
+            return acts[0]
+        return None
+
+    def _simulateLALR(self, stack, tokens, i, act, end):
+        # returns true if the parser does not fail before shifting
+        # token end (only the state stack is kept)
+        action = self.lalrAction
+        goto = self.lalrGoto
+        prods = self.lalrProds
+        ntokens = len(tokens)
+        while 1:
+            if act >= 0:
+                stack.append(act)
+                i = i + 1
+                if i >= end:
+                    return 1
+            else:
+                p = -1 - act
+                if p == 0:
+                    return 1
+                lhs, n = prods[p]
+                if n:
+                    del stack[-n:]
+                stack.append(goto[stack[-1]][lhs])
+            if i < ntokens:
+                act = action[stack[-1]].get(tokens[i].type)
+            elif i == ntokens:
+                act = action[stack[-1]].get(self._EOF)
+            else:
+                act = action[stack[-1]].get(self._END)
+            if act is None:
+                return 0
+            if act.__class__ is tuple:
+                for a in act:
+                    if self._simulateLALR(list(stack), tokens, i, a, end):
+                        return 1
+                return 0
+
     #
     #  An Earley parser, as per J. Earley, "An Efficient Context-Free
     #  Parsing Algorithm", CACM 13(2), pp. 94-102.  Also J. C. Earley,
@@ -274,6 +602,13 @@ class GenericParser:
         raise SyntaxError(f"Syntax error at or near `{token}' token")
 
     def parse(self, tokens):
+        if self.useLALR:
+            rv = self.parseLALR(tokens)
+            if rv is not None:
+                return rv
+        return self.parseEarley(tokens)
+
+    def parseEarley(self, tokens):
         tree = {}
         # add a Token instead of a string so references to
         # token.type in buildState work for EOF symbol
@@ -512,78 +847,159 @@ class GenericASTBuilder(GenericParser):
 #  traversal also looks for an exit hook named n_<node type>_exit (no default
 #  routine is called if it's not found).  To prematurely halt traversal
 #  of a subtree, call the prune() method -- this only makes sense for a
-#  preorder traversal.
+#  preorder traversal.  prune() only sets a flag, so it should be the
+#  last thing a method does.
+#
+#  The dispatch tables are built once per class, and both traversals
+#  use an explicit stack rather than recursion so that deeply nested
+#  trees cannot exceed the recursion limit.
 #
 
+# dispatch tables for each traversal class
+_traversalRules = {}
 
-class GenericASTTraversalPruningException(Exception):
-    pass
+
+def _traversalTables(cls):
+    tables = _traversalRules.get(cls)
+    if tables is None:
+        rules = {}
+        exitrules = {}
+        for name in dir(cls):
+            if name[:2] == 'n_':
+                rules[name[2:]] = getattr(cls, name)
+                if name[-5:] == '_exit':
+                    exitrules[name[2:-5]] = getattr(cls, name)
+        tables = _traversalRules[cls] = (rules, exitrules)
+    return tables
 
 
 class GenericASTTraversal:
 
+    _pruned = 0
+
     def __init__(self, ast):
         self.ast = ast
         self.collectRules()
 
     def collectRules(self):
-        self.rules = {}
-        self.exitrules = {}
-        for name in _namelist(self):
-            if name[:2] == 'n_':
-                self.rules[name[2:]] = getattr(self, name)
-                if name[-5:] == '_exit':
-                    self.exitrules[name[2:-5]] = getattr(self, name)
+        # rules map node types to functions that are called with
+        # (self, node); unknown types are added as they are found
+        self.rules, self.exitrules = _traversalTables(self.__class__)
 
     def prune(self):
-        raise GenericASTTraversalPruningException()
+        self._pruned = 1
 
     def preorder(self, node=None):
         if node is None:
             node = self.ast
-
-        try:
+        rules = self.rules
+        exitrules = self.exitrules
+        # prune() may be called by a method that walks a subtree itself
+        pruned = self._pruned
+        self._pruned = 0
+        stack = [node]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            node = pop()
+            if node.__class__ is tuple:
+                # exit hook, pushed below the node's kids
+                func, node = node
+                func(self, node)
+                continue
             name = node.type
-            func = self.rules.get(name)
+            func = rules.get(name)
             if func is None:
                 # add rule to cache so next time it is faster
-                func = self.default
-                self.rules[name] = func
-            func(node)
-        except GenericASTTraversalPruningException:
-            return
-
-        for kid in node:
-            #          if kid.type=='term' and len(kid._kids)==3 and kid._kids[1].type=='/':
-            #              # Not the place to check for integer divsion - the type is
-            #              # either INTEGER or IDENT (and we dont know yet what the
-            #              # underlying type of the IDENT is...)
-            #              print(kid._kids[0].type, kid._kids[1].type, kid._kids[2].type)
-            self.preorder(kid)
-
-        func = self.exitrules.get(name)
-        if func is not None:
-            func(node)
+                func = rules[name] = self.__class__.default
+            func(self, node)
+            if self._pruned:
+                self._pruned = 0
+                continue
+            func = exitrules.get(name)
+            if func is not None:
+                push((func, node))
+            stack.extend(reversed(node))
+        self._pruned = pruned
 
     def postorder(self, node=None):
         if node is None:
             node = self.ast
-
-        for kid in node:
-            self.postorder(kid)
-
-        name = node.type
-        func = self.rules.get(name)
-        if func is None:
-            # add rule to cache so next time it is faster
-            func = self.default
-            self.rules[name] = func
-        func(node)
+        rules = self.rules
+        stack = [node]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            node = pop()
+            if node.__class__ is tuple:
+                # all kids done
+                node = node[0]
+                name = node.type
+                func = rules.get(name)
+                if func is None:
+                    func = rules[name] = self.__class__.default
+                func(self, node)
+            else:
+                push((node,))
+                stack.extend(reversed(node))
 
     def default(self, node):
         pass
 
 
+def fusedTraversal(ast, preorder=(), postorder=()):
+    """Run several traversals of ast in a single walk
+
+    The traversals in preorder get their n_<type> methods called on the
+    way down and their n_<type>_exit methods on the way up, those in
+    postorder get their n_<type> methods called on the way up, so each
+    sees the nodes in the same order as it would by itself.  The
+    traversals must not depend on each other's results for the same
+    node and must not prune.
+    """
+    enter = {}
+    leave = {}
+
+    def handlers(name):
+        # (function, traversal) pairs for entering and leaving name
+        enter[name] = elist = []
+        leave[name] = llist = []
+        for t in preorder:
+            func = t.rules.get(name) or t.__class__.default
+            if func is not GenericASTTraversal.default:
+                elist.append((func, t))
+            func = t.exitrules.get(name)
+            if func is not None:
+                llist.append((func, t))
+        for t in postorder:
+            func = t.rules.get(name) or t.__class__.default
+            if func is not GenericASTTraversal.default:
+                llist.append((func, t))
+        return elist, llist
+
+    stack = [ast]
+    pop = stack.pop
+    push = stack.append
+    while stack:
+        node = pop()
+        if node.__class__ is tuple:
+            node, llist = node
+            for func, t in llist:
+                func(t, node)
+            continue
+        name = node.type
+        elist = enter.get(name)
+        if elist is None:
+            elist, llist = handlers(name)
+        else:
+            llist = leave[name]
+        for func, t in elist:
+            func(t, node)
+        if llist:
+            push((node, llist))
+        stack.extend(reversed(node))
+
+
 #
 #  GenericASTMatcher.  AST nodes must have "__getitem__" and "__cmp__"
 #  implemented.
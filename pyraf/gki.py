@@ -39,8 +39,11 @@ graphics kernels as directed by commands embedded in the metacode stream.
 
 
 import numpy
+import os
 import sys
 import re
+import struct
+import tempfile
 from .tools.irafglobals import IrafError
 from . import wutil
 from . import graphcap
@@ -230,7 +233,16 @@ _clearCodes = [
 class GkiBuffer:
     """A buffer for gki which allocates memory in blocks so that
     a new memory allocation is not needed everytime metacode is appended.
-    Internally, buffer is numpy array: (numpy.zeros(N, numpy.int16)."""
+
+    Internally, buffer is a view into a numpy array
+    (numpy.zeros(N, numpy.int16)) that starts at the first word not yet
+    discarded, so reset only moves the start of the view.  The array
+    grows geometrically (by at least INCREMENT words), which keeps the
+    cost of appending a long metacode stream linear.  split and delget
+    return views of the array rather than copies; a buffer whose array
+    may be shared with such a view (or that was created from an outside
+    array) copies its contents to a new array before writing again.
+    """
 
     INCREMENT = 50000
 
@@ -243,16 +255,39 @@ class GkiBuffer:
         """Initialize to empty buffer or to metacode"""
 
         if metacode is not None:
-            self.buffer = metacode
-            self.bufferSize = len(metacode)
-            self.bufferEnd = len(metacode)
+            self._setStorage(metacode, 0, len(metacode))
+            # not our array, do not write to it
+            self._shared = True
         else:
-            self.buffer = numpy.zeros(0, numpy.int16)
-            self.bufferSize = 0
-            self.bufferEnd = 0
+            self._setStorage(numpy.zeros(0, numpy.int16), 0, 0)
+            self._shared = False
+        self._exported = False
         self.editHistory = EditHistory()
         self.prepareToRedraw()
 
+    def _setStorage(self, storage, start, end):
+        """Use storage[start:] for the buffer, with end words in use
+
+        _shared is true if the words after end may be in use elsewhere,
+        _exported is true if the words before start may be.
+        """
+
+        self._storage = storage
+        self._start = start
+        self.buffer = storage[start:]
+        self.bufferSize = len(storage) - start
+        self.bufferEnd = end
+
+    def _grow(self, n):
+        """Move contents to a new array with room for n more words"""
+
+        size = max(self.INCREMENT, 2 * (self.bufferEnd + n), self.bufferSize)
+        newbuffer = numpy.zeros(size, numpy.int16)
+        newbuffer[:self.bufferEnd] = self.buffer[:self.bufferEnd]
+        self._setStorage(newbuffer, 0, self.bufferEnd)
+        self._shared = False
+        self._exported = False
+
     def prepareToRedraw(self):
         """Reset pointers in preparation for redraw"""
 
@@ -276,17 +311,27 @@ class GkiBuffer:
             end = self.lastTranslate
         else:
             end = self.nextTranslate
+        end = min(end, self.bufferEnd)
         newEnd = self.bufferEnd - end
         if newEnd > 0:
-            self.buffer[0:newEnd] = self.buffer[end:self.bufferEnd]
-            self.bufferEnd = newEnd
+            # just move the start of the view past the discarded words
+            self._setStorage(self._storage, self._start + end, newEnd)
             self.nextTranslate = self.nextTranslate - end
             self.lastTranslate = 0
             if not last:
                 self.lastOpcode = None
-        else:
+        elif self._shared or len(self._storage) > 4 * self.INCREMENT:
             # complete reset so buffer can shrink sometimes
             self.init()
+        else:
+            # empty now, keep using the array (from the start unless
+            # the discarded words were handed out as views)
+            if self._exported:
+                self._setStorage(self._storage, self._start + end, 0)
+            else:
+                self._setStorage(self._storage, 0, 0)
+            self.editHistory = EditHistory()
+            self.prepareToRedraw()
 
     def split(self):
         """Split this buffer at nextTranslate and return a new buffer
@@ -295,7 +340,8 @@ class GkiBuffer:
         more metacode later if desired.)
         """
 
-        tail = acopy(self.buffer[self.nextTranslate:self.bufferEnd])
+        tailStart = self._start + self.nextTranslate
+        tailEnd = self.bufferEnd - self.nextTranslate
         if self.lastTranslate < self.nextTranslate and \
            self.lastOpcode in _clearCodes:
             # discard last opcode, it cleared the page
@@ -304,26 +350,26 @@ class GkiBuffer:
         else:
             # retain last opcode
             self.bufferEnd = self.nextTranslate
-        # return object of same class as this
-        newbuffer = self.__class__(tail)
+        # return object of same class as this; it takes over the rest
+        # of the array (the tail and the free space after it) while
+        # this buffer must not write to the array any more
+        newbuffer = self.__class__()
+        newbuffer._setStorage(self._storage, tailStart, tailEnd)
+        newbuffer._shared = self._shared
+        newbuffer._exported = True
+        self._shared = True
         newbuffer.editHistory = self.editHistory.split(self.bufferEnd)
         return newbuffer
 
     def append(self, metacode, isUndoable=0):
         """Append metacode to buffer"""
 
-        if self.bufferSize < (self.bufferEnd + len(metacode)):
-            # increment buffer size and copy into new array
-            diff = self.bufferEnd + len(metacode) - self.bufferSize
-            nblocks = diff // self.INCREMENT + 1
-            self.bufferSize = self.bufferSize + nblocks * self.INCREMENT
-            newbuffer = numpy.zeros(self.bufferSize, numpy.int16)
-            if self.bufferEnd > 0:
-                newbuffer[0:self.bufferEnd] = self.buffer[0:self.bufferEnd]
-            self.buffer = newbuffer
-        self.buffer[self.bufferEnd:self.bufferEnd + len(metacode)] = metacode
-        self.bufferEnd = self.bufferEnd + len(metacode)
-        self.editHistory.add(len(metacode), isUndoable)
+        n = len(metacode)
+        if self._shared or self.bufferSize < (self.bufferEnd + n):
+            self._grow(n)
+        self.buffer[self.bufferEnd:self.bufferEnd + n] = metacode
+        self.bufferEnd = self.bufferEnd + n
+        self.editHistory.add(n, isUndoable)
 
     def isUndoable(self):
         """Returns true if there is anything to undo on this plot"""
@@ -339,9 +385,11 @@ class GkiBuffer:
             if size == 0:
                 break
             self.bufferEnd = self.bufferEnd - size
-            # add this chunk to end of buffer (use copy, not view)
+            # add this chunk to end of buffer (a view, so the buffer
+            # must not write there again)
             self.redoBuffer.append(
-                acopy(self.buffer[self.bufferEnd:self.bufferEnd + size]))
+                self.buffer[self.bufferEnd:self.bufferEnd + size])
+            self._shared = True
             nUndo = nUndo - 1
             changed = 1
         if changed:
@@ -384,7 +432,10 @@ class GkiBuffer:
             end = self.lastTranslate
         else:
             end = self.nextTranslate
-        b = acopy(self.buffer[:end])
+        # reset moves the start of the buffer past these words, so
+        # they are not written again
+        b = self.buffer[:end]
+        self._exported = True
         self.reset(last)
         return b
 
@@ -417,7 +468,7 @@ class GkiBuffer:
                 if ip + 2 >= lenMC:
                     break
                 opcode = int(buffer[ip + 1])
-                arglen = buffer[ip + 2]
+                arglen = int(buffer[ip + 2])
                 if (ip + arglen) > lenMC:
                     break
                 self.lastTranslate = ip
@@ -478,6 +529,463 @@ class GkiReturnBuffer:
             raise Exception("Attempted read on empty gki input buffer")
 
 
+# **********************************************************************
+
+
+# opcodes that put something on the page
+_drawingOpcodes = (GKI_POLYLINE, GKI_POLYMARKER, GKI_TEXT, GKI_FILLAREA,
+                   GKI_PUTCELLARRAY)
+
+
+class MetacodeFile:
+    """Metacode file with an index of its pages
+
+    Pages are stored as self-describing records after a short file
+    header, so new pages are appended without rewriting the file:
+
+        file header   b'PYRAFGKI', int32 format version, int32 unused
+        page header   b'PAGE', int64 number of metacode words,
+                      int32 name length, int32 wcs length (bytes)
+        name          task name (utf-8, padded to an even length)
+        wcs           packed WCS (as from IrafGWcs.pack), may be empty
+        metacode      int16 words
+
+    Opening a file reads only the page headers to build the index (byte
+    offset, length, name and wcs of every page).  The metacode itself is
+    accessed through a numpy memory map, so getting page N reads just
+    that slice of the file.
+
+    Plain metacode files (as saved by older versions of PyRAF) can be
+    read too.  They are indexed by walking the instructions once,
+    starting a new page at each GKI_OPENWS or GKI_CLEARWS that follows
+    some drawing; they cannot be appended to.
+
+    mode is 'r' (read), 'a' (append, creating the file if needed) or
+    'w' (truncate).  With fname=None an anonymous temporary file is used.
+    """
+
+    MAGIC = b'PYRAFGKI'
+    VERSION = 1
+
+    _fileHeader = struct.Struct('<8sii')
+    _pageHeader = struct.Struct('<4sqii')
+
+    def __init__(self, fname=None, mode='r'):
+
+        if mode not in ('r', 'a', 'w'):
+            raise ValueError(f"Illegal mode {mode!r} for metacode file")
+        if fname is None:
+            self._fh = tempfile.TemporaryFile(prefix='pyrafgki')
+            mode = 'w'
+        elif mode == 'r':
+            self._fh = open(fname, 'rb')
+        elif mode == 'a' and os.path.exists(fname):
+            self._fh = open(fname, 'r+b')
+        else:
+            self._fh = open(fname, 'w+b')
+            mode = 'w'
+        self.name = fname
+        self.mode = mode
+        self.raw = False
+        # page index
+        self.offsets = []
+        self.lengths = []
+        self.names = []
+        self.wcs = []
+        self._map = None
+        if mode == 'w':
+            self._fh.write(self._fileHeader.pack(self.MAGIC, self.VERSION, 0))
+            self._end = self._fh.tell()
+        else:
+            self._readIndex()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._map = None
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def getPage(self, i):
+        """Return metacode of page i (a read-only view of the file)"""
+
+        n = self.lengths[i]
+        if n == 0:
+            return numpy.zeros(0, numpy.int16)
+        start = self.offsets[i] // 2
+        return self._getMap()[start:start + n]
+
+    def getName(self, i):
+        return self.names[i]
+
+    def getWcs(self, i):
+        """Return IrafGWcs of page i (None if not known)"""
+
+        packed = self.wcs[i]
+        if not packed:
+            return None
+        words = numpy.frombuffer(packed, numpy.int16)
+        wcs = irafgwcs.IrafGWcs()
+        wcs.set(numpy.concatenate(([len(words)], words)))
+        wcs.commit()
+        return wcs
+
+    def append(self, metacode, name="", wcs=None):
+        """Append a page (wcs may be an IrafGWcs, packed bytes or None)"""
+
+        if self.mode == 'r':
+            raise IrafError(f"Metacode file {self.name} is read-only")
+        if self.raw:
+            raise IrafError(f"Cannot append pages to plain metacode "
+                            f"file {self.name}")
+        metacode = numpy.asarray(metacode, dtype=numpy.int16)
+        if isinstance(wcs, irafgwcs.IrafGWcs):
+            wcs = wcs.pack() if wcs else b''
+        elif wcs is None:
+            wcs = b''
+        bname = name.encode('utf-8')
+        if len(bname) % 2:
+            bname = bname + b'\0'
+        fh = self._fh
+        # drop anything after the last complete page
+        fh.seek(self._end)
+        fh.truncate()
+        fh.write(self._pageHeader.pack(b'PAGE', len(metacode), len(bname),
+                                       len(wcs)))
+        fh.write(bname)
+        fh.write(wcs)
+        offset = fh.tell()
+        fh.write(metacode.tobytes())
+        fh.flush()
+        self._end = fh.tell()
+        self._addPage(offset, len(metacode), name, wcs)
+        # the file grew, map it again when needed
+        self._map = None
+
+    def _addPage(self, offset, length, name, wcs):
+        self.offsets.append(offset)
+        self.lengths.append(length)
+        self.names.append(name)
+        self.wcs.append(wcs)
+
+    def _getMap(self):
+        if self._map is None:
+            self._fh.flush()
+            self._fh.seek(0, 2)
+            nwords = self._fh.tell() // 2
+            self._map = numpy.memmap(self._fh,
+                                     dtype=numpy.int16,
+                                     mode='r',
+                                     shape=(nwords,))
+        return self._map
+
+    def _readIndex(self):
+
+        fh = self._fh
+        fh.seek(0, 2)
+        size = fh.tell()
+        fh.seek(0)
+        header = fh.read(self._fileHeader.size)
+        if len(header) < self._fileHeader.size or \
+                header[:len(self.MAGIC)] != self.MAGIC:
+            self.raw = True
+            self._end = size
+            if size >= 2:
+                self._indexRaw()
+            return
+        magic, version, unused = self._fileHeader.unpack(header)
+        if version > self.VERSION:
+            raise IrafError(f"Metacode file {self.name} has unsupported "
+                            f"format version {version}")
+        hsize = self._pageHeader.size
+        pos = self._end = len(header)
+        while pos + hsize <= size:
+            fh.seek(pos)
+            tag, nwords, nname, nwcs = self._pageHeader.unpack(fh.read(hsize))
+            if tag != b'PAGE':
+                raise IrafError(f"Corrupted metacode file {self.name} "
+                                f"(bad page header at byte {pos})")
+            offset = pos + hsize + nname + nwcs
+            if offset + 2 * nwords > size:
+                # incomplete last page
+                break
+            name = fh.read(nname).rstrip(b'\0').decode('utf-8', 'replace')
+            wcs = fh.read(nwcs)
+            self._addPage(offset, nwords, name, wcs)
+            pos = self._end = offset + 2 * nwords
+
+    def _indexRaw(self):
+
+        words = self._getMap()
+        nwords = len(words)
+        start = 0
+        drawn = False
+        wcs = b''
+        ip = 0
+        while ip + 2 < nwords:
+            if words[ip] != BOI:
+                ip = ip + 1
+                continue
+            opcode = words[ip + 1]
+            arglen = int(words[ip + 2])
+            if opcode in (GKI_OPENWS, GKI_CLEARWS) and drawn:
+                self._addPage(2 * start, ip - start, "", wcs)
+                start = ip
+                drawn = False
+            elif opcode in _drawingOpcodes:
+                drawn = True
+            elif opcode == GKI_SETWCS and ip + arglen <= nwords:
+                # argument is the struct length followed by the struct
+                wcs = words[ip + 4:ip + arglen].tobytes()
+            ip = ip + max(arglen, 3)
+        self._addPage(2 * start, nwords - start, "", wcs)
+
+
+class _SpilledPage:
+    """Page history entry whose metacode is in a MetacodeFile
+
+    This is either the spill file of the page history or a metacode
+    file loaded into the window.
+    """
+
+    def __init__(self, source, page, wcs, name, editHistory):
+        self.source = source
+        self.page = page
+        self.wcs = wcs
+        self.name = name
+        self.editHistory = editHistory
+
+
+class PageHistory:
+    """Page history of an interactive graphics window
+
+    This behaves like a list of (gkibuffer, wcs, name, otherHistory)
+    tuples, but only keeps a limited number of pages (maxLive) fully
+    in memory.  The least recently used pages beyond that budget keep
+    just their wcs and name; their metacode is appended to a spill
+    file and everything else (in particular the kernel specific
+    otherHistory) is dropped.  Getting a spilled page reads its
+    metacode back through a memory map and returns it with
+    otherHistory=None, telling the caller that the page has to be
+    re-rendered from the metacode (and stored again with __setitem__).
+    The last page (the one being plotted to) is never spilled.
+
+    A restored page remembers where its metacode came from, so spilling
+    it again without changes just reuses that copy.  Copies that are no
+    longer used are dropped by rewriting the spill file once it holds
+    more than twice as many pages as the history.
+
+    The default budget comes from the PYRAF_GRAPHICS_HISTORY environment
+    variable (number of pages, default 20).
+    """
+
+    DEFAULT_MAX_LIVE = 20
+
+    def __init__(self, pages=(), maxLive=None):
+
+        if maxLive is None:
+            try:
+                maxLive = int(
+                    os.environ.get('PYRAF_GRAPHICS_HISTORY',
+                                   self.DEFAULT_MAX_LIVE))
+            except ValueError:
+                maxLive = self.DEFAULT_MAX_LIVE
+        self.maxLive = max(1, maxLive)
+        # each item is a [page, lastUsed, origin] list where page is
+        # either a history tuple or a _SpilledPage and origin is the
+        # _SpilledPage a restored page was read from (or None)
+        self._pages = []
+        self._clock = 0
+        self._spillFile = None
+        # metacode files added with insertFile
+        self._files = []
+        for page in pages:
+            self.append(page)
+
+    def __len__(self):
+        return len(self._pages)
+
+    def _touch(self, item):
+        self._clock = self._clock + 1
+        item[1] = self._clock
+
+    def append(self, page):
+        item = [page, 0, None]
+        self._touch(item)
+        self._pages.append(item)
+        self._enforceBudget()
+
+    def __getitem__(self, i):
+        item = self._pages[i]
+        self._touch(item)
+        page = item[0]
+        if isinstance(page, _SpilledPage):
+            item[2] = page
+            page = (self._unspill(page), page.wcs, page.name, None)
+            item[0] = page
+            self._enforceBudget()
+        return page
+
+    def __setitem__(self, i, page):
+        item = self._pages[i]
+        item[0] = page
+        self._touch(item)
+        self._enforceBudget()
+
+    def __delitem__(self, i):
+        del self._pages[i]
+        self._closeFiles()
+        if not self._pages:
+            self.closeSpillFile()
+
+    def getName(self, i):
+        """Return task name for page i (does not restore spilled pages)"""
+        page = self._pages[i][0]
+        if isinstance(page, _SpilledPage):
+            return page.name
+        return page[2]
+
+    def isSpilled(self, i):
+        """Returns true if page i is currently in the spill file"""
+        return isinstance(self._pages[i][0], _SpilledPage)
+
+    def _enforceBudget(self):
+        live = [
+            item for item in self._pages[:-1]
+            if not isinstance(item[0], _SpilledPage)
+        ]
+        # the last page is always live
+        nspill = len(live) + 1 - self.maxLive
+        if nspill > 0:
+            live.sort(key=lambda item: item[1])
+            for item in live[:nspill]:
+                item[0] = self._spill(item[0], item[2])
+
+    def insertFile(self, i, mfile, pages=None, name=""):
+        """Insert pages of MetacodeFile mfile before page i
+
+        pages is a sequence of page numbers in mfile (default all).  The
+        pages are not restored until they are accessed.  Pages without a
+        name in the file get the given name.
+        """
+        if pages is None:
+            pages = range(len(mfile))
+        items = []
+        for j in pages:
+            wcs = mfile.getWcs(j) or irafgwcs.IrafGWcs()
+            page = _SpilledPage(mfile, j, wcs, mfile.getName(j) or name,
+                                EditHistory())
+            items.append([page, 0, None])
+        self._pages[i:i] = items
+        if mfile not in self._files:
+            self._files.append(mfile)
+
+    def getMetacode(self, i):
+        """Return (metacode, wcs, name) for page i
+
+        This does not restore spilled pages.
+        """
+        page = self._pages[i][0]
+        if isinstance(page, _SpilledPage):
+            return page.source.getPage(page.page), page.wcs, page.name
+        return page[0].get(), page[1], page[2]
+
+    def save(self, fname):
+        """Write all pages to metacode file fname
+
+        The pages go to a temporary file which then replaces fname, so
+        pages loaded from fname itself are still read correctly.
+        """
+        tmpname = f'{fname}.{os.getpid()}.tmp'
+        try:
+            with MetacodeFile(tmpname, 'w') as mfile:
+                for i in range(len(self)):
+                    metacode, wcs, name = self.getMetacode(i)
+                    if len(metacode):
+                        mfile.append(metacode, name, wcs)
+            os.replace(tmpname, fname)
+        except BaseException:
+            try:
+                os.remove(tmpname)
+            except OSError:
+                pass
+            raise
+
+    def _usesFile(self, mfile):
+        for item in self._pages:
+            if isinstance(item[0], _SpilledPage) and item[0].source is mfile:
+                return True
+            if item[2] is not None and item[2].source is mfile:
+                return True
+        return False
+
+    def _closeFiles(self):
+        """Close the metacode files no page is read from any more"""
+        for mfile in self._files[:]:
+            if not self._usesFile(mfile):
+                mfile.close()
+                self._files.remove(mfile)
+
+    def _spill(self, page, origin=None):
+        gkibuffer, wcs, name, otherHistory = page
+        metacode = gkibuffer.get()
+        if origin is not None and origin.source._fh is not None and \
+                numpy.array_equal(metacode,
+                                  origin.source.getPage(origin.page)):
+            # unchanged since it was restored, keep the old copy
+            return _SpilledPage(origin.source, origin.page, wcs, name,
+                                gkibuffer.editHistory)
+        if self._spillFile is None:
+            self._spillFile = MetacodeFile()
+        elif len(self._spillFile) >= 2 * len(self._pages):
+            self._compactSpillFile()
+        self._spillFile.append(metacode)
+        return _SpilledPage(self._spillFile,
+                            len(self._spillFile) - 1, wcs, name,
+                            gkibuffer.editHistory)
+
+    def _compactSpillFile(self):
+        """Copy the spill file pages still in use to a new spill file"""
+        old = self._spillFile
+        new = MetacodeFile()
+        for item in self._pages:
+            page = item[0]
+            if isinstance(page, _SpilledPage) and page.source is old:
+                new.append(old.getPage(page.page))
+                page.source = new
+                page.page = len(new) - 1
+            if item[2] is not None and item[2].source is old:
+                # restored pages read their copy when they are restored
+                item[2] = None
+        old.close()
+        self._spillFile = new
+
+    def _unspill(self, spilled):
+        metacode = spilled.source.getPage(spilled.page)
+        if len(metacode):
+            gkibuffer = GkiBuffer(acopy(metacode))
+        else:
+            gkibuffer = GkiBuffer()
+        gkibuffer.editHistory = spilled.editHistory
+        return gkibuffer
+
+    def closeSpillFile(self):
+        """Discard the spill file (only when no page uses it any more)"""
+        if self._spillFile is not None:
+            if self._usesFile(self._spillFile):
+                return
+            self._spillFile.close()
+            self._spillFile = None
+
+
 # stack of active IRAF tasks, used to identify source of plot
 tasknameStack = []
 
@@ -979,6 +1487,18 @@ class GkiController(GkiProxy):
     def openKernel(self, device=None):
         """Open kernel specified by device or by current value of stdgraph"""
         device = self.getDevice(device)
+        if device in mplFileDevices:
+            # headless matplotlib kernel, not described in graphcap
+            if device != self.lastDevice:
+                self.flush()
+                from . import GkiMplFile
+                self.stdgraph = GkiMplFile.GkiMplFileKernel(
+                    mplFileDevices[device])
+                self.stdin = self.stdgraph.stdin
+                self.stdout = self.stdgraph.stdout
+                self.stderr = self.stdgraph.stderr
+                self.lastDevice = device
+            return
         graphcap = getGraphcap()
 
         # In either of these 3 cases we want to create a new kernel.  The last
@@ -1012,6 +1532,8 @@ class GkiController(GkiProxy):
         the graphcap or isn't"""
         if not device:
             device = iraf.envget("stdgraph", "")
+        if device in mplFileDevices:
+            return device
         graphcap = getGraphcap()
         # protect against circular definitions
         devstr = device
@@ -1019,6 +1541,8 @@ class GkiController(GkiProxy):
         while devstr not in graphcap:
             pdevstr = devstr
             devstr = iraf.envget(pdevstr, "")
+            if devstr in mplFileDevices:
+                return devstr
             if not devstr:
                 raise IrafError("No entry found "
                                 f"for specified stdgraph device `{device}'")
@@ -1228,6 +1752,14 @@ class GkiNoisy(GkiKernel):
 
 graphcapDict = {}
 
+# stdgraph devices handled by the headless matplotlib kernel (GkiMplFile),
+# mapped to their output file format
+mplFileDevices = {
+    'mplpng': 'png',
+    'mplsvg': 'svg',
+    'mplpdf': 'pdf',
+}
+
 
 def getGraphcap(filename=None):
     """Get graphcap file from filename (or cached version if possible)"""
@@ -1238,6 +1770,26 @@ def getGraphcap(filename=None):
     return graphcapDict[filename]
 
 
+def render_files(paths, fmt='png', workers=None):
+    """Render saved metacode files to fmt ('png', 'svg' or 'pdf') files
+
+    Each metacode file is rendered by the headless matplotlib kernel
+    (see GkiMplFile), one output file per page, named after the metacode
+    file.  With workers > 1 the files are rendered in parallel by a pool
+    of that many processes.  Returns a list (one item per input path)
+    of the lists of files written.
+    """
+    from . import GkiMplFile
+    if isinstance(paths, str):
+        paths = [paths]
+    if workers is None or workers <= 1 or len(paths) <= 1:
+        return [GkiMplFile.renderFile(path, fmt) for path in paths]
+    import concurrent.futures
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        return list(
+            executor.map(GkiMplFile.renderFile, paths, [fmt] * len(paths)))
+
+
 # XXX printPlot belongs in gwm, not gki?
 # XXX or maybe should be a method of gwm window manager
 
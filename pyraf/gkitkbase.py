@@ -3,7 +3,6 @@ Tk gui implementation for the gki plot widget
 """
 
 
-import numpy
 import os
 import sys
 import time
@@ -212,7 +211,8 @@ class GkiInteractiveTkBase(gki.GkiKernel, wutil.FocusEntity):
         self.markerAttributes = gki.MarkerAttributes()
 
         self.StatusLine = gki.StatusLine(self.top.status, self.windowName)
-        self.history = [(self.gkibuffer, self.wcs, "", self.getHistory())]
+        self.history = gki.PageHistory(
+            [(self.gkibuffer, self.wcs, "", self.getHistory())])
         self._currentPage = 0
         # Master page variable, pageVar, any change to it is watched & acted on
         self.pageVar = tkinter.IntVar()
@@ -301,9 +301,9 @@ class GkiInteractiveTkBase(gki.GkiKernel, wutil.FocusEntity):
         os.chdir(curdir)  # in case file dlg moved us
         if not fname:
             return
-        fh = open(fname, 'wb')
-        fh.write(self.gkibuffer.get().tobytes())
-        fh.close()
+        # all pages of the history go in the file, with their task
+        # names and WCS, so they can be paged through after a load
+        self.history.save(fname)
 
     def load(self, fname=None):
         """Load metacode from a file"""
@@ -322,11 +322,22 @@ class GkiInteractiveTkBase(gki.GkiKernel, wutil.FocusEntity):
                 fd.DialogCleanup()
         if not fname:
             return
-        fh = open(fname, 'rb')
-        metacode = numpy.frombuffer(fh.read(), numpy.int16)
-        fh.close()
+        mfile = gki.MetacodeFile(fname)
+        if len(mfile) == 0:
+            mfile.close()
+            return
         self.clear(name=fname)
-        self.append(metacode, isUndoable=1)
+        # earlier pages are only translated when they are shown, the
+        # last one goes on the current page
+        last = len(mfile) - 1
+        self.history.insertFile(len(self.history) - 1, mfile, range(last),
+                                fname)
+        h = self.history[-1]
+        self.history[-1] = h[0:2] + (mfile.getName(last) or fname,) + h[3:]
+        self._currentPage = len(self.history) - 1
+        self.pageVar.set(self._currentPage)
+        self.bttnVar.set(self._currentPage)
+        self.append(mfile.getPage(last), isUndoable=1)
         self.forceNextDraw()
         self.redraw()
 
@@ -422,7 +433,8 @@ class GkiInteractiveTkBase(gki.GkiKernel, wutil.FocusEntity):
             self.gkibuffer.reset()
             self.clearPage()
             self.wcs.set()
-            self.history = [(self.gkibuffer, self.wcs, "", self.getHistory())]
+            self.history = gki.PageHistory(
+                [(self.gkibuffer, self.wcs, "", self.getHistory())])
         n = max(0, min(self._currentPage, len(self.history) - 1))
         # ensure that redraw happens
         self._currentPage = -1
@@ -437,7 +449,8 @@ class GkiInteractiveTkBase(gki.GkiKernel, wutil.FocusEntity):
             self.gkibuffer.reset()
             self.clearPage()
             self.wcs.set()
-            self.history = [(self.gkibuffer, self.wcs, "", self.getHistory())]
+            self.history = gki.PageHistory(
+                [(self.gkibuffer, self.wcs, "", self.getHistory())])
             # ensure that redraw happens
             self._currentPage = -1
             self.pageVar.set(0)
@@ -515,7 +528,7 @@ class GkiInteractiveTkBase(gki.GkiKernel, wutil.FocusEntity):
         pmin = max(0, pmin)
         h = self.history
         for i in range(pmin, pmax):
-            task = h[i][2]
+            task = h.getName(i)
             if i == pmin and pmin > 0:
                 label = f"<< {task}"
             elif i == pmax - 1 and pmax < lhis:
@@ -539,7 +552,15 @@ class GkiInteractiveTkBase(gki.GkiKernel, wutil.FocusEntity):
             self._currentPage = n
             self.gkibuffer, self.wcs, name, otherHistory = \
                 self.history[self._currentPage]
-            self.setHistory(otherHistory)
+            if otherHistory is None:
+                # page was spilled from the history, re-render it
+                self.startNewPage()
+                self.gkibuffer.prepareToRedraw()
+                gki.gkiTranslate(self.gkibuffer, self.redrawFunctionTable)
+                self.history[self._currentPage] = (self.gkibuffer, self.wcs,
+                                                   name, self.getHistory())
+            else:
+                self.setHistory(otherHistory)
             self.gRedraw()
             self.pageMenuInit()
 
@@ -806,7 +827,7 @@ class GkiInteractiveTkBase(gki.GkiKernel, wutil.FocusEntity):
                 self._toWriteAtNextClear = None
                 # note - this will only be seen for interactive task starts
             self.flush()
-        elif (self.history[-1][2] == "") and gki.tasknameStack:
+        elif (self.history.getName(-1) == "") and gki.tasknameStack:
             # plot is empty but so is name -- set name
             h = self.history[-1]
             self.history[-1] = h[0:2] + (gki.tasknameStack[-1],) + h[3:]
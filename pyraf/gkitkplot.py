@@ -2,6 +2,9 @@
 Tkplot implementation of the gki kernel class
 """
 
+import base64
+import struct
+import zlib
 import numpy
 import tkinter
 from . import wutil
@@ -13,6 +16,47 @@ from . import tkplottext
 
 TK_LINE_STYLE_PATTERNS = ['.', '.', '_', '.', '.._']
 
+# Polymarkers with at least this many points are drawn into a single
+# image item instead of one canvas item per point (the image needs
+# PNG support, which Tk has from version 8.6)
+MARKER_IMAGE_THRESHOLD = 200
+if tkinter.TkVersion < 8.6:
+    MARKER_IMAGE_THRESHOLD = None
+
+
+def _pngChunk(ctype, data):
+    crc = zlib.crc32(ctype + data) & 0xffffffff
+    return struct.pack('>I', len(data)) + ctype + data + struct.pack('>I', crc)
+
+
+def markerImageData(points, width, height, color):
+    """Return base64 PNG image data with the given pixels set
+
+    points is an (npts, 2) integer array of x, y pixel positions and
+    color is a Tk '#rrggbb' color string.  The image is width x height
+    pixels with a transparent background.  It uses a 1-bit palette,
+    so the cost of encoding depends on the image size and hardly on
+    the number of points.
+    """
+    x = points[:, 0]
+    y = points[:, 1]
+    inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+    mask = numpy.zeros((height, width), dtype=bool)
+    mask[y[inside], x[inside]] = True
+    rows = numpy.packbits(mask, axis=1)
+    # each row starts with a zero byte (no filter)
+    raw = numpy.zeros((height, rows.shape[1] + 1), dtype=numpy.uint8)
+    raw[:, 1:] = rows
+    png = (b'\x89PNG\r\n\x1a\n' +
+           _pngChunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 1, 3,
+                                          0, 0, 0)) +
+           _pngChunk(b'PLTE', b'\0\0\0' + bytes.fromhex(color[1:])) +
+           _pngChunk(b'tRNS', b'\0') +
+           _pngChunk(b'IDAT', zlib.compress(raw.tobytes(), 1)) +
+           _pngChunk(b'IEND', b''))
+    return base64.b64encode(png).decode('ascii')
+
+
 # -----------------------------------------------
 
 
@@ -26,6 +70,10 @@ class GkiTkplotKernel(gkitkbase.GkiInteractiveTkBase):
                                            width=width,
                                            height=height)
         self.gwidget.firstPlotDone = 0
+        # polymarker images on the canvas, and those of the previous
+        # redraw while a redraw is in progress
+        self._markerImages = {}
+        self._lastMarkerImages = {}
         self.colorManager = tkColorManager(self.irafGkiConfig)
         self.startNewPage()
         self._gcursorObject = gkigcur.Gcursor(self)
@@ -266,9 +314,15 @@ class GkiTkplotKernel(gkitkbase.GkiInteractiveTkBase):
         # Clear the screen
         self.tkplot_faset(0, 0)
         self.tkplot_fillarea(numpy.array([0., 0., 1., 0., 1., 1., 0., 1.]))
-        # Plot the current buffer
-        for (function, args) in self.drawBuffer.get():
-            function(*args)
+        # Plot the current buffer, reusing marker images that are drawn
+        # again at the same size
+        self._lastMarkerImages = self._markerImages
+        self._markerImages = {}
+        try:
+            for (function, args) in self.drawBuffer.get():
+                function(*args)
+        finally:
+            self._lastMarkerImages = {}
         self.gwidget.flush()
 
     # -----------------------------------------------
@@ -315,6 +369,10 @@ class GkiTkplotKernel(gkitkbase.GkiInteractiveTkBase):
                   (numpy.reshape(vertices,
                                  (npts, 2)) - numpy.array([0., 1.]))).astype(
                                      numpy.int32)
+        if MARKER_IMAGE_THRESHOLD is not None and \
+                npts >= MARKER_IMAGE_THRESHOLD:
+            self._markerImage(vertices, scaled, w, h, color)
+            return
         # Lack of intrinsic Tk point mode means that they must be explicitly
         # looped over.
         for i in range(npts):
@@ -325,6 +383,22 @@ class GkiTkplotKernel(gkitkbase.GkiInteractiveTkBase):
                                 fill=color,
                                 outline='')
 
+    def _markerImage(self, vertices, scaled, w, h, color):
+        """Draw the points as a single image item"""
+
+        key = id(vertices)
+        entry = self._markerImages.get(key) or self._lastMarkerImages.get(key)
+        if entry is None or entry[0] is not vertices or \
+                entry[1] != (w, h, color):
+            photo = tkinter.PhotoImage(master=self.gwidget,
+                                       data=markerImageData(
+                                           scaled, w, h, color),
+                                       format='png')
+            entry = (vertices, (w, h, color), photo)
+        # keep a reference, the image vanishes when photo is deleted
+        self._markerImages[key] = entry
+        self.gwidget.create_image(0, 0, image=entry[2], anchor=tkinter.NW)
+
     def tkplot_text(self, x, y, text):
 
         tkplottext.softText(self, x, y, text)
@@ -2,9 +2,14 @@
 """
 
 
+import os
+
 from .tools import compmixin
 from . import filecache
 
+# version of the cached device tables; change when resolveDevices changes
+_cacheVersion = 1
+
 
 def merge(inlines):
     out = []
@@ -77,6 +82,46 @@ def getDevices(devlist):
     return devices
 
 
+def resolveDevices(devices):
+    """Expand the tc= chains of a device dictionary
+
+    Returns a new dictionary in which each device has all the
+    attributes it inherits, so no chain needs to be followed to look
+    one up.  As in the graphcap, the first definition along the chain
+    wins.  Aliases of one entry share the same attribute dictionary.
+    """
+    resolved = {}
+    result = {}
+    for name, attributes in devices.items():
+        key = id(attributes)
+        if key not in resolved:
+            full = {}
+            seen = set()
+            entry = attributes
+            while entry is not None and id(entry) not in seen:
+                seen.add(id(entry))
+                for attrName, value in entry.items():
+                    full.setdefault(attrName, value)
+                entry = devices.get(entry.get('tc'))
+            resolved[key] = full
+        result[name] = resolved[key]
+    return result
+
+
+# The resolved device tables are cached with the clcache, keyed by the
+# absolute graphcap filename, so the graphcap is not parsed again until
+# it changes.
+def _getDeviceCache():
+    global deviceCache
+    if deviceCache is None:
+        deviceCache = filecache.openCache('graphcap', _cacheVersion)
+    return deviceCache
+
+
+# created on first use
+deviceCache = None
+
+
 class GraphCap(filecache.FileCache):
     """Graphcap class that automatically updates if file changes"""
 
@@ -85,10 +130,16 @@ class GraphCap(filecache.FileCache):
 
     def updateValue(self):
         """Called on init and if file changes"""
-        with open(self.filename, errors="ignore") as fh:
-            lines = fh.readlines()
-        mergedlines = merge(lines)
-        self.dict = getDevices(mergedlines)
+        stat = os.stat(self.filename)
+        cache = _getDeviceCache()
+        path = os.path.abspath(self.filename)
+        self.dict = cache.get(path, stat)
+        if self.dict is None:
+            with open(self.filename, errors="ignore") as fh:
+                lines = fh.readlines()
+            mergedlines = merge(lines)
+            self.dict = resolveDevices(getDevices(mergedlines))
+            cache.add(path, self.dict, stat)
 
     def getValue(self):
         return self.dict
@@ -119,19 +170,8 @@ class Device(compmixin.ComparableMixin):
         self.devname = devname
 
     def getAttribute(self, attrName):
-        thedict = self.dict[self.devname]
-        value = None
-        while True:
-            if attrName in thedict:
-                value = thedict[attrName]
-                break
-            else:
-                if 'tc' in thedict:
-                    nextdev = thedict['tc']
-                    thedict = self.dict[nextdev]
-                else:
-                    break
-        return value
+        # tc= chains were expanded when the graphcap was read
+        return self.dict[self.devname].get(attrName)
 
     def _compare(self, other, method):
         if isinstance(other, Device):
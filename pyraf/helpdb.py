@@ -0,0 +1,509 @@
+"""helpdb.py: Local index of the IRAF help databases
+
+The IRAF help task finds help pages through the help directory (.hd)
+files of each package, starting from the root.hd file next to each
+compiled help database listed in the helpdb variable.  HelpIndex reads
+those files, together with the package menu (.men) files that give the
+one-line description of each task, so that help pages can be found and
+searched without starting the IRAF help task.
+
+The index is kept in the CL cache directory (see clcache.py) and is
+rebuilt when any of the files it was built from changes.  Help pages
+are formatted by formatHelp, which handles the commonly used lroff
+directives.
+
+getHelpText and search are the functions used by irafhelp.
+"""
+
+import os
+import re
+import textwrap
+from collections import namedtuple
+
+from .tools.irafglobals import IrafError
+from . import iraf
+from . import filecache
+
+# version of the cached index; change when HelpIndex changes
+_indexVersion = 1
+
+HelpEntry = namedtuple('HelpEntry',
+                       ['package', 'name', 'hlp', 'men', 'src', 'description'])
+
+
+# -----------------------------------------------------
+# Help directory and menu files
+# -----------------------------------------------------
+
+_re_hdToken = re.compile(r'\s*(?:(?P<string>"[^"]*")|(?P<punct>[=,])|'
+                         r'(?P<word>[^\s=,"]+))')
+
+
+def _readHelpDir(filename):
+    """Parse help directory file
+
+    Returns tuple (variables, entries) where variables is a dictionary
+    with the $name = "value" definitions and entries is a list of
+    (name, {key: value}) tuples.
+    """
+
+    with open(filename, errors='ignore') as fh:
+        lines = [line.split('#', 1)[0] for line in fh]
+    text = ' '.join(lines)
+    tokens = []
+    for mm in _re_hdToken.finditer(text):
+        if mm.group('string') is not None:
+            tokens.append(('word', mm.group('string')[1:-1]))
+        elif mm.group('punct') is not None:
+            tokens.append((mm.group('punct'), None))
+        elif mm.group('word') is not None:
+            tokens.append(('word', mm.group('word')))
+    variables = {}
+    entries = []
+    i = 0
+    n = len(tokens)
+    while i < n:
+        ttype, name = tokens[i]
+        i += 1
+        if ttype != 'word':
+            continue
+        if name.startswith('$'):
+            # $name = "value"
+            if i + 1 < n and tokens[i][0] == '=':
+                variables[name[1:]] = tokens[i + 1][1] or ''
+                i += 2
+            continue
+        fields = {}
+        # key = value pairs, separated by commas
+        while i + 2 < n and tokens[i][0] == 'word' and \
+                tokens[i + 1][0] == '=':
+            fields[tokens[i][1]] = tokens[i + 2][1]
+            i += 3
+            if i < n and tokens[i][0] == ',':
+                i += 1
+            else:
+                break
+        entries.append((name, fields))
+    return variables, entries
+
+
+_re_menuLine = re.compile(r'\s*(\S+)\s+-\s+(.*\S)')
+
+
+def _readMenu(filename):
+    """Parse package menu file and return {task name: description}"""
+
+    descriptions = {}
+    with open(filename, errors='ignore') as fh:
+        for line in fh:
+            mm = _re_menuLine.match(line)
+            if mm:
+                descriptions[mm.group(1)] = mm.group(2)
+    return descriptions
+
+
+def _expandPath(value, variables, dirname):
+    """Return full path for a file named in a help directory file
+
+    Logical directories defined in the help directory files are
+    expanded first, then IRAF variables.  Other relative paths are
+    relative to the directory of the help directory file.
+    """
+
+    if not value or value == '..':
+        return None
+    for i in range(10):
+        mm = re.match(r'(\w+)\$(.*)', value)
+        if mm is None or mm.group(1) not in variables:
+            break
+        value = variables[mm.group(1)] + mm.group(2)
+    value = iraf.Expand(value, noerror=1)
+    if not os.path.isabs(value):
+        value = os.path.join(dirname, value)
+    return os.path.normpath(value)
+
+
+# -----------------------------------------------------
+# Help index
+# -----------------------------------------------------
+
+
+def _fileStat(filename):
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class HelpIndex:
+    """Index of the tasks and packages in a set of help databases
+
+    roots is a list of root help directory files.  The index records
+    the size and modification time of every file it was read from;
+    isCurrent() tells whether it is still up-to-date.
+    """
+
+    def __init__(self, roots):
+        self.roots = list(roots)
+        self.version = _indexVersion
+        self.files = {}
+        self.entries = []
+        self.names = {}
+        for root in self.roots:
+            self._addHelpDir(root, '', {}, {})
+
+    def _addFile(self, filename):
+        """Record filename and return true if it can be read"""
+        if filename in self.files:
+            return False
+        self.files[filename] = _fileStat(filename)
+        return self.files[filename] is not None
+
+    def _addHelpDir(self, filename, package, variables, descriptions):
+        if not self._addFile(filename):
+            return
+        try:
+            hdvars, hdentries = _readHelpDir(filename)
+        except OSError:
+            return
+        # logical directories are inherited by the package help dirs
+        variables = dict(variables)
+        variables.update(hdvars)
+        dirname = os.path.dirname(filename)
+        for name, fields in hdentries:
+            paths = {
+                key: _expandPath(fields.get(key), variables, dirname)
+                for key in ('hlp', 'men', 'src', 'pkg')
+            }
+            entry = HelpEntry(package, name, paths['hlp'], paths['men'],
+                              paths['src'], descriptions.get(name, ''))
+            self.names.setdefault(name, []).append(len(self.entries))
+            self.entries.append(entry)
+            if paths['pkg']:
+                pkgdescriptions = {}
+                if paths['men'] and self._addFile(paths['men']):
+                    try:
+                        pkgdescriptions = _readMenu(paths['men'])
+                    except OSError:
+                        pass
+                self._addHelpDir(paths['pkg'], name, variables,
+                                 pkgdescriptions)
+
+    def isCurrent(self):
+        """Return true if none of the files in the index has changed"""
+        if self.version != _indexVersion:
+            return False
+        for filename, stat in self.files.items():
+            if _fileStat(filename) != stat:
+                return False
+        return True
+
+    def lookup(self, name):
+        """Return list of entries for name (which may be package.name)"""
+        if '.' in name:
+            package, name = name.rsplit('.', 1)
+        else:
+            package = None
+        return [
+            self.entries[i] for i in self.names.get(name, ())
+            if package is None or self.entries[i].package == package
+        ]
+
+    def search(self, *keywords):
+        """Return entries whose name or description contains all keywords
+
+        The comparison ignores case.
+        """
+        keywords = [k.lower() for k in keywords]
+        found = []
+        for entry in self.entries:
+            text = f'{entry.name} {entry.description}'.lower()
+            if all(k in text for k in keywords):
+                found.append(entry)
+        return found
+
+
+def getRoots():
+    """Return list of root help directory files for the helpdb variable"""
+
+    roots = []
+    helpdb = iraf.envget('helpdb', '')
+    for db in helpdb.split(','):
+        db = db.strip()
+        if not db:
+            continue
+        db = iraf.Expand(db, noerror=1)
+        if not db.endswith('.hd'):
+            db = os.path.join(os.path.dirname(db), 'root.hd')
+        if os.path.exists(db):
+            roots.append(os.path.normpath(db))
+    return roots
+
+
+# created on first use
+indexStore = None
+_index = None
+
+
+def getIndex():
+    """Return HelpIndex for the current helpdb, rebuilding it if needed"""
+
+    global indexStore, _index
+    roots = getRoots()
+    if _index is not None and _index.roots == roots and _index.isCurrent():
+        return _index
+    if indexStore is None:
+        indexStore = filecache.openCache('helpindex', _indexVersion)
+    # the index checks the files it was built from itself
+    index = indexStore.get(repr(roots))
+    if not (isinstance(index, HelpIndex) and index.isCurrent()):
+        index = HelpIndex(roots)
+        indexStore.add(repr(roots), index)
+    _index = index
+    return index
+
+
+def search(*keywords):
+    """Return help entries with names or descriptions matching keywords"""
+
+    return getIndex().search(*keywords)
+
+
+# -----------------------------------------------------
+# Help text
+# -----------------------------------------------------
+
+
+def findHelpFile(taskname):
+    """Return (help file, menu file, name) for taskname or None
+
+    taskname may be an IrafTask object, a task or package name or the
+    name of a help file.  One of help file and menu file is None; name
+    selects the .help block in the help file.  Tasks that are not in
+    the help database get their help from a .hlp file next to the task
+    file.
+    """
+
+    if isinstance(taskname, str):
+        filename = iraf.Expand(taskname, noerror=1)
+        if os.path.isfile(filename):
+            return filename, None, None
+        task = None
+        name = taskname
+    else:
+        task = taskname
+        name = task.getName()
+        if task.getPkgname():
+            name = f'{task.getPkgname()}.{name}'
+    index = getIndex()
+    entries = index.lookup(name)
+    if not entries and '.' in name:
+        entries = index.lookup(name.rsplit('.', 1)[1])
+    for entry in entries:
+        if entry.hlp and os.path.isfile(entry.hlp):
+            return entry.hlp, None, entry.name
+        if entry.men and os.path.isfile(entry.men):
+            return None, entry.men, entry.name
+    try:
+        if task is None:
+            task = iraf.getTask(name)
+        filename = task.getFullpath()
+    except (KeyError, IrafError, AttributeError):
+        return None
+    if filename:
+        filename = os.path.splitext(filename)[0] + '.hlp'
+        if os.path.isfile(filename):
+            return filename, None, task.getName()
+    return None
+
+
+def getHelpText(taskname, section='all', lmargin=1, rmargin=72):
+    """Return formatted help text for taskname or None if not found
+
+    The help for a package is its menu.
+    """
+
+    found = findHelpFile(taskname)
+    if found is None:
+        return None
+    filename, menu, name = found
+    with open(filename or menu, errors='ignore') as fh:
+        text = fh.read()
+    if menu:
+        return text
+    return formatHelp(text.splitlines(), name, section=section,
+                      lmargin=lmargin, rmargin=rmargin)
+
+
+# -----------------------------------------------------
+# lroff formatter
+# -----------------------------------------------------
+
+_re_font = re.compile(r'\\f[BIRP]')
+
+
+def _helpBlocks(lines):
+    """Return list of (header fields, lines) for .help blocks in lines"""
+
+    blocks = []
+    current = None
+    for line in lines:
+        if line.startswith('.help'):
+            current = (line.split()[1:], [])
+            blocks.append(current)
+        elif line.startswith('.endhelp'):
+            current = None
+        elif current is not None:
+            current[1].append(line)
+    return blocks
+
+
+def formatHelp(lines, name=None, section='all', lmargin=1, rmargin=72):
+    """Format help text in lroff format
+
+    lines is a list of lines from a help file.  The .help block for
+    task name is formatted (the first one if there is none for name).
+    If section is not 'all', only the .ih sections whose heading
+    starts with section (ignoring case) are included.
+    """
+
+    blocks = _helpBlocks(lines)
+    if not blocks:
+        return '\n'.join(lines) + '\n'
+    header, body = blocks[0]
+    if name:
+        for h, b in blocks:
+            if h and name.lower() in h[0].lower().split(','):
+                header, body = h, b
+                break
+    out = []
+    if header and section == 'all':
+        title = header[0].split(',')[0].upper()
+        if len(header) > 1:
+            title = f'{title} ({header[1]})'
+        middle = header[2] if len(header) > 2 else ''
+        width = rmargin - lmargin + 1
+        pad = max(width - 2 * len(title) - len(middle), 2)
+        out.append(' ' * (lmargin - 1) + title + ' ' * (pad // 2) + middle +
+                   ' ' * (pad - pad // 2) + title)
+        out.append('')
+    formatter = _Lroff(out, lmargin, rmargin)
+    include = section == 'all'
+    section = section.lower()
+    lines = iter(body)
+    for line in lines:
+        line = _re_font.sub('', line)
+        if line.startswith('.ih'):
+            heading = next(lines, '').strip()
+            if section != 'all':
+                include = heading.lower().startswith(section)
+            if include:
+                formatter.heading(heading)
+            continue
+        if include:
+            formatter.line(line)
+    formatter.breakLine()
+    return '\n'.join(out) + '\n'
+
+
+class _Lroff:
+    """Output state of the lroff formatter"""
+
+    # indentation of section text and of .ls blocks
+    sectionIndent = 4
+    listIndent = 4
+
+    def __init__(self, out, lmargin, rmargin):
+        self.out = out
+        self.lmargin = lmargin - 1
+        self.rmargin = rmargin
+        self.indent = 0
+        self.indentStack = []
+        self.fill = True
+        self.center = 0
+        self.words = []
+
+    def breakLine(self):
+        if self.words:
+            prefix = ' ' * (self.lmargin + self.indent)
+            width = max(self.rmargin - len(prefix), 20)
+            self.out.extend(
+                textwrap.wrap(' '.join(self.words), width,
+                              initial_indent=prefix,
+                              subsequent_indent=prefix,
+                              break_on_hyphens=False))
+            self.words = []
+
+    def blank(self, n=1):
+        self.breakLine()
+        for i in range(n):
+            self.out.append('')
+
+    def heading(self, text):
+        self.blank()
+        self.indentStack = []
+        self.fill = True
+        self.out.append(' ' * self.lmargin + text.upper())
+        self.indent = self.sectionIndent
+
+    def line(self, line):
+        if line.startswith('.') and re.match(r'\.[a-z][a-z]\b', line):
+            self.request(line[1:3], line[3:].strip())
+        elif self.center:
+            self.breakLine()
+            width = self.rmargin - self.lmargin
+            self.out.append(' ' * self.lmargin + line.strip().center(width))
+            self.center -= 1
+        elif not self.fill:
+            self.out.append(' ' * (self.lmargin + self.indent) + line)
+        elif not line.strip():
+            self.blank()
+        else:
+            if line[:1].isspace():
+                self.breakLine()
+            self.words.extend(line.split())
+
+    def request(self, name, arg):
+        if name == 'nf':
+            self.breakLine()
+            self.fill = False
+        elif name == 'fi':
+            self.fill = True
+        elif name == 'br':
+            self.breakLine()
+        elif name == 'sp':
+            self.blank(int(arg) if arg.isdigit() else 1)
+        elif name == 'ce':
+            self.center = int(arg) if arg.isdigit() else 1
+        elif name in ('sh', 'nh'):
+            self.blank()
+            self.out.append(' ' * self.lmargin + arg.upper())
+        elif name == 'in':
+            self.breakLine()
+            if arg.isdigit():
+                self.indent = self.sectionIndent + int(arg)
+        elif name == 'ls':
+            self.blank()
+            # optional indentation precedes the label
+            parts = arg.split(None, 1)
+            step = self.listIndent
+            if parts and parts[0].isdigit():
+                step = int(parts[0])
+                arg = parts[1] if len(parts) > 1 else ''
+            if arg:
+                self.out.append(' ' * (self.lmargin + self.indent) +
+                                _unquote(arg))
+            self.indentStack.append(self.indent)
+            self.indent += step
+        elif name == 'le':
+            self.breakLine()
+            if self.indentStack:
+                self.indent = self.indentStack.pop()
+        # other requests only affect pagination
+
+
+def _unquote(s):
+    if len(s) > 1 and s[0] == s[-1] == '"':
+        return s[1:-1]
+    return s
@@ -14,12 +14,14 @@ RLW, 2000 February 13
 """
 
 
+import bisect
 import builtins
 import __main__
 import re
 import keyword
 import glob
 import os
+import time
 from . import iraf
 from .tools import minmatch
 try:
@@ -68,6 +70,83 @@ pkgArgDict = {
 completer = None
 
 
+class NameIndex:
+    """Sorted list of names for fast prefix matching
+
+    update() brings the index in line with a new collection of names
+    by inserting and removing only the names that changed, so keeping
+    the index for a namespace current costs much less than scanning
+    the namespace for every completion.
+    """
+
+    def __init__(self, names=()):
+        self.nameSet = set(names)
+        self.names = sorted(self.nameSet)
+
+    def update(self, names):
+        """Make the index hold the names in the set-like object names"""
+        if len(names) == len(self.nameSet) and names == self.nameSet:
+            # the usual case, checked without building a new set
+            return
+        added = names - self.nameSet
+        removed = self.nameSet.difference(names)
+        for name in removed:
+            del self.names[bisect.bisect_left(self.names, name)]
+        self.nameSet -= removed
+        for name in added:
+            if isinstance(name, str):
+                bisect.insort(self.names, name)
+                self.nameSet.add(name)
+
+    def matches(self, prefix):
+        """Return list of names that start with prefix"""
+        names = self.names
+        i = j = bisect.bisect_left(names, prefix)
+        n = len(names)
+        while j < n and names[j].startswith(prefix):
+            j += 1
+        return names[i:j]
+
+
+# directory listings are reused for this many seconds if the
+# modification time of the directory has not changed
+dirCacheTime = 2.0
+# directory -> (time listed, mtime, names, directory flags)
+_dirCache = {}
+
+
+def _listDir(dirname):
+    """Return (names, isdir flags) for directory, both sorted by name"""
+    now = time.monotonic()
+    try:
+        mtime = os.stat(dirname).st_mtime_ns
+    except OSError:
+        return [], []
+    entry = _dirCache.get(dirname)
+    if entry is not None and now - entry[0] < dirCacheTime and \
+            entry[1] == mtime:
+        return entry[2], entry[3]
+    files = []
+    try:
+        with os.scandir(dirname) as it:
+            for f in it:
+                try:
+                    files.append((f.name, f.is_dir()))
+                except OSError:
+                    files.append((f.name, False))
+    except OSError:
+        return [], []
+    files.sort()
+    names = [f[0] for f in files]
+    isdirs = [f[1] for f in files]
+    if len(_dirCache) > 100:
+        for key in [k for k, v in _dirCache.items()
+                    if now - v[0] >= dirCacheTime]:
+            del _dirCache[key]
+    _dirCache[dirname] = (now, mtime, names, isdirs)
+    return names, isdirs
+
+
 class IrafCompleter(Completer):
 
     def __init__(self):
@@ -82,6 +161,11 @@ class IrafCompleter(Completer):
                                   r'"])')
         # executive commands dictionary (must be set by user)
         self.executiveDict = minmatch.MinMatchDict()
+        # names for primary matches, brought up-to-date by update()
+        # before each use
+        self.keywordIndex = NameIndex(keyword.kwlist)
+        self.builtinIndex = NameIndex()
+        self.mainIndex = NameIndex()
 
     def complete(self, text, state):
         """Return the next possible completion for 'text'."""
@@ -169,16 +253,11 @@ class IrafCompleter(Completer):
 
     def primary_matches(self, text):
         """Return matches when text is at beginning of the line"""
-        matches = []
-        n = len(text)
-        for list_ in [
-                keyword.kwlist,
-                builtins.__dict__.keys(),
-                __main__.__dict__.keys()
-        ]:
-            for word in list_:
-                if word[:n] == text:
-                    matches.append(word)
+        matches = self.keywordIndex.matches(text)
+        self.builtinIndex.update(builtins.__dict__.keys())
+        matches.extend(self.builtinIndex.matches(text))
+        self.mainIndex.update(__main__.__dict__.keys())
+        matches.extend(self.mainIndex.matches(text))
         # IRAF module functions
         matches.extend(iraf.getAllMatches(text))
         return matches
@@ -276,16 +355,20 @@ class IrafCompleter(Completer):
         # note this works whether the expanded dir variable is
         # actually a directory (with a slash at the end) or not
 
-        flist = glob.glob(dir_ + text + '*')
-
-        # Strip path and append / to directories
+        path = dir_ + text
+        head, prefix = os.path.split(path)
+        names, isdirs = _listDir(head or os.curdir)
+        # the part of path before the file name, as it was typed
+        head = path[:len(path) - len(prefix)]
         l = len(dir_)
-        for i in range(len(flist)):
-            s = flist[i]
-            if os.path.isdir(s):
-                flist[i] = s[l:] + os.sep
-            else:
-                flist[i] = s[l:]
+        flist = []
+        i = bisect.bisect_left(names, prefix)
+        while i < len(names) and names[i].startswith(prefix):
+            # like glob, hidden files only match an explicit dot
+            if prefix or names[i][:1] != '.':
+                s = (head + names[i])[l:]
+                flist.append(s + os.sep if isdirs[i] else s)
+            i += 1
 
         # If only a single directory matches, get a list of the files
         # in the directory too.  This has the side benefit of suppressing
@@ -2,28 +2,52 @@
 
 
 
-import inspect
+import bisect
 import sys
 from .tools.irafglobals import Verbose
 from . import pyrafglobals
 from . import iraftask
 from . import irafexecute
 from . import iraf
+from . import cllinecache
 
 executionMonitor = None
 
 
+class _EclCall:
+    """One task invocation on the ECL task execution stack"""
+
+    __slots__ = ('task', 'state', 'running')
+
+    def __init__(self, task):
+        self.task = task
+        self.state = None
+        self.running = True
+
+
+# Tasks being executed by EclBase.run, innermost last.  The compiled
+# code of a CL procedure attaches its EclState to the top entry.
+_callStack = []
+
+
 class EclState:
     """An object which records the ECL state for one invocation of a CL proc:
 
     1. The procedure's linemap converting Python line numberss to CL line numbers.
 
     2. A mutable counter for tracking iferr blocking.
+
+    3. The frame executing the procedure, for its current line number.
     """
 
     def __init__(self, linemap):
         self._value = 0
         self._linemap = linemap
+        # sorted Python and CL line numbers, made by the first getLineno
+        self._lineIndex = None
+        self._frame = sys._getframe(1)
+        if _callStack and _callStack[-1].state is None:
+            _callStack[-1].state = self
 
     def __iadd__(self, value):
         self._value += value
@@ -32,6 +56,29 @@ class EclState:
     def __int__(self):
         return self._value
 
+    def getLineno(self):
+        """Return the CL line number being executed by the procedure
+
+        Python lines without an entry of their own belong to the
+        closest mapped line before them.
+        """
+        if self._lineIndex is None:
+            pylines = sorted(self._linemap)
+            self._lineIndex = (pylines, [self._linemap[k] for k in pylines])
+        pylines, cllines = self._lineIndex
+        i = bisect.bisect_right(pylines, self._frame.f_lineno) - 1
+        if i < 0:
+            return 0
+        return cllines[i] or 0
+
+
+def _ecl_running_call():
+    """Returns the innermost _EclCall whose task is still executing"""
+    for call in reversed(_callStack):
+        if call.running:
+            return call
+    return None
+
 
 def getTaskModule():
     """Returns the module which supplies Task classes for the current
@@ -101,45 +148,14 @@ class Erract:
 
 erract = Erract()
 
-# IrafExecute --> IrafTask._run --> IrafTask.run
-# user_code --> IrafPyTask._run  --> IrafTask.run
-
-
-def _ecl_runframe(frame):
-    """Determines if frame corresponds to an IrafTask._run() method call."""
-    # print "runframe:",frame.f_code.co_name
-    if frame.f_code.co_name != "_run":  # XXXX necessary but not sufficient
-        return False
-    return True
-
-
 def _ecl_parent_task():
-    """Returns the local variables of the task which called this one.
+    """Returns the innermost task which is still executing (the caller of a
+    task that has just finished), or the cl task.
     """
-    f = inspect.currentframe()
-    while f and not _ecl_runframe(f):
-        f = f.f_back
-    if not f:
+    call = _ecl_running_call()
+    if call is None:
         return iraf.cl
-    return f.f_locals["self"]
-
-
-def _ecl_interpreted_frame(frame=None):
-    """Returns the stack frame corresponding to the executing Python code of
-    the nearest enclosing CL task.
-    """
-    if frame is None:
-        f = inspect.currentframe()
-    else:
-        f = frame
-    priors = []
-    while f and not _ecl_runframe(f):
-        priors.append(f)
-        f = f.f_back
-    if len(priors) >= 2:
-        return priors[-2]
-    else:
-        return None
+    return call.task
 
 
 class EclBase:
@@ -161,6 +177,7 @@ class EclBase:
     def run(self, *args, **kw):  # OVERRIDE IrafTask.run
         """Execute this task with the specified arguments"""
 
+        iraftask._flushDueParLists()
         self.initTask(force=1)
 
         # Special _save keyword turns on parameter-saving.
@@ -196,7 +213,9 @@ class EclBase:
 
         self._ecl_clear_error_params()
 
-        def _runcore():
+        call = _EclCall(self)
+        _callStack.append(call)
+        try:
             try:
                 # Hook for execution monitor
                 if executionMonitor:
@@ -206,6 +225,7 @@ class EclBase:
                 if Verbose > 1:
                     print('Successful task termination', file=sys.stderr)
             finally:
+                call.running = False
                 rv = self._resetRedir(resetList, closeFHList)
                 self._deleteRunningParList()
                 if self._parDictList:
@@ -213,15 +233,15 @@ class EclBase:
                 if executionMonitor:
                     executionMonitor()
             return rv
-
-        # if self._ecl_iferr_entered() and
-        if erract.ecl:
-            try:
-                return _runcore()
-            except Exception as e:
-                self._ecl_handle_error(e)
-        else:
-            return _runcore()
+        except Exception as e:
+            if not erract.ecl:
+                raise
+            self._ecl_handle_error(e)
+        finally:
+            del _callStack[-1]
+            if call.state is not None:
+                # break the reference cycle through the frame locals
+                call.state._frame = None
 
     def _run(self, redirKW, specialKW):
         # OVERRIDE IrafTask._run for primitive (SPP, C, etc.) tasks to avoid exception trap.
@@ -233,7 +253,8 @@ class EclBase:
         block nesting.
         """
         s = self._ecl_state()
-        s += 1
+        if s is not None:
+            s += 1
         self._ecl_set_error_params(0, '', '')
 
     def _ecl_pop_err(self):
@@ -242,7 +263,8 @@ class EclBase:
         error occurred.  Decrements local iferr state counter to track block nesting.
         """
         s = self._ecl_state()
-        s += -1
+        if s is not None:
+            s += -1
         return self.DOLLARerrno
 
     def _ecl_handle_error(self, e):
@@ -295,29 +317,27 @@ class EclBase:
             text = str(e)
         return text
 
-    def _ecl_get_lineno(self, frame=None):
-        """_ecl_get_lineno fetches the innermost frame of Python code compiled from a CL task.
-        and then translates the current line number in that frame into it's CL line number
-        and returns it.
+    def _ecl_get_lineno(self, call=None):
+        """_ecl_get_lineno returns the CL line number being executed by the
+        innermost running CL task (or by the task invocation call).
         """
-        try:
-            f = _ecl_interpreted_frame(frame)
-            map = f.f_locals["_ecl"]._linemap
-            return map[f.f_lineno]
-        except:
+        if call is None:
+            call = _ecl_running_call()
+        if call is None or call.state is None:
             return 0
+        return call.state.getLineno()
 
-    def _ecl_state(self, frame=None):
+    def _ecl_state(self):
         """returns the EclState object corresponding to this task invocation."""
-        locals = _ecl_interpreted_frame(frame).f_locals
-        return locals["_ecl"]
+        call = _ecl_running_call()
+        if call is None:
+            return None
+        return call.state
 
     def _ecl_iferr_entered(self):
         """returns True iff the current invocation of the task self is in an iferr or ifnoerr guarded block."""
-        try:
-            return int(self._ecl_state()) > 0
-        except KeyError:
-            return False
+        s = self._ecl_state()
+        return s is not None and int(s) > 0
 
     def _ecl_safe_divide(self, a, b):
         """_ecl_safe_divide is used to wrap the division operator for ECL code and trap divide-by-zero errors."""
@@ -382,12 +402,12 @@ class EclTraceback(EclBase):
         pass
 
     def _ecl_traceback(self, e):
-        raising_frame = inspect.trace()[-1][0]
-        lineno = self._ecl_get_lineno(frame=raising_frame)
+        # the failed task is on top of the call stack, its caller is the
+        # innermost task still running
+        lineno = self._ecl_get_lineno(_callStack[-1])
         cl_file = self.getFilename()
         try:
-            with open(cl_file, errors="ignore") as fh:
-                cl_code = fh.readlines()[lineno - 1].strip()
+            cl_code = _ecl_source_line(cl_file, lineno)
         except OSError:
             cl_code = "<source code not available>"
         if hasattr(e, "_ecl_suppress_first_trace") and \
@@ -396,18 +416,25 @@ class EclTraceback(EclBase):
         else:
             self._ecl_trace("  ", repr(cl_code))
         self._ecl_trace(f"      line {lineno:d}: {cl_file}")
-        parent = _ecl_parent_task()
-        if parent:
-            parent_lineno = self._ecl_get_lineno()
-            parent_file = parent.getFilename()
+        call = _ecl_running_call()
+        if call is not None:
+            parent_lineno = self._ecl_get_lineno(call)
+            parent_file = call.task.getFilename()
             try:
-                with open(parent_file, errors="ignore") as fh:
-                    parent_code = fh.readlines()[parent_lineno - 1].strip()
+                parent_code = _ecl_source_line(parent_file, parent_lineno)
                 self._ecl_trace("      called as:", repr(parent_code))
             except:
                 pass
 
 
+def _ecl_source_line(filename, lineno):
+    """Returns line lineno (stripped) of CL source file filename"""
+    lines = cllinecache.getCLlines(filename)
+    if 0 < lineno <= len(lines):
+        return lines[lineno - 1].strip()
+    return ""
+
+
 ## The following classes exist as "ECL enabled" drop in replacements for the original
 ## PyRAF task classes.  I factored things this way in an attempt to minimize the impact
 ## of ECL changes on ordinary PyRAF CL.
@@ -19,10 +19,23 @@ from . import irafukey
 from . import irafgwcs
 from . import iraf
 
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
 # stdgraph = None
 
 IPC_PREFIX = b'P\x02'
 
+# Tasks may ask for a shared memory segment (shmget message) and then
+# pass bulk xmit/xfer data through it instead of the pipe.  Data of at
+# least shmThreshold bytes goes through the segment; set it to None to
+# refuse all requests, so tasks fall back to the pipe.  Segments larger
+# than shmMaxSize are refused too.
+shmThreshold = 1 << 16
+shmMaxSize = 1 << 28
+
 # weirdo protocol to get output from task back to subprocess
 # definitions from cl/task.h and lib/clio.h
 IPCOUT = "IPC$IPCIO-OUT"
@@ -404,6 +417,10 @@ class IrafProcess:
         self.stdoutIsatty = 0
         self.envVarList = []
         self.par_set_msg_buf = ''
+        # IPC records waiting to be sent, see write() and flush()
+        self.outbuf = []
+        # shared memory segment requested by the task, see shmget()
+        self.shm = None
 
     def initialize(self, envdict):
         """Initialization: Copy environment variables to process"""
@@ -511,10 +528,12 @@ class IrafProcess:
         #   Wait briefly for EOF, which signals task is done
         #   Kill it anyway if it is still hanging around
 
+        self.shmClose()
         if not self.process.pid:
             return  # no need, process gone
         try:
             self.writeString("bye\n")
+            self.flush()
             if self.process.wait(0.5):
                 return
         except (IrafProcessError, subproc.SubprocessError):
@@ -535,7 +554,9 @@ class IrafProcess:
         # blow it away. Copied with minor mods from subproc.py.
 
         if not self.process.pid:
-            return  # no need, process gone
+            # no need, process gone, but the segment may be left
+            self.shmClose()
+            return
 
         self.stdout.flush()
         self.stderr.flush()
@@ -563,27 +584,38 @@ class IrafProcess:
         return Iraf2Bytes(self.read()).decode()
 
     def write(self, data):
-        """write binary data to IRAF process in blocks of <= 4096 bytes"""
+        """write binary data to IRAF process in blocks of <= 4096 bytes
+
+        The records are collected in self.outbuf and sent together by
+        flush(), which is called before waiting for the next message
+        from the process, so each protocol turn takes a single write.
+        """
 
-        i = 0
+        data = memoryview(data)
         block = 4096
-        try:
-            while i < len(data):
-                # Write:
-                #  IRAF magic number
-                #  number of following bytes
-                #  data
-                dsection = data[i:i + block]
-                # the arg parts to the following are all type bytes in PY3K
-                self.process.write(IPC_PREFIX +
-                                   struct.pack('=h', len(dsection)) +
-                                   dsection)
-                i = i + block
-        except subproc.SubprocessError as e:
-            raise IrafProcessError(f"Error in write: {str(e)}")
+        for i in range(0, len(data), block):
+            # Write:
+            #  IRAF magic number
+            #  number of following bytes
+            #  data
+            dsection = data[i:i + block]
+            self.outbuf.append(IPC_PREFIX + struct.pack('=h', len(dsection)))
+            self.outbuf.append(dsection)
+
+    def flush(self):
+        """Send the records collected by write() to the IRAF process"""
+
+        if self.outbuf:
+            data = b''.join(self.outbuf)
+            self.outbuf = []
+            try:
+                self.process.write(data)
+            except subproc.SubprocessError as e:
+                raise IrafProcessError(f"Error in write: {str(e)}")
 
     def read(self):
         """Read binary data from IRAF pipe"""
+        self.flush()
         try:
             # read pipe header first (self.process is subproc.Subprocess)
             header = self.process.read(4)  # read returns bytes
@@ -629,6 +661,12 @@ class IrafProcess:
                 xmit()
             elif msg[:4] == 'bye\n':
                 return
+            elif msg[:8] == 'shmxfer(':
+                xfer(shm=True)
+            elif msg[:8] == 'shmxmit(':
+                xmit(shm=True)
+            elif msg[:7] == 'shmget(':
+                self.shmget()
             elif msg5 in ['error', 'ERROR']:
                 errno, text = self._scanErrno(msg)
                 raise IrafProcessError("IRAF task terminated abnormally\n" +
@@ -766,13 +804,70 @@ class IrafProcess:
                 self.stderr.flush()
             self.task.setParam(paramname, newvalue, check=0)
 
-    def xmit(self):
-        """Handle xmit data transmissions"""
+    def shmget(self):
+        """Handle shmget(nbytes) request for a shared memory segment
+
+        Creates a segment of at least nbytes (replacing any previous
+        one) and replies with its name for shm_open and the size
+        threshold, "/name threshold\\n".  The reply is an empty line if
+        shared memory is disabled or unavailable.
+        """
+
+        msg = self.msg
+        try:
+            if msg[-2:] != ")\n":
+                raise ValueError()
+            nbytes = int(msg[7:-2])
+            self.msg = ''
+        except ValueError:
+            raise IrafProcessError(f"Illegal message format `{msg}'")
+        self.shmClose()
+        reply = ''
+        if (shmThreshold is not None and shared_memory is not None and
+                0 < nbytes <= shmMaxSize):
+            try:
+                self.shm = shared_memory.SharedMemory(create=True,
+                                                      size=nbytes)
+                reply = f'/{self.shm.name} {shmThreshold:d}'
+            except (OSError, ValueError):
+                # no shared memory here, the task uses the pipe
+                self.shm = None
+        self.writeString(reply + '\n')
+
+    def shmClose(self):
+        """Release the shared memory segment, if any"""
+
+        if self.shm is not None:
+            shm = self.shm
+            self.shm = None
+            shm.close()
+            try:
+                shm.unlink()
+            except OSError:
+                pass
+
+    def _shmRead(self, nbytes):
+        """Return a copy of the first nbytes in the shared memory segment"""
+
+        if self.shm is None or nbytes > self.shm.size:
+            raise IrafProcessError("Shared memory transfer of "
+                                   f"{nbytes:d} bytes without a segment")
+        return bytes(self.shm.buf[:nbytes])
+
+    def xmit(self, shm=False):
+        """Handle xmit data transmissions
+
+        For shmxmit the data is in the shared memory segment rather than
+        in a record following the message.
+        """
 
         chan, nbytes = self.chanbytes()
 
         checkForEscapeSeq = (chan == 4 and (nbytes == 6 or nbytes == 5))
-        xdata = self.read()
+        if shm:
+            xdata = self._shmRead(2 * nbytes)
+        else:
+            xdata = self.read()
 
         if len(xdata) != 2 * nbytes:
             raise IrafProcessError("Error, wrong number of bytes read\n"
@@ -857,8 +952,12 @@ class IrafProcess:
             self.stdout.write(f"data for channel {chan:d}\n")
             self.stdout.flush()
 
-    def xfer(self):
-        """Handle xfer data requests"""
+    def xfer(self, shm=False):
+        """Handle xfer data requests
+
+        For shmxfer a line of at least shmThreshold bytes is put in the
+        shared memory segment and its data record is sent empty.
+        """
 
         chan, nbytes = self.chanbytes()
         nchars = nbytes // 2
@@ -908,32 +1007,46 @@ class IrafProcess:
             if not self.stdinIsraw:
                 if len(line) <= nchars:
                     # short line
-                    self.writeString(str(len(line)))
-                    self.writeString(line)
+                    self._xferLine(line, shm)
                     self.xferline = ''
                 else:
                     # long line
-                    self.writeString(str(nchars))
-                    self.writeString(line[:nchars])
+                    self._xferLine(line[:nchars], shm)
                     self.xferline = line[nchars:]
             else:
-                self.writeString(str(len(line)))
-                self.writeString(line)
+                self._xferLine(line, shm)
                 self.xferline = ''
         else:
             raise IrafProcessError(f"xfer request for unknown channel {chan:d}")
 
+    def _xferLine(self, line, shm):
+        """Send the length and data records of an xfer reply"""
+
+        self.writeString(str(len(line)))
+        if isinstance(line, str):
+            line = line.encode()
+        data = Bytes2Iraf(line)
+        if (shm and self.shm is not None and shmThreshold is not None and
+                shmThreshold <= len(data) <= self.shm.size):
+            self.shm.buf[:len(data)] = data
+            # empty record tells the task to read the segment
+            self.outbuf.append(IPC_PREFIX + struct.pack('=h', 0))
+        else:
+            self.write(data)
+
     def chanbytes(self):
         """Parse xmit(chan,nbytes) and return integer tuple
 
-        Assumes first 5 characters have already been checked
+        Works for xfer and the shm messages too.  Assumes the message
+        name has already been checked.
         """
         msg = self.msg
         try:
-            i = msg.find(",", 5)
+            j = msg.find("(") + 1
+            i = msg.find(",", j)
             if i < 0 or msg[-2:] != ")\n":
                 raise ValueError()
-            chan = int(msg[5:i])
+            chan = int(msg[j:i])
             nbytes = int(msg[i + 1:-2])
             self.msg = ''
         except ValueError:
@@ -133,7 +133,7 @@ cl = None
 # help: implemented in irafhelp.py
 # -----------------------------------------------------
 
-from .irafhelp import help
+from .irafhelp import help, apropos
 
 # -----------------------------------------------------
 # Init: basic initialization
@@ -495,6 +495,7 @@ def _addTask(task, pkgname=None):
     _irafnames.strategy.addTask(task)
     # add task to list for its package
     getPkg(pkgname).addTask(task, fullname)
+    _iraftask.clearLookupCache()
 
 
 # --------------------------------------------------------------------------
@@ -589,6 +590,7 @@ def addLoaded(pkg):
     """Add an IRAF package to the loaded pkgs list"""
     global _loaded
     _loaded[pkg.getName()] = len(_loaded)
+    _iraftask.clearLookupCache()
 
 
 # -----------------------------------------------------
@@ -2309,6 +2311,7 @@ def stty(terminal=None, **kw):
     elif expkw['resize'] or expkw['terminal'] == "resize":
         # resize: sets CL env parameters giving screen size; show errors
         if _sys.stdout.isatty():
+            _wutil.invalidateTermWindowSize()
             nlines, ncols = _wutil.getTermWindowSize()
             set(ttyncols=str(ncols), ttynlines=str(nlines))
     elif expkw['terminal']:
@@ -3349,7 +3352,13 @@ def clExecute(s,
         #       DBG('pycode for task,script='+str((taskname,scriptname,))+':\n'+code)
         #       DBG('*'*80)
         # force compile to inherit future division so we don't rely on 2.x div.
-        codeObject = compile(code, scriptname, 'exec', 0, 0)
+        # pycode may come from the cache with the code already compiled
+        compiled = getattr(pycode, 'compiled', None)
+        if compiled is not None and compiled[0] == scriptname:
+            codeObject = compiled[1]
+        else:
+            codeObject = compile(code, scriptname, 'exec', 0, 0)
+            pycode.compiled = (scriptname, codeObject)
         # add this script to linecache
         codeLines = code.split('\n')
         _linecache.cache[scriptname] = (0, 0, codeLines, taskname)
@@ -63,6 +63,12 @@ def init_wcs_sizes(forceResetTo=None):
         _WCS_RECORD_SIZE = WCSRCSZ_v215_32BIT
 
 
+# type of arithmetic between a Python float and the float32 WCS values
+# (float32 with NumPy >= 2, float64 before); coordinates are transformed
+# in this type
+_COORD_TYPE = type(numpy.float32(1) - 1.)
+
+
 def elog(x):
     """Extended range log scale. Handles negative and positive values.
 
@@ -131,30 +137,22 @@ class IrafGWcs:
         SZ = 2
         if _IRAF64BIT:
             SZ = 4
-        self.pending = [None] * WCS_SLOTS
-        for i in range(WCS_SLOTS):
-            record = wcsStruct[_WCS_RECORD_SIZE * i:_WCS_RECORD_SIZE * (i + 1)]
-            # read 8 4-byte floats from beginning of record
-            fvals = numpy.frombuffer(record[:8 * SZ].tobytes(), numpy.float32)
-            if _IRAF64BIT:
-                # seems to send an extra 0-valued int32 after each 4 bytes
-                fvalsView = fvals.reshape(-1, 2).transpose()
-                if fvalsView[1].sum() != 0:
-                    raise IrafError("Assumed WCS float padding is non-zero")
-                fvals = fvalsView[0]
-            # read 3 4-byte ints after that
-            ivals = numpy.frombuffer(record[8 * SZ:11 * SZ].tobytes(),
-                                     numpy.int32)
-            if _IRAF64BIT:
-                # seems to send an extra 0-valued int32 after each 4 bytes
-                ivalsView = ivals.reshape(-1, 2).transpose()
-                if ivalsView[1].sum() != 0:
-                    raise IrafError("Assumed WCS int padding is non-zero")
-                ivals = ivalsView[0]
-            self.pending[i] = tuple(fvals) + tuple(ivals)
-            if len(self.pending[i]) != 11:
-                raise IrafError("Unexpected WCS struct record length: " +
-                                str(len(self.pending[i])))
+        records = wcsStruct.reshape(WCS_SLOTS, _WCS_RECORD_SIZE)
+        # read 8 4-byte floats from beginning of each record
+        fvals = numpy.frombuffer(records[:, :8 * SZ].tobytes(),
+                                 numpy.float32).reshape(WCS_SLOTS, -1)
+        # read 3 4-byte ints after that
+        ivals = numpy.frombuffer(records[:, 8 * SZ:11 * SZ].tobytes(),
+                                 numpy.int32).reshape(WCS_SLOTS, -1)
+        if _IRAF64BIT:
+            # seems to send an extra 0-valued int32 after each 4 bytes
+            if fvals[:, 1::2].any():
+                raise IrafError("Assumed WCS float padding is non-zero")
+            if ivals[:, 1::2].any():
+                raise IrafError("Assumed WCS int padding is non-zero")
+            fvals = fvals[:, ::2]
+            ivals = ivals[:, ::2]
+        self.pending = [tuple(f) + tuple(i) for f, i in zip(fvals, ivals)]
         if self.wcs is None:
             self.commit()
 
@@ -216,6 +214,32 @@ class IrafGWcs:
         return (self.transform1d(coord=x, dimension='x', wcsID=wcsID),
                 self.transform1d(coord=y, dimension='y', wcsID=wcsID), wcsID)
 
+    def transformArray(self, x, y, wcsID):
+        """Transform arrays x,y to wcs coordinates for the given wcs
+
+        Array version of transform(); returns (wx, wy, wcsID) with the
+        same values the scalar version gives for each point."""
+
+        self.commit()
+        if wcsID == 0:
+            return (numpy.asarray(x), numpy.asarray(y), wcsID)
+        return (self.transform1dArray(coord=x, dimension='x', wcsID=wcsID),
+                self.transform1dArray(coord=y, dimension='y', wcsID=wcsID),
+                wcsID)
+
+    def _axis(self, dimension, wcsID):
+        """Return (w1, w2, s1, s2, type) for one axis of a wcs"""
+
+        wx1, wx2, wy1, wy2, sx1, sx2, sy1, sy2, xt, yt, flag = \
+            self.wcs[wcsID-1]
+        if dimension == 'x':
+            w1, w2, s1, s2, type = wx1, wx2, sx1, sx2, xt
+        elif dimension == 'y':
+            w1, w2, s1, s2, type = wy1, wy2, sy1, sy2, yt
+        if (s2 - s1) == 0.:
+            raise IrafError("IRAF graphics WCS is singular!")
+        return w1, w2, s1, s2, type
+
     def transform1d(self, coord, dimension, wcsID):
 
         wx1, wx2, wy1, wy2, sx1, sx2, sy1, sy2, xt, yt, flag = \
@@ -232,7 +256,7 @@ class IrafGWcs:
         elif type == LOG:
             lw2, lw1 = math.log10(w2), math.log10(w1)
             lval = (lw2 - lw1) * fract + lw1
-            val = 10**lval
+            val = numpy.power(10, lval)
         elif type == ELOG:
             # Determine inverse mapping to determine corresponding values of s to w
             # This must be done to figure out which regime of the elog function the
@@ -245,13 +269,55 @@ class IrafGWcs:
             s10m = -cs + c0
             if coord > s10p:  # positive log area
                 frac = (coord - s10p) / (s2 - s10p)
-                val = 10. * (w2 / 10.)**frac
+                val = 10. * numpy.power(w2 / 10., frac)
             elif coord >= s10m and coord <= s10p:  # linear area
                 frac = (coord - s10m) / (s10p - s10m)
                 val = frac * 20 - 10.
             else:  # negative log area
                 frac = -(coord - s10m) / (s10m - s1)
-                val = -10. * (-w1 / 10.)**frac
+                val = -10. * numpy.power(-w1 / 10., frac)
+        else:
+            raise IrafError("Unknown or unsupported axis plotting type")
+        return val
+
+    def transform1dArray(self, coord, dimension, wcsID):
+        """Array version of transform1d
+
+        The coordinates are converted to the type that scalar arithmetic
+        with the float32 WCS values produces, and both versions take
+        powers with numpy.power (the ** operator on NumPy scalars can
+        differ from it in the last bit), so the results are the same as
+        those of transform1d."""
+
+        w1, w2, s1, s2, type = self._axis(dimension, wcsID)
+        coord = numpy.asarray(coord, dtype=_COORD_TYPE)
+        fract = (coord - s1) / (s2 - s1)
+        if type == LINEAR:
+            val = (w2 - w1) * fract + w1
+        elif type == LOG:
+            lw2, lw1 = math.log10(w2), math.log10(w1)
+            lval = (lw2 - lw1) * fract + lw1
+            val = numpy.power(10, lval)
+        elif type == ELOG:
+            # Determine inverse mapping to determine corresponding values of s to w
+            # This must be done to figure out which regime of the elog function the
+            # specified point is in. (cs*ew + c0 = s)
+            ew1, ew2 = elog(w1), elog(w2)
+            cs = (s2 - s1) / (ew2 - ew1)
+            c0 = s1 - cs * ew1
+            # linear part is between ew = 1 and -1, so just map those to s
+            s10p = cs + c0
+            s10m = -cs + c0
+            positive = coord > s10p  # positive log area
+            linear = ~positive & (coord >= s10m)  # linear area
+            negative = ~(positive | linear)  # negative log area
+            val = numpy.empty(coord.shape, _COORD_TYPE)
+            frac = (coord[positive] - s10p) / (s2 - s10p)
+            val[positive] = 10. * numpy.power(w2 / 10., frac)
+            frac = (coord[linear] - s10m) / (s10p - s10m)
+            val[linear] = frac * 20 - 10.
+            frac = -(coord[negative] - s10m) / (s10m - s1)
+            val[negative] = -10. * numpy.power(-w1 / 10., frac)
         else:
             raise IrafError("Unknown or unsupported axis plotting type")
         return val
@@ -280,6 +346,58 @@ class IrafGWcs:
             wcsID = self._getWCS(x, y)
         return self.transform(x, y, wcsID)
 
+    def getArray(self, x, y, wcsID=None):
+        """Array version of get
+
+        Returns a tuple (wx,wy,wnum) of arrays, with the WCS selected
+        separately for each point when no wcsID is given."""
+
+        self.commit()
+        x = numpy.asarray(x)
+        y = numpy.asarray(y)
+        if wcsID is not None:
+            wnum = numpy.full(x.shape, wcsID, int)
+        else:
+            wnum = self._getWCSArray(x, y)
+        wx = x.astype(numpy.float64)
+        wy = y.astype(numpy.float64)
+        for i in numpy.unique(wnum):
+            if i != 0:
+                sel = wnum == i
+                wx[sel] = self.transform1dArray(x[sel], 'x', i)
+                wy[sel] = self.transform1dArray(y[sel], 'y', i)
+        return (wx, wy, wnum)
+
+    def _getWCSArray(self, x, y):
+        """Return an array with the WCS to use for each x,y point
+
+        Uses the same rules as _getWCS."""
+
+        indexlist = [i for i in range(len(self.wcs)) if self._isWcsDefined(i)]
+        if len(indexlist) <= 1:
+            wcsID = indexlist[0] + 1 if indexlist else 0
+            return numpy.full(numpy.shape(x), wcsID, int)
+        # highest wcs first so that argmin gives it priority in ties
+        indexlist.reverse()
+        x = numpy.asarray(x, dtype=_COORD_TYPE)
+        y = numpy.asarray(y, dtype=_COORD_TYPE)
+        viewports = numpy.array([self.wcs[i][4:8] for i in indexlist])
+        x1, x2, y1, y2 = viewports.T.reshape((4, -1) + (1,) * x.ndim)
+        inX = (x1 <= x) & (x <= x2)
+        inY = (y1 <= y) & (y <= y2)
+        inside = inX & inY
+        # distance to center of viewports containing the point
+        center = ((x1 + x2) / 2 - x)**2 + ((y1 + y2) / 2 - y)**2
+        center = numpy.where(inside, center, numpy.inf)
+        # distance to nearest border for points inside no viewport
+        xdelt = numpy.minimum(abs(x - x1), abs(x - x2))
+        ydelt = numpy.minimum(abs(y - y1), abs(y - y2))
+        border = numpy.where(inX, ydelt**2,
+                             numpy.where(inY, xdelt**2,
+                                         xdelt**2 + ydelt**2))
+        dist = numpy.where(inside.any(axis=0), center, border)
+        return numpy.array(indexlist)[dist.argmin(axis=0)] + 1
+
     def _getWCS(self, x, y):
         """Return the WCS (16 max possible) that should be used to
         transform x and y. Returns 0 if no WCS is defined."""
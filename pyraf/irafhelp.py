@@ -42,6 +42,7 @@ import os
 import sys
 import types
 import io
+import pydoc
 import webbrowser
 from inspect import signature
 
@@ -49,6 +50,8 @@ from .tools.irafglobals import IrafError, IrafTask, IrafPkg
 from . import iraf
 from .tools import minmatch, irafutils
 
+from . import helpdb
+
 import numpy
 _numpyArrayType = numpy.ndarray
 
@@ -415,11 +418,19 @@ def _valueString(value, verbose=0):
     return vstr
 
 
+# IRAF help keywords handled when help is formatted locally
+# (the others, e.g. device and nlpp, need the IRAF help task)
+_localkw = ('page', 'lmargin', 'rmargin', 'section')
+
+
 def _irafHelp(taskname, irafkw):
     """Display IRAF help for given task.
     Task can be either a name or an IrafTask object.
     Returns 1 on success or 0 on failure."""
 
+    if not [key for key in irafkw if key not in _localkw] and \
+            _localHelp(taskname, irafkw):
+        return 1
     if isinstance(taskname, IrafTask):
         taskname = taskname.getName()
     else:
@@ -435,6 +446,41 @@ def _irafHelp(taskname, irafkw):
         return 0
 
 
+def _localHelp(taskname, irafkw):
+    """Display help formatted from the help database files
+
+    Returns 1 on success or 0 if the help was not found.
+    """
+
+    text = helpdb.getHelpText(taskname,
+                              section=irafkw.get('section', 'all'),
+                              lmargin=int(irafkw.get('lmargin', 1)),
+                              rmargin=int(irafkw.get('rmargin', 72)))
+    if text is None:
+        return 0
+    if irafkw.get('page', 1):
+        pydoc.pager(text)
+    else:
+        sys.stdout.write(text)
+    return 1
+
+
+def apropos(*keywords):
+    """List IRAF tasks and packages whose help matches all the keywords
+
+    The keywords are compared with the task names and the one-line
+    descriptions from the package menus, ignoring case.  Returns the
+    list of matching help database entries.
+    """
+
+    entries = helpdb.search(*keywords)
+    for entry in entries:
+        name = f'{entry.package}.{entry.name}' if entry.package \
+            else entry.name
+        print(f'{name:>24} - {entry.description}')
+    return entries
+
+
 _HelpURL = "https://iraf.readthedocs.io/en/latest/tasks/by-name"
 
 
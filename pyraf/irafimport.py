@@ -14,7 +14,7 @@ R. White, 1999 August 17
 
 import builtins
 import sys
-from .tools import minmatch
+from .tools import irafglobals, minmatch
 
 IMPORT_DEBUG = False
 
@@ -108,6 +108,8 @@ class _irafModuleClass:
 
     def __init__(self):
         self.__dict__['module'] = None
+        # names of tasks memoized as instance attributes
+        self.__dict__['taskCache'] = set()
 
     def _moduleInit(self):
         global the_iraf_module
@@ -121,12 +123,16 @@ class _irafModuleClass:
             self._moduleInit()
         # first try getting this attribute directly from the usual module
         try:
-            return getattr(self.module, attr)
+            value = getattr(self.module, attr)
         except AttributeError:
             pass
+        else:
+            if isinstance(value, irafglobals.IrafTask):
+                self._cacheTask(attr, value)
+            return value
         # if that fails, try getting a task with this name
         try:
-            return self.module.getTask(attr)
+            return self._cacheTask(attr, self.module.getTask(attr))
         except minmatch.AmbiguousKeyError as e:
             raise AttributeError(str(e))
         except KeyError:
@@ -139,9 +145,25 @@ class _irafModuleClass:
 
     def __setattr__(self, attr, value):
         # add an attribute to the module itself
+        if attr in self.taskCache:
+            self.taskCache.discard(attr)
+            del self.__dict__[attr]
         setattr(self.module, attr, value)
         self.mmdict.add(attr, value)
 
+    def _cacheTask(self, attr, task):
+        """Memoize task so later lookups of attr skip __getattr__"""
+        if attr[:1] != '_':
+            self.__dict__[attr] = task
+            self.taskCache.add(attr)
+        return task
+
+    def clearCache(self):
+        """Forget memoized tasks (called when task definitions change)"""
+        for attr in self.taskCache:
+            del self.__dict__[attr]
+        self.taskCache.clear()
+
     def getAllMatches(self, taskname):
         """Get list of names of all tasks that may match taskname
 
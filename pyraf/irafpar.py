@@ -5,7 +5,9 @@ R. White, 2000 January 7
 
 
 import copy
+import fcntl
 import glob
+import io
 import os
 import re
 import types
@@ -237,9 +239,9 @@ class IrafParL(_StringMixin, IrafPar):
     def __init__(self, fields, strict=0):
         IrafPar.__init__(self, fields, strict)
         # filehandle for input file
+        # lines are read from it one at a time as they are requested, so
+        # memory use does not depend on the size of the list file
         self.__dict__['fh'] = None
-        # lines used to store input when not reading from a tty
-        self.__dict__['lines'] = None
         # flag inidicating error message has been printed if file does not exist
         # message only gets printed once for each file
         self.__dict__['errMsg'] = 0
@@ -276,7 +278,6 @@ class IrafParL(_StringMixin, IrafPar):
                 except OSError:
                     pass
                 self.fh = None
-                self.lines = None
             self.errMsg = 0
 
     def get(self,
@@ -307,19 +308,7 @@ class IrafParL(_StringMixin, IrafPar):
             try:
                 if not self.fh:
                     self.fh = open(iraf.Expand(self.value), errors="ignore")
-                    if self.fh.isatty():
-                        self.lines = None
-                    else:
-                        # read lines in a block
-                        # reverse to make pop more convenient & faster
-                        self.lines = self.fh.readlines()
-                        self.lines.reverse()
-                if self.lines is None:
-                    value = self.fh.readline()
-                elif self.lines:
-                    value = self.lines.pop()
-                else:
-                    value = ''
+                value = self.fh.readline()
                 if not value:
                     # EOF -- raise exception
                     raise EOFError(f"EOF from list parameter `{self.name}'")
@@ -462,6 +451,9 @@ from . import filecache
 class ParCache(filecache.FileCache):
     """Parameter cache that updates from .par file when necessary"""
 
+    # _fileSignature of the .par file when it was last read
+    readSignature = None
+
     def __init__(self, filename, parlist, strict=0):
         self.initparlist = parlist
         # special filename used by cl2py
@@ -486,6 +478,7 @@ class ParCache(filecache.FileCache):
         if self.initparlist is not None:
             self.pars = self.initparlist
         elif self.filename:
+            self.readSignature = _fileSignature(self.filename)
             self.pars = _readpar(self.filename)
         else:
             # create empty list if no filename is specified
@@ -497,6 +490,7 @@ class ParCache(filecache.FileCache):
         """Initialize parameter list from parameter file"""
         if self.filename:
             # .par file dominates initparlist on update
+            self.readSignature = _fileSignature(self.filename)
             self.pars = _readpar(self.filename)
         elif self.initparlist is not None:
             self.pars = self.initparlist
@@ -542,6 +536,10 @@ class ParCache(filecache.FileCache):
 class IrafParList(taskpars.TaskPars):
     """List of Iraf parameters"""
 
+    # _fileSignature of the files written by saveParList (a class
+    # attribute, so parameter lists pickled in the clcache get it too)
+    __fileSignatures = None
+
     def __init__(self, taskname, filename="", parlist=None):
         """Create a parameter list for task taskname
 
@@ -1103,29 +1101,69 @@ class IrafParList(taskpars.TaskPars):
             print(msg)
             return msg
         # ok, go ahead and write 'em - set up file
+        nsave = len([par for par in self.__pars if par.name != '$nargs'])
         if hasattr(filename, 'write'):
-            fh = filename
-        else:
-            absFileName = iraf.Expand(filename)
-            absDir = os.path.dirname(absFileName)
-            if len(absDir) and not os.path.isdir(absDir):
-                os.makedirs(absDir)
-            fh = open(absFileName, 'w')
-        nsave = len(self.__pars)
+            self.__writePars(filename, comment)
+            if hasattr(filename, 'name'):
+                return f"{nsave:d} parameters written to {filename.name}"
+            else:
+                return f"{nsave:d} parameters written"
+        absFileName = os.path.abspath(iraf.Expand(filename))
+        absDir = os.path.dirname(absFileName)
+        if len(absDir) and not os.path.isdir(absDir):
+            os.makedirs(absDir)
+
+        def getText():
+            # called with the file locked
+            self.__mergeFromFile(absFileName)
+            fh = io.StringIO()
+            self.__writePars(fh, comment)
+            return fh.getvalue()
+
+        signature = _replaceFile(absFileName, getText)
+        if self.__fileSignatures is None:
+            self.__fileSignatures = {}
+        self.__fileSignatures[absFileName] = signature
+        return f"{nsave:d} parameters written to {filename}"
+
+    def __writePars(self, fh, comment=None):
         if comment:
             fh.write('# ' + comment + '\n')
         for par in self.__pars:
-            if par.name == '$nargs':
-                nsave = nsave - 1
-            else:
+            if par.name != '$nargs':
                 fh.write(par.save() + '\n')
-        if fh != filename:
-            fh.close()
-            return f"{nsave:d} parameters written to {filename}"
-        elif hasattr(fh, 'name'):
-            return f"{nsave:d} parameters written to {fh.name}"
-        else:
-            return f"{nsave:d} parameters written"
+
+    def __mergeFromFile(self, filename):
+        """Take values changed by other sessions from .par file filename
+
+        If the file changed since this session read or wrote it, the
+        parameters that were not changed in this session get their
+        values from the file, so saving does not undo changes made by
+        other sessions.
+        """
+        signature = _fileSignature(filename)
+        known = (self.__fileSignatures or {}).get(filename)
+        if known is None and self.__filename and \
+                os.path.abspath(self.__filename) == filename:
+            known = self.__filecache.readSignature
+        if signature is None or signature == known:
+            return
+        try:
+            filepars = _readpar(filename)
+        except (OSError, SyntaxError):
+            return
+        filedict = {par.name: par for par in filepars}
+        merged = []
+        for par in self.__pars:
+            filepar = filedict.get(par.name)
+            if filepar is not None and not par.isChanged() and \
+                    filepar.__class__ is par.__class__ and \
+                    filepar.value != par.value:
+                par.value = filepar.value
+                merged.append(par.name)
+        if merged:
+            warning(f"{filename} was changed by another session, "
+                    f"using its values of {', '.join(merged)}", level=-1)
 
     def __getinitargs__(self):
         """Return parameters for __init__ call in pickle"""
@@ -1457,14 +1495,127 @@ _re_bstrail = re.compile(r'\\*$')
 del whitespace, field, comma, optcomma, noncommajunk, double, single
 
 
+# -----------------------------------------------------
+# Atomic .par file writes
+# -----------------------------------------------------
+
+# lock file used to serialize writes by PyRAF sessions that share
+# a parameter directory (e.g. uparm on an NFS home directory)
+_lockName = '.pyraf.lock'
+
+
+def _isUparm(dirname):
+    """Returns true if dirname is the uparm directory"""
+    uparm = iraf.Expand('uparm$', noerror=1)
+    if not uparm:
+        return False
+    try:
+        return os.path.samefile(dirname, uparm)
+    except OSError:
+        return False
+
+
+def _fileSignature(filename):
+    """Return (size, modification time) of filename or None"""
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def _replaceFile(filename, getText):
+    """Replace contents of filename with the text returned by getText()
+
+    The text is written to a temporary file in the same directory
+    which is then renamed to filename, so other sessions never read
+    a partially written file.  In the uparm directory, getText is
+    called and the file replaced with a lock held on the file
+    .pyraf.lock in that directory, so getText can merge changes other
+    sessions made to the file; other directories do not get a lock
+    file.  Returns the _fileSignature of the new file.
+    """
+    dirname = os.path.dirname(filename) or os.curdir
+    tmpname = f'{filename}.{os.getpid()}.tmp'
+    if _isUparm(dirname):
+        lockfd = os.open(os.path.join(dirname, _lockName),
+                         os.O_RDWR | os.O_CREAT, 0o666)
+    else:
+        lockfd = None
+    try:
+        if lockfd is not None:
+            fcntl.lockf(lockfd, fcntl.LOCK_EX)
+        try:
+            with open(tmpname, 'w') as fh:
+                fh.write(getText())
+            signature = _fileSignature(tmpname)
+            os.replace(tmpname, filename)
+        except BaseException:
+            try:
+                os.remove(tmpname)
+            except OSError:
+                pass
+            raise
+    finally:
+        # closing the file releases the lock
+        if lockfd is not None:
+            os.close(lockfd)
+    return signature
+
+
+# -----------------------------------------------------
+# Persistent cache of parsed .par file fields
+# -----------------------------------------------------
+
+# The field tuples of each parameter are cached with the clcache, keyed
+# by the absolute filename, so the IrafPar objects can be created
+# without parsing the file again.
+
+
+def _getParFieldCache():
+    global parFieldCache
+    if parFieldCache is None:
+        parFieldCache = filecache.openCache('parcache')
+    return parFieldCache
+
+
+# created on first use
+parFieldCache = None
+
+
 def _readpar(filename, strict=0):
     """Read IRAF .par file and return list of parameters"""
 
+    filename = os.path.expanduser(filename)
+    stat = os.stat(filename)
+    cache = _getParFieldCache()
+    path = os.path.abspath(filename)
+    fields = cache.get(path, stat)
+    if fields is not None:
+        return [IrafParFactory(list(flist), strict=strict)
+                for flist in fields]
+    param_list, fields = _parsepar(filename, strict)
+    if fields is not None:
+        cache.add(path, fields, stat)
+    return param_list
+
+
+def _parsepar(filename, strict=0):
+    """Parse IRAF .par file
+
+    Returns the list of parameters and the list of field tuples
+    they were created from.  The field list is None if there were
+    warnings, which are only raised as errors for strict parsing, so
+    such files are not cached.
+    """
+
     global _re_field, _re_bstrail
 
     param_dict = {}
     param_list = []
-    with open(os.path.expanduser(filename), errors="ignore") as fh:
+    fields = []
+    clean = True
+    with open(filename, errors="ignore") as fh:
         lines = fh.readlines()
     # reverse order of lines so we can use pop method
     lines.reverse()
@@ -1512,17 +1663,20 @@ def _readpar(filename, strict=0):
                         g = None
                     # check for trailing quote in unquoted string
                     elif g[-1:] == '"' or g[-1:] == "'":
+                        clean = False
                         warning(
                             filename + "\n" + line + "\n" +
                             "Unquoted string has trailing quote", strict)
                 elif mm.group('double') is not None:
                     if mm.group('djunk'):
+                        clean = False
                         warning(
                             filename + "\n" + line + "\n" +
                             "Non-blank follows quoted string", strict)
                     g = mm.group('double')
                 elif mm.group('single') is not None:
                     if mm.group('sjunk'):
+                        clean = False
                         warning(
                             filename + "\n" + line + "\n" +
                             "Non-blank follows quoted string", strict)
@@ -1535,6 +1689,7 @@ def _readpar(filename, strict=0):
                 flist.append(g)
                 # move match pointer
                 i1 = mm.end()
+            ftuple = tuple(flist)
             try:
                 par = IrafParFactory(flist, strict=strict)
             except KeyboardInterrupt:
@@ -1548,10 +1703,12 @@ def _readpar(filename, strict=0):
                 raise SyntaxError(filename + "\n" + line + "\n" + str(flist) +
                                   "\n" + str(exc))
             if par.name in param_dict:
+                clean = False
                 warning(
                     filename + "\n" + line + "\n" + "Duplicate parameter " +
                     par.name, strict)
             else:
                 param_dict[par.name] = par
                 param_list.append(par)
-    return param_list
+                fields.append(ftuple)
+    return param_list, fields if clean else None
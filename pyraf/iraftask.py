@@ -14,6 +14,7 @@ import os
 import sys
 import copy
 import re
+import time
 from .tools import basicpar, irafglobals
 from .tools.irafglobals import IrafError, Verbose
 from . import subproc
@@ -21,13 +22,65 @@ from . import irafinst
 from . import irafpar
 from . import irafexecute
 from . import cl2py
+from . import clcompile
 from . import iraf
 from .tools import minmatch, irafutils, taskpars
+from . import irafimport
 
 # may be set to function to monitor task execution
 # function gets called for every task execution
 executionMonitor = None
 
+# lookups of task and parameter names cached by ParDictListSearch
+# and the iraf module are discarded when this count changes
+_lookupGeneration = 0
+
+
+def clearLookupCache():
+    """Discard cached task and parameter name lookups
+
+    Called when tasks are defined and when packages are loaded.
+    """
+    global _lookupGeneration
+    _lookupGeneration += 1
+    irafimport._irafModuleProxy.clearCache()
+
+
+# Parameters changed by running tasks are not written to the uparm
+# files right away.  The tasks are collected in _pendingSaves and
+# written by flushParLists, which is called when the command line is
+# idle, at exit, and by the first task run that starts or finishes
+# once the oldest unsaved change is parSaveInterval seconds old.  There
+# is no timer, so a long computation that runs no tasks keeps the
+# changes in memory until it ends.  Setting parSaveInterval to 0
+# writes the files after every task run.
+parSaveInterval = 5.0
+_pendingSaves = {}
+# time of the oldest change in _pendingSaves
+_pendingSince = 0.0
+
+
+def flushParLists():
+    """Write uparm files for tasks with unsaved parameter changes"""
+    while _pendingSaves:
+        key, task = _pendingSaves.popitem()
+        try:
+            rv = task.saveParList()
+        except (OSError, IrafError, ValueError) as e:
+            sys.stderr.write("Error saving parameters for task "
+                             f"{task.getName()}: {e}\n")
+            sys.stderr.flush()
+        else:
+            if Verbose > 1:
+                print(rv, file=sys.stderr)
+
+
+def _flushDueParLists():
+    """Call flushParLists if the oldest unsaved change is old enough"""
+    if _pendingSaves and \
+            time.monotonic() - _pendingSince >= parSaveInterval:
+        flushParLists()
+
 # -----------------------------------------------------
 # IRAF task class
 # -----------------------------------------------------
@@ -330,6 +383,7 @@ class IrafTask(irafglobals.IrafTask, taskpars.TaskPars):
     def run(self, *args, **kw):
         """Execute this task with the specified arguments"""
 
+        _flushDueParLists()
         self.initTask(force=1)
 
         # Special _save keyword turns on parameter-saving.
@@ -752,6 +806,7 @@ class IrafTask(irafglobals.IrafTask, taskpars.TaskPars):
         if not self._currentParList:
             return f"No parameters to save for task {self._name}"
         if filename is None:
+            _pendingSaves.pop(id(self), None)
             if self._scrunchParpath:
                 filename = self._scrunchParpath
             else:
@@ -764,6 +819,7 @@ class IrafTask(irafglobals.IrafTask, taskpars.TaskPars):
 
     def unlearn(self):
         """Reset task parameters to their default values"""
+        _pendingSaves.pop(id(self), None)
         self.initTask(force=1)
         # XXX always runs on current par list, not running par list?
         if not self._currentParList:
@@ -887,6 +943,7 @@ class IrafTask(irafglobals.IrafTask, taskpars.TaskPars):
         flag is set, all changes are saved; if save flag is false, only
         explicit parameter changes requested by the task are saved.
         """
+        global _pendingSince
         if not (self._currentParList and self._runningParList):
             return
         newParList = self._runningParList
@@ -915,9 +972,10 @@ class IrafTask(irafglobals.IrafTask, taskpars.TaskPars):
                 par.get()._updateParList(save)
         # save to disk if there were changes
         if changed:
-            rv = self.saveParList()
-            if Verbose > 1:
-                print(rv, file=sys.stderr)
+            if not _pendingSaves:
+                _pendingSince = time.monotonic()
+            _pendingSaves[id(self)] = self
+            _flushDueParLists()
 
     def _deleteRunningParList(self):
         """Delete the _runningParList parameter list for this and psets"""
@@ -967,7 +1025,11 @@ class IrafTask(irafglobals.IrafTask, taskpars.TaskPars):
                         mode, prompt):
         # helper method for getting parameter value (with indirection)
         # once we find a dictionary that contains it
-        par = paramdict[paramname]
+        return self._getParObjectValue(paramdict[paramname], pindex, field,
+                                       native, mode, prompt)
+
+    def _getParObjectValue(self, par, pindex, field, native, mode, prompt):
+        # get value of parameter object par (with indirection)
         pmode = par.mode[:1]
         if pmode == "a":
             pmode = mode or self.getMode()
@@ -1104,6 +1166,9 @@ class IrafTask(irafglobals.IrafTask, taskpars.TaskPars):
             self._name, iraf.Expand(self._defaultParpath, noerror=1))
 
         codePath = 'a'
+        if _pendingSaves:
+            # the uparm file may be out of date
+            flushParLists()
         if self._scrunchParpath and os.path.exists(
                 iraf.Expand(self._scrunchParpath, noerror=1)):
             self._currentParpath = self._scrunchParpath
@@ -1279,15 +1344,57 @@ class IrafPythonTask(IrafTask):
 
 
 class ParDictListSearch:
+    """Parameters of a running CL task, its package and cl as attributes
+
+    A new instance is created for each execution of the task.  Parameters
+    found by name are remembered along with the parameter list they came
+    from, which stays valid until setParList replaces that list or
+    clearLookupCache is called.
+    """
 
     def __init__(self, taskObj):
         self.__dict__['_taskObj'] = taskObj
+        self.__dict__['_pars'] = {}
+        self.__dict__['_generation'] = _lookupGeneration
+
+    def _getPar(self, paramname):
+        """Return IrafPar exactly matching simple name paramname or None"""
+        if self._generation != _lookupGeneration:
+            self._pars.clear()
+            self.__dict__['_generation'] = _lookupGeneration
+        entry = self._pars.get(paramname)
+        if entry is not None:
+            par, task, plist = entry
+            if (task._runningParList or task._currentParList) is plist:
+                return par
+        package, taskname, name, pindex, field = _splitName(paramname)
+        if package or taskname or field or pindex is not None:
+            return None
+        for task in self._searchTasks():
+            paramdict = task.getParDict()
+            if paramdict._has(name, exact=1):
+                par = paramdict[name]
+                self._pars[paramname] = (par, task, task._runningParList or
+                                         task._currentParList)
+                return par
+        return None
+
+    def _searchTasks(self):
+        # tasks with the parameter lists searched by getParam
+        yield self._taskObj
+        yield iraf.getTask(self._taskObj.getPkgname())
+        if iraf.cl is not None:
+            yield iraf.cl
 
     def __getattr__(self, paramname):
         if self._taskObj.is_pseudo(paramname):
             return getattr(self._taskObj, paramname)
         if paramname[:1] == '_':
             raise AttributeError(paramname)
+        par = self._getPar(paramname)
+        if par is not None:
+            return self._taskObj._getParObjectValue(par, None, None, 1, "h",
+                                                    1)
         # try exact match
         try:
             return self._taskObj.getParam(paramname,
@@ -1329,6 +1436,9 @@ class ParDictListSearch:
             return setattr(self._taskObj, paramname, value)
         if paramname[:1] == '_':
             raise AttributeError(paramname)
+        par = self._getPar(paramname)
+        if par is not None:
+            return par.set(value)
         # try exact match
         try:
             return self._taskObj.setParam(paramname, value, exact=1)
@@ -1435,6 +1545,12 @@ class IrafCLTask(IrafTask):
                 print("Cached version out-of-date: " + self._name,
                       file=sys.stderr)
 
+        if self._pycode is None:
+            self._codeObject = None
+            # use ahead-of-time compiled module if it is up-to-date
+            self._pycode = clcompile.getPycode(filehandle,
+                                               self._defaultParpath)
+
         if self._pycode is None:
             # translate code to python
             if Verbose > 1:
@@ -1442,11 +1558,16 @@ class IrafCLTask(IrafTask):
                       self._name,
                       id(self),
                       file=sys.stderr)
-            self._codeObject = None
             self._pycode = cl2py.cl2py(filehandle,
                                        parlist=self._defaultParList,
                                        parfile=self._defaultParpath)
 
+        compiled = getattr(self._pycode, 'compiled', None)
+        if self._codeObject is None and compiled is not None:
+            # compiled module bytecode
+            self._clFunction = None
+            self._codeObject = compiled[1]
+
         if self._codeObject is None:
             # No code object, which can happen if function has not
             # been compiled or if compilation failed.  Try compiling
@@ -34,6 +34,7 @@ import traceback
 import linecache
 from . import iraf
 from . import irafinst
+from . import iraftask
 from . import wutil
 from .tools import minmatch, capable
 from .pyrafglobals import pyrafDir
@@ -110,6 +111,10 @@ class CmdConsole(code.InteractiveConsole):
 # !!!               prompt = 'curpkg > '
 # reset the focus to terminal if necessary
                 wutil.focusController.resetFocusHistory()
+                # write parameters changed by the last command
+                iraftask.flushParLists()
+                # the window may have been resized since the last prompt
+                wutil.invalidateTermWindowSize()
                 line = self.raw_input(prompt)
                 if needtermid and prompt:
                     # reset terminal window ID immediately
@@ -236,17 +236,23 @@ class Subprocess:
             timeout = 0
         if printtime > timeout:
             printtime = timeout
+        if isinstance(strval, str):
+            strval = strval.encode()
+        strval = memoryview(strval)
         totalwait = 0
         try:
             while totalwait <= timeout:
                 ## if totalwait: print "waiting for subprocess..."
                 totalwait = totalwait + printtime
                 if select.select([], self.toChild_fdlist, [], printtime)[1]:
-                    if not isinstance(strval, bytes):
-                        strval = strval.encode()
-                    if os.write(self.toChild, strval) != len(strval):
+                    nbytes = os.write(self.toChild, strval)
+                    if nbytes == len(strval):
+                        return  # ===>
+                    if nbytes <= 0:
                         raise SubprocessError(f"Write error to {self}")
-                    return  # ===>
+                    # a large write was interrupted; send the rest
+                    strval = strval[nbytes:]
+                    totalwait = 0
             raise SubprocessError(f"Write to {self} blocked")
         except OSError as e:
             raise SubprocessError(
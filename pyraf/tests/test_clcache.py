@@ -42,3 +42,38 @@ def test_codecache(tmpdir):
     newidx, newpycode = codeCache.get(fpath)
     assert newidx == idx
     assert isinstance(newpycode, DummyCodeObj)
+
+
+def test_single_mode_cache(tmpdir):
+    codeCache = _CodeCache([os.path.join(tmpdir.strpath, 'clcache')])
+    codeCache.singleCacheSize = 2
+    pc = DummyCodeObj()
+    for line in ('a', 'b', 'a', 'c', 'b'):
+        idx, pycode = codeCache.get(None, mode='single', source=line)
+        if pycode is None:
+            codeCache.add(idx, pc)
+    # 'b' was dropped when 'c' was added
+    assert codeCache.singleCacheInfo() == (1, 4, 2, 2)
+
+
+def test_single_mode_cache_local_vars(tmpdir, monkeypatch):
+    from pyraf import cl2py
+
+    codeCache = _CodeCache([os.path.join(tmpdir.strpath, 'clcache')])
+    monkeypatch.setattr(cl2py, 'codeCache', codeCache)
+    local_vars_dict = {}
+    local_vars_list = []
+
+    def translate(line):
+        return cl2py.cl2py(string=line, mode='single',
+                           local_vars_dict=local_vars_dict,
+                           local_vars_list=local_vars_list).code
+
+    assert 'iraf.cl.x' in translate('x = 1\n')
+    assert translate('x = 1\n') == translate('x = 1\n')
+    assert codeCache.singleCacheInfo().hits == 2
+    # declarations are not cached and change later translations
+    translate('int x\n')
+    assert codeCache.singleCacheInfo().currsize == 1
+    assert local_vars_list == ['x']
+    assert 'Vars.x' in translate('x = 1\n')
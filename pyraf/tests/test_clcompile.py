@@ -0,0 +1,66 @@
+import io
+import os
+
+import pytest
+
+from .. import cl2py, clcompile, iraf
+
+_script = '''procedure aotest (word)
+string word {prompt="Word to print"}
+int count = 2 {min=1}
+begin
+    int i
+    for (i = 1; i <= count; i += 1)
+        print (word, " ", i)
+end
+'''
+
+
+def _notranslate(*args, **kw):
+    raise AssertionError("CL script translated")
+
+
+@pytest.fixture
+def package(tmpdir, monkeypatch):
+    srcdir = tmpdir.mkdir('src')
+    (srcdir / 'aotest.cl').write(_script)
+    (srcdir / 'sub').mkdir()
+    (srcdir / 'sub' / 'print.cl').write('print ("sub")\n')
+    (srcdir / 'bad.cl').write('= f(x,\n')
+    outdir = str(tmpdir / 'compiled')
+    assert clcompile.main([str(srcdir), outdir]) == 0
+    monkeypatch.setattr(clcompile, 'compiledPath', [outdir])
+    monkeypatch.setattr(clcompile, '_packages', {})
+    return srcdir, outdir
+
+
+def test_compile_package(package):
+    srcdir, outdir = package
+    files = sorted(os.listdir(outdir))
+    assert files == ['__init__.py', '__pycache__', 'aotest.py',
+                     'sub_print.py']
+    pycode = clcompile.getPycode(str(srcdir / 'aotest.cl'))
+    assert pycode.vars.proc_name == 'aotest'
+    assert pycode.vars.parList.getName() == 'aotest'
+    assert pycode.compiled[0] == os.path.join(outdir, 'aotest.py')
+    assert cl2py.checkCache(str(srcdir / 'aotest.cl'), pycode)
+    assert clcompile.getPycode(str(srcdir / 'bad.cl')) is None
+
+
+def test_task_uses_compiled_module(package, monkeypatch):
+    srcdir, outdir = package
+    monkeypatch.setattr(cl2py, 'cl2py', _notranslate)
+    iraf.task(aotest=str(srcdir / 'aotest.cl'))
+    stdout = io.StringIO()
+    iraf.aotest('hello', StdoutAppend=stdout)
+    assert stdout.getvalue() == 'hello 1\nhello 2\n'
+
+
+def test_changed_source_is_translated(package):
+    srcdir, outdir = package
+    (srcdir / 'aotest.cl').write(_script.replace('" "', '" - "'))
+    assert clcompile.getPycode(str(srcdir / 'aotest.cl')) is None
+    # a parameter file that did not exist at compile time
+    (srcdir / 'sub' / 'print.par').write('mode,s,h,"al"\n')
+    assert clcompile.getPycode(str(srcdir / 'sub' / 'print.cl'),
+                               str(srcdir / 'sub' / 'print.par')) is None
@@ -1,7 +1,8 @@
 """These were tests under cli in pandokia."""
 import io
+import os
 import math
-from contextlib import contextmanager, redirect_stderr
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
 import pytest
 
 from .utils import HAS_IRAF
@@ -352,3 +353,166 @@ def test_real_parameter_str_precision():
     stdout = io.StringIO()
     iraf.print_real(1000000000000000.0, Stdout=stdout)
     assert stdout.getvalue() == "1e+15\n"
+
+
+def test_cached_lookups(tmpdir):
+    # names resolved during a CL task run are cached until the
+    # parameter list or the task definitions change
+    from ..iraftask import ParDictListSearch
+    fname = tmpdir / 'lookuptest.cl'
+    fname.write('procedure lookuptest (x)\nint x = 1\nbegin\nend\n')
+    iraf.task(lookuptest=str(fname))
+    task = iraf.lookuptest
+    task.setParList(x=3)
+    search = ParDictListSearch(task)
+    assert search.x == 3
+    search.x = 5
+    assert task.getParam('x') == 5
+    task._deleteRunningParList()
+    task.setParList(x=7)
+    assert search.x == 7
+    assert search.menus == iraf.cl.menus
+    with pytest.raises(AttributeError):
+        search.undefined_parameter
+    task._deleteRunningParList()
+
+    assert iraf.lookuptest is task
+    fname = tmpdir / 'lookuptest2.cl'
+    fname.write('procedure lookuptest (y)\nint y = 1\nbegin\nend\n')
+    iraf.redefine(lookuptest=str(fname))
+    assert iraf.lookuptest is not task
+
+
+def _notranslate(*args, **kw):
+    raise AssertionError("CL script translated")
+
+
+@pytest.mark.parametrize('compiled', [False, True])
+def test_ecl_error_lines(tmpdir, monkeypatch, compiled):
+    # ECL reports the CL line numbers of errors and of the calling task,
+    # also when the scripts come from a pyraf-compile package
+    from .. import cl2py, clcompile
+    monkeypatch.setattr(cl2py, '_parser', None)
+    inner = tmpdir / 'eclinner.cl'
+    inner.write('procedure eclinner (n)\nint n\nbegin\n'
+                '    if (n > 1)\n        error (3, "too big")\nend\n')
+    outer = tmpdir / 'eclouter.cl'
+    outer.write('procedure eclouter ()\nbegin\n    int i, x, z\n'
+                '    z = 0\n    for (i = 1; i <= 2; i += 1) {\n'
+                '        iferr {\n            x = 4 / z\n        } then {\n'
+                '            x = 0\n        }\n    }\n'
+                '    eclinner (2)\nend\n')
+    stderr = io.StringIO()
+    with use_ecl(True), redirect_stderr(stderr):
+        if compiled:
+            outdir = str(tmpdir / 'compiled')
+            with redirect_stdout(io.StringIO()):
+                assert clcompile.main(['-e', str(tmpdir), outdir]) == 0
+            monkeypatch.setattr(clcompile, 'compiledPath', [outdir])
+            monkeypatch.setattr(clcompile, '_packages', {})
+            monkeypatch.setattr(cl2py, 'cl2py', _notranslate)
+        iraf.task(eclinner=str(inner))
+        iraf.task(eclouter=str(outer))
+        with pytest.raises(iraf.IrafError):
+            iraf.eclouter()
+    lines = [
+        line for line in stderr.getvalue().splitlines()
+        if not line.endswith('is a task redefinition')
+    ]
+    assert lines[:2] == [
+        "Warning on line 7 of 'eclouter':  divide by zero - using "
+        "$err_dzvalue = 1 "] * 2
+    assert lines[2:5] == [
+        'ERROR (3): too big ',
+        f'      line 5: {inner} ',
+        "      called as: 'eclinner (2)' ",
+    ]
+    assert lines[6] == f'      line 12: {outer} '
+
+
+def test_deferred_par_save(tmpdir, monkeypatch):
+    # parameters changed by task runs are written in one batch
+    from .. import iraftask
+    uparm = tmpdir.mkdir('uparm')
+    monkeypatch.setitem(iraf.getVarDict(), 'uparm', str(uparm) + '/')
+    monkeypatch.setattr(iraftask, 'parSaveInterval', 3600)
+    fname = tmpdir / 'savetest.cl'
+    fname.write('procedure savetest ()\nint count = 0\n'
+                'begin\n    count = count + 1\nend\n')
+    iraf.task(savetest=str(fname))
+    for i in range(5):
+        iraf.savetest()
+    assert uparm.listdir() == []
+    iraftask.flushParLists()
+    parfile, = uparm.listdir(fil='*.par')
+    assert 'count,i,h,5' in parfile.read()
+    assert uparm.listdir(fil='*.tmp') == []
+    # unlearn discards the pending write
+    iraf.savetest()
+    iraf.savetest.unlearn()
+    iraftask.flushParLists()
+    assert 'count,i,h,5' in parfile.read()
+    assert iraf.savetest.count == 0
+
+
+def test_pending_par_save_written_by_later_task(tmpdir, monkeypatch):
+    # a change is written by the next task run once it is old enough,
+    # even if that task changes nothing
+    from .. import iraftask
+    uparm = tmpdir.mkdir('uparm')
+    monkeypatch.setitem(iraf.getVarDict(), 'uparm', str(uparm) + '/')
+    monkeypatch.setattr(iraftask, 'parSaveInterval', 60)
+    fname = tmpdir / 'savetest.cl'
+    fname.write('procedure savetest ()\nint count = 0\n'
+                'begin\n    count = count + 1\nend\n')
+    noop = tmpdir / 'nooptest.cl'
+    noop.write('procedure nooptest ()\nbegin\nend\n')
+    iraf.task(savetest=str(fname))
+    iraf.task(nooptest=str(noop))
+    # (initializing a task writes the pending changes)
+    iraf.nooptest()
+    iraf.savetest()
+    iraf.nooptest()
+    assert uparm.listdir(fil='*.par') == []
+    monkeypatch.setattr(iraftask, '_pendingSince',
+                        iraftask._pendingSince - 60)
+    iraf.nooptest()
+    parfile, = uparm.listdir(fil='*.par')
+    assert 'count,i,h,1' in parfile.read()
+
+
+def test_save_par_list_elsewhere(tmpdir, monkeypatch):
+    # only the uparm directory gets a lock file
+    uparm = tmpdir.mkdir('uparm')
+    monkeypatch.setitem(iraf.getVarDict(), 'uparm', str(uparm) + '/')
+    fname = tmpdir / 'savetest.cl'
+    fname.write('procedure savetest ()\nint count = 0\nbegin\nend\n')
+    iraf.task(savetest=str(fname))
+    outdir = tmpdir.mkdir('out')
+    iraf.savetest.saveParList(filename=str(outdir / 'savetest.par'))
+    assert sorted(os.listdir(str(outdir))) == ['savetest.par']
+    iraf.savetest.saveParList()
+    assert '.pyraf.lock' in os.listdir(str(uparm))
+
+
+def test_save_par_list_keeps_other_sessions_changes(tmpdir, monkeypatch):
+    # two sessions saving changes to the same uparm file lose nothing
+    from .. import irafpar
+    uparm = tmpdir.mkdir('uparm')
+    monkeypatch.setitem(iraf.getVarDict(), 'uparm', str(uparm) + '/')
+    parfile = uparm / 'savetest.par'
+    parfile.write('a,i,h,1,,,""\nb,i,h,2,,,""\n')
+    first = irafpar.IrafParList('savetest', str(parfile))
+    second = irafpar.IrafParList('savetest', str(parfile))
+    first.setParam('a', 10)
+    first.saveParList(filename=str(parfile))
+    second.setParam('b', 20)
+    second.saveParList(filename=str(parfile))
+    assert second.getValue('a', native=1) == 10
+    saved = irafpar.IrafParList('savetest', str(parfile))
+    assert (saved.a, saved.b) == (10, 20)
+    # a later save of the first session keeps the change of the second
+    first.setParam('a', 11)
+    first.saveParList(filename=str(parfile))
+    saved = irafpar.IrafParList('savetest', str(parfile))
+    assert (saved.a, saved.b) == (11, 20)
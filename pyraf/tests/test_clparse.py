@@ -0,0 +1,134 @@
+import os
+import pickle
+
+import pytest
+
+from pyraf import clcache, clparse, clscan, filecache
+from pyraf.clast import AST
+from pyraf.cltoken import Token
+
+
+def _same(a, b):
+    """Compare two ASTs node by node"""
+    if isinstance(a, Token):
+        return (isinstance(b, Token) and
+                (a.type, a.attr, a.lineno) == (b.type, b.attr, b.lineno))
+    if (a.__class__ is not b.__class__ or a.type != b.type or
+            len(a) != len(b)):
+        return False
+    return all(_same(x, y) for x, y in zip(a, b))
+
+
+def _tokens(source):
+    return clscan.CLScanner().tokenize(source)
+
+
+@pytest.fixture
+def parser(tmpdir, monkeypatch):
+    monkeypatch.setattr(clcache, 'clcache_path', [str(tmpdir)])
+    parser = clparse.CLParser(AST)
+    parser.tableCacheName = 'lalrtables'
+    return parser
+
+
+@pytest.mark.parametrize('source', [
+    'x = (a + b) * -c ** 2 % 3\n',
+    't (a+, b-, c)\n',
+    't (a + b, c)\n',
+    't (,b)\n',
+    't (a=1, b+, c-, >file, d)\n',
+    'task a+ b- c=3, d\n',
+    'a | b > file\n',
+    'if (x)\n  y = 1\n\nelse\n  y = 2\n',
+    'if (x) if (y) print 1 else print 2\n',
+    'switch (x) {\ncase 1:\n  x = 1\n\ncase 2,3:\n  x = 2\n'
+    'default:\n  x = 3\n}\n',
+    'procedure foo(a, b)\n'
+    'string a = "x" {prompt="hi", min=1}\n'
+    'int b = 1, 2 {3, 4, prompt="y"}\n'
+    'real c[3] = 1, 2, 3\n'
+    'begin\n'
+    '  for (i = 1; i <= 3; i += 1) {\n    print (i)\n  }\n'
+    'end\n',
+])
+def test_lalr_matches_earley(parser, source):
+    tokens = _tokens(source)
+    tree = parser.parseLALR(tokens)
+    assert tree is not None
+    assert _same(tree, parser.parseEarley(list(tokens)))
+
+
+def test_table_cache(parser, monkeypatch):
+    monkeypatch.setattr(clparse.CLParser, '_lalrTables', {})
+    tokens = _tokens('t (a+, b-, c)\n')
+    tree = parser.parseLALR(tokens)
+    cachedir = clcache.clcache_path[0]
+    assert os.listdir(cachedir) == ['lalrtables.sqlite3']
+    # a new parser loads the tables written by the first one
+    monkeypatch.setattr(clparse.CLParser, '_lalrTables', {})
+    newparser = clparse.CLParser(AST)
+    newparser.tableCacheName = parser.tableCacheName
+    monkeypatch.setattr(newparser, 'buildLALR', None)
+    assert _same(newparser.parseLALR(tokens), tree)
+    # changed grammar: the tables are built again and replace the old ones
+    monkeypatch.setattr(clparse.CLParser, '_lalrTables', {})
+    newparser = clparse.CLParser(AST)
+    newparser.tableCacheName = parser.tableCacheName
+    newparser.addRule('unused ::= NEWLINE NEWLINE', lambda self, args: None)
+    newparser.parseLALR(tokens)
+    assert os.listdir(cachedir) == ['lalrtables.sqlite3']
+    cache = filecache.openCache('lalrtables')
+    assert list(cache._open().keys()) == ['CLParser']
+    cache.close()
+
+
+def test_lalr_falls_back(parser):
+    # dangling else after a newline is not settled by lookahead
+    tokens = _tokens('if (x) if (y) x = 1\nelse x = 2\n')
+    assert parser.parseLALR(tokens) is None
+    assert _same(parser.parse(list(tokens)), parser.parseEarley(list(tokens)))
+
+
+def test_syntax_error(parser):
+    tokens = _tokens('= f(x,\n')
+    assert parser.parseLALR(tokens) is None
+    with pytest.raises(SyntaxError) as earley:
+        parser.parseEarley(list(tokens))
+    with pytest.raises(SyntaxError) as lalr:
+        parser.parse(list(tokens))
+    assert str(lalr.value) == str(earley.value)
+
+
+def test_token_and_node_compare():
+    token = Token('INTEGER', '3', 1)
+    assert token == 'INTEGER' and token != 'FLOAT'
+    assert token == Token('INTEGER', '4', 2)
+    assert hash(token) == hash('INTEGER')
+    token.exprType = 'int'
+    new = pickle.loads(pickle.dumps(token))
+    assert (new.type, new.attr, new.lineno, new.exprType) == \
+        ('INTEGER', '3', 1, 'int')
+    assert not hasattr(new, 'requireType')
+    node = AST('expr')
+    node[:] = [token]
+    assert node == 'expr' and node == AST('expr') and node != token
+    assert list(node) == [token]
+    with pytest.raises(AttributeError):
+        node.unknown = 1
+
+
+@pytest.mark.parametrize('source, expected', [
+    ('imstat dev$pix fields=mean  lower=1 | tee >> log\n',
+     [('IDENT', 'imstat'), ('STRING', 'dev$pix'), (',', None),
+      ('IDENT', 'fields'), ('=', None), ('STRING', 'mean'), (',', None),
+      ('IDENT', 'lower'), ('=', None), ('STRING', '1'), ('PIPE', '|'),
+      ('IDENT', 'tee'), ('REDIR', '>>'), ('STRING', 'log'),
+      ('NEWLINE', None)]),
+    ('t (a+, x = 1, c // "d")\n',
+     [('IDENT', 't'), ('(', None), ('IDENT', 'a'), ('+', None), (',', None),
+      ('IDENT', 'x'), ('=', None), ('INTEGER', '1'), (',', None),
+      ('IDENT', 'c'), ('//', None), ('QSTRING', 'd'), (')', None),
+      ('NEWLINE', None)]),
+])
+def test_scanner_tokens(source, expected):
+    assert [(t.type, t.attr) for t in _tokens(source)] == expected
@@ -1,6 +1,7 @@
 """These were tests under core/irafparlist and core/subproc in pandokia."""
 
 
+import os
 import time
 import uuid
 
@@ -300,3 +301,84 @@ def test_irafparlist_boolean_convert_true(_ipl, _pars):
     for test_input in test_inputs:
         setattr(_ipl, par.name, test_input)
         assert getattr(_ipl, par.name) == 'yes'
+
+
+def test_irafparlist_field_cache(tmpdir, monkeypatch):
+    from .. import filecache, irafpar
+    cache = filecache.PersistentCache(str(tmpdir.join('parcache')))
+    monkeypatch.setattr(irafpar, 'parFieldCache', cache)
+    parfile = tmpdir.join('cached.par')
+    parfile.write('input,s,a,"a, b",,,"Input \\\n  images"\n'
+                  'niter,i,h,3,1,10,"Iterations"\n'
+                  'mode,s,h,"al"\n')
+    expected = [p.save() for p in irafpar._parsepar(str(parfile))[0]]
+    assert [p.save() for p in irafpar._readpar(str(parfile))] == expected
+    stat = os.stat(str(parfile))
+    assert len(cache.get(str(parfile), stat)) == 3
+    # parameters now come from the cache
+    monkeypatch.setattr(irafpar, '_parsepar', None)
+    assert [p.save() for p in irafpar._readpar(str(parfile))] == expected
+    cache.close()
+    monkeypatch.undo()
+    # a changed file is parsed again
+    parfile.write('niter,i,h,5,1,10,"Iterations"\n')
+    monkeypatch.setattr(irafpar, 'parFieldCache', cache)
+    ipl = IrafParList('cached', str(parfile))
+    assert ipl.getParList()[0].value == 5
+
+
+def test_irafparlist_field_cache_warnings(tmpdir, monkeypatch):
+    # files with warnings are not cached, so strict reads still fail
+    from .. import filecache, irafpar
+    cache = filecache.PersistentCache(str(tmpdir.join('parcache')))
+    monkeypatch.setattr(irafpar, 'parFieldCache', cache)
+    parfile = tmpdir.join('dup.par')
+    parfile.write('niter,i,h,3,1,10,"Iterations"\n'
+                  'niter,i,h,4,1,10,"Iterations"\n')
+    assert len(irafpar._readpar(str(parfile))) == 1
+    assert cache.get(str(parfile), os.stat(str(parfile))) is None
+    with pytest.raises(SyntaxError):
+        irafpar._readpar(str(parfile), strict=1)
+    cache.close()
+
+
+def test_persistent_cache(tmpdir):
+    from .. import filecache
+    fname = str(tmpdir.join('cache'))
+    datafile = tmpdir.join('data.txt')
+    datafile.write('data')
+    stat = os.stat(str(datafile))
+    cache = filecache.PersistentCache(fname, 2)
+    cache.add('data', [1, 2], stat)
+    cache.add('other', 'value')
+    cache.close()
+    cache = filecache.PersistentCache(fname, 2)
+    assert cache.get('data', stat) == [1, 2]
+    assert cache.get('data') is None
+    assert cache.get('other') == 'value'
+    datafile.write('changed data')
+    assert cache.get('data', os.stat(str(datafile))) is None
+    cache.close()
+    # entries of another version are ignored
+    cache = filecache.PersistentCache(fname, 3)
+    assert cache.get('other') is None
+    cache.close()
+
+
+def test_list_par_reads_lazily(tmpdir):
+    from .. import irafpar
+    listfile = tmpdir.join('images.lis')
+    listfile.write('a.fits\nb.fits\nc.fits')
+    par = irafpar.makeIrafPar(str(listfile), datatype='string',
+                              name='images', list_flag=1)
+    assert par.get() == 'a.fits'
+    # only the lines read so far have been consumed from the file
+    assert par.fh.tell() == len('a.fits\n')
+    assert [par.get(), par.get()] == ['b.fits', 'c.fits']
+    for i in range(2):
+        with pytest.raises(EOFError):
+            par.get()
+    # assigning the file again rewinds the list
+    par.set(str(listfile))
+    assert par.fh is None
+    assert par.get() == 'a.fits'
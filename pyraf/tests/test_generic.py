@@ -0,0 +1,73 @@
+import sys
+
+from pyraf.clast import AST
+from pyraf.cltoken import Token
+from pyraf.generic import GenericASTTraversal, fusedTraversal
+
+
+def _tree(type, *kids):
+    node = AST(type)
+    node[:] = list(kids)
+    return node
+
+
+class Trace(GenericASTTraversal):
+
+    def __init__(self, ast, prune=None):
+        GenericASTTraversal.__init__(self, ast)
+        self.visits = []
+        self.pruneType = prune
+
+    def default(self, node):
+        self.visits.append(node.type)
+        if node.type == self.pruneType:
+            self.prune()
+
+    def n_b_exit(self, node):
+        self.visits.append('b_exit')
+
+
+def _sample():
+    return _tree('a', _tree('b', Token('x'), _tree('c', Token('y'))),
+                 Token('z'))
+
+
+def test_preorder_exit_and_prune():
+    t = Trace(_sample())
+    t.preorder()
+    assert t.visits == ['a', 'b', 'x', 'c', 'y', 'b_exit', 'z']
+    t = Trace(_sample(), prune='b')
+    t.preorder()
+    assert t.visits == ['a', 'b', 'z']
+
+
+def test_postorder():
+    t = Trace(_sample())
+    t.postorder()
+    assert t.visits == ['x', 'y', 'c', 'b', 'z', 'a']
+
+
+def test_fused_traversal():
+    ast = _sample()
+    pre = Trace(ast)
+    post = Trace(ast)
+    fusedTraversal(ast, preorder=(pre,), postorder=(post,))
+    expected_pre = Trace(ast)
+    expected_pre.preorder()
+    expected_post = Trace(ast)
+    expected_post.postorder()
+    assert pre.visits == expected_pre.visits
+    assert post.visits == expected_post.visits
+
+
+def test_deep_tree():
+    depth = 3 * sys.getrecursionlimit()
+    ast = Token('leaf')
+    for i in range(depth):
+        ast = _tree('node', ast)
+    t = Trace(ast)
+    t.preorder()
+    assert len(t.visits) == depth + 1
+    t = Trace(ast)
+    t.postorder()
+    assert t.visits[0] == 'leaf'
@@ -0,0 +1,262 @@
+import os
+
+import numpy
+import pytest
+
+from pyraf import gki, irafgwcs
+from pyraf.tools.irafglobals import IrafError
+
+
+def _page(n):
+    """History entry with n words of metacode"""
+    buffer = gki.GkiBuffer()
+    buffer.append(numpy.arange(n, dtype=numpy.int16))
+    return (buffer, f'wcs{n}', f'task{n}', [n])
+
+
+def test_page_history_spills_oldest_pages():
+    history = gki.PageHistory(maxLive=3)
+    for n in range(1, 7):
+        history.append(_page(n))
+    assert len(history) == 6
+    assert [history.isSpilled(i) for i in range(6)] == \
+        [True, True, True, False, False, False]
+    # names are available without restoring the page
+    assert [history.getName(i) for i in range(6)] == \
+        [f'task{n}' for n in range(1, 7)]
+
+
+def test_page_history_restores_metacode():
+    history = gki.PageHistory(maxLive=2)
+    for n in range(1, 5):
+        history.append(_page(n))
+    buffer, wcs, name, other = history[0]
+    assert other is None
+    assert (wcs, name) == ('wcs1', 'task1')
+    numpy.testing.assert_array_equal(buffer.get(), [0])
+    # restored page is now live, the least recently used one got spilled
+    assert not history.isSpilled(0)
+    assert history.isSpilled(2)
+    # last page is never spilled
+    history[0] = (buffer, wcs, name, ['redrawn'])
+    assert history[0][3] == ['redrawn']
+    assert not history.isSpilled(-1)
+    buffer, wcs, name, other = history[2]
+    numpy.testing.assert_array_equal(buffer.get(), numpy.arange(3))
+
+
+def test_page_history_delete():
+    history = gki.PageHistory(maxLive=1)
+    for n in range(1, 4):
+        history.append(_page(n))
+    del history[1]
+    assert [history.getName(i) for i in range(2)] == ['task1', 'task3']
+    del history[:]
+    assert len(history) == 0
+    assert history._spillFile is None
+
+
+def _spillFileSize(history):
+    fh = history._spillFile._fh
+    fh.seek(0, 2)
+    return fh.tell()
+
+
+def test_page_history_spill_file_is_bounded():
+    history = gki.PageHistory(maxLive=2)
+    for n in range(1, 9):
+        history.append(_page(n))
+    # cycle through all pages a few times: unchanged pages are not
+    # written to the spill file again
+    for cycle in range(3):
+        for i in range(len(history)):
+            history[i]
+        if cycle == 0:
+            size = _spillFileSize(history)
+    assert _spillFileSize(history) == size
+    # edited pages need a new copy, but old copies are dropped
+    for cycle in range(5):
+        for i in range(len(history) - 1):
+            buffer, wcs, name, other = history[i]
+            buffer.append(numpy.array([cycle], dtype=numpy.int16))
+            history[i] = (buffer, wcs, name, other)
+    assert len(history._spillFile) <= 2 * len(history)
+    for i in range(len(history) - 1):
+        buffer = history[i][0]
+        numpy.testing.assert_array_equal(
+            buffer.get(),
+            numpy.concatenate((numpy.arange(i + 1), numpy.arange(5))))
+
+
+def _instruction(opcode, *args):
+    return [gki.BOI, opcode, 3 + len(args)] + list(args)
+
+
+def _plot(n):
+    """Metacode for a cleared page with n polylines"""
+    return (_instruction(gki.GKI_OPENWS, 5) + _instruction(gki.GKI_CLEARWS) +
+            _instruction(gki.GKI_POLYLINE, 2, 0, 0, 100, 100) * n)
+
+
+def test_metacode_file_pages(tmpdir):
+    fname = str(tmpdir.join('plots.gki'))
+    with gki.MetacodeFile(fname, 'w') as mfile:
+        mfile.append(_plot(1), 'task1', irafgwcs.IrafGWcs())
+        mfile.append(_plot(2), 'task2')
+    # appending does not touch the pages already written
+    with gki.MetacodeFile(fname, 'a') as mfile:
+        assert len(mfile) == 2
+        mfile.append(_plot(3), 'task3')
+    with gki.MetacodeFile(fname) as mfile:
+        assert len(mfile) == 3
+        assert [mfile.getName(i) for i in range(3)] == \
+            ['task1', 'task2', 'task3']
+        numpy.testing.assert_array_equal(mfile.getPage(1), _plot(2))
+        assert isinstance(mfile.getPage(2), numpy.memmap)
+        assert mfile.getWcs(0).wcs == irafgwcs.IrafGWcs().wcs
+        assert mfile.getWcs(1) is None
+        with pytest.raises(IrafError):
+            mfile.append(_plot(1))
+
+
+def test_metacode_file_truncated_page(tmpdir):
+    fname = str(tmpdir.join('plots.gki'))
+    with gki.MetacodeFile(fname, 'w') as mfile:
+        mfile.append(_plot(1), 'task1')
+        mfile.append(_plot(2), 'task2')
+    with open(fname, 'r+b') as fh:
+        fh.truncate(os.path.getsize(fname) - 4)
+    with gki.MetacodeFile(fname, 'a') as mfile:
+        assert len(mfile) == 1
+        mfile.append(_plot(3), 'task3')
+    with gki.MetacodeFile(fname) as mfile:
+        assert [mfile.getName(i) for i in range(2)] == ['task1', 'task3']
+        numpy.testing.assert_array_equal(mfile.getPage(1), _plot(3))
+
+
+def test_metacode_file_plain(tmpdir):
+    path = tmpdir.join('plain.gki')
+    metacode = _plot(1) + _plot(2) + _instruction(gki.GKI_CLEARWS) + _plot(1)
+    path.write_binary(numpy.array(metacode, numpy.int16).tobytes())
+    with gki.MetacodeFile(str(path)) as mfile:
+        assert mfile.raw
+        assert len(mfile) == 3
+        numpy.testing.assert_array_equal(mfile.getPage(0), _plot(1))
+        # the clear and open that follow it belong to the same page
+        numpy.testing.assert_array_equal(
+            mfile.getPage(2), _instruction(gki.GKI_CLEARWS) + _plot(1))
+        with pytest.raises(IrafError):
+            gki.MetacodeFile(str(path), 'a').append(_plot(1))
+
+
+def test_page_history_insert_file(tmpdir):
+    fname = str(tmpdir.join('plots.gki'))
+    with gki.MetacodeFile(fname, 'w') as mfile:
+        for n in (1, 2, 3):
+            mfile.append(_plot(n), f'task{n}' if n != 2 else '')
+    history = gki.PageHistory([_page(4)])
+    mfile = gki.MetacodeFile(fname)
+    history.insertFile(0, mfile, range(2), 'loaded')
+    assert len(history) == 3
+    assert [history.getName(i) for i in range(3)] == \
+        ['task1', 'loaded', 'task4']
+    metacode, wcs, name = history.getMetacode(1)
+    numpy.testing.assert_array_equal(metacode, _plot(2))
+    assert history.isSpilled(1)
+    buffer, wcs, name, other = history[1]
+    assert other is None
+    numpy.testing.assert_array_equal(buffer.get(), _plot(2))
+
+
+def test_page_history_save_over_loaded_file(tmpdir):
+    fname = str(tmpdir.join('plots.gki'))
+    with gki.MetacodeFile(fname, 'w') as mfile:
+        for n in (1, 2):
+            mfile.append(_plot(n), f'task{n}')
+    buffer, wcs, name, other = _page(4)
+    history = gki.PageHistory([(buffer, irafgwcs.IrafGWcs(), name, other)])
+    mfile = gki.MetacodeFile(fname)
+    history.insertFile(0, mfile)
+    history.save(fname)
+    # the loaded pages are still read from the old file
+    numpy.testing.assert_array_equal(history.getMetacode(1)[0], _plot(2))
+    with gki.MetacodeFile(fname) as saved:
+        assert len(saved) == 3
+        assert [saved.getName(i) for i in range(3)] == \
+            ['task1', 'task2', 'task4']
+        numpy.testing.assert_array_equal(saved.getPage(0), _plot(1))
+        numpy.testing.assert_array_equal(saved.getPage(2), numpy.arange(4))
+    assert os.listdir(str(tmpdir)) == ['plots.gki']
+
+
+def test_page_history_closes_loaded_files(tmpdir):
+    fname = str(tmpdir.join('plots.gki'))
+    with gki.MetacodeFile(fname, 'w') as mfile:
+        for n in (1, 2):
+            mfile.append(_plot(n), f'task{n}')
+    history = gki.PageHistory([_page(4)])
+    mfile = gki.MetacodeFile(fname)
+    history.insertFile(0, mfile)
+    del history[0]
+    assert mfile._fh is not None
+    del history[0]
+    assert mfile._fh is None
+    assert history._files == []
+    # clearing the history closes them too
+    mfile = gki.MetacodeFile(fname)
+    history.insertFile(0, mfile)
+    del history[:]
+    assert mfile._fh is None
+
+
+def test_buffer_split_and_append():
+    buffer = gki.GkiBuffer()
+    buffer.append(_plot(2))
+    gki.gkiTranslate(buffer, [None] * (gki.GKI_MAX_OP_CODE + 1))
+    buffer.append(_plot(1))
+    # split at the end of the translated metacode, as clear() does
+    newbuffer = buffer.split()
+    numpy.testing.assert_array_equal(newbuffer.get(), _plot(1))
+    # neither buffer overwrites the other
+    newbuffer.append(_plot(3))
+    buffer.append(_plot(1))
+    numpy.testing.assert_array_equal(buffer.get(), _plot(2) + _plot(1))
+    numpy.testing.assert_array_equal(newbuffer.get(), _plot(1) + _plot(3))
+
+
+def test_buffer_delget_and_reset():
+    buffer = gki.GkiBuffer()
+    gotten = []
+    for n in range(1, 4):
+        buffer.append(_plot(n))
+        while buffer.getNextCode()[0] is not None:
+            pass
+        gotten.append(buffer.delget())
+        assert len(buffer) == 0
+    for n, metacode in enumerate(gotten, start=1):
+        numpy.testing.assert_array_equal(metacode, _plot(n))
+
+
+def test_buffer_undo_redo():
+    buffer = gki.GkiBuffer()
+    buffer.append(_plot(1))
+    buffer.append(_plot(2), isUndoable=1)
+    assert buffer.undoN()
+    numpy.testing.assert_array_equal(buffer.get(), _plot(1))
+    buffer.append(_plot(3))
+    assert buffer.redoN()
+    numpy.testing.assert_array_equal(buffer.get(),
+                                     _plot(1) + _plot(3) + _plot(2))
+
+
+def test_buffer_long_page():
+    # instruction offsets beyond the int16 range
+    metacode = _plot(10000)
+    buffer = gki.GkiBuffer()
+    for i in range(0, len(metacode), 1000):
+        buffer.append(metacode[i:i + 1000])
+    count = 0
+    while buffer.getNextCode()[0] is not None:
+        count = count + 1
+    assert count == 10002
+    assert buffer.nextTranslate == len(metacode) == len(buffer)
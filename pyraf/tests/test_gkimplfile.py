@@ -0,0 +1,67 @@
+import os
+
+import numpy
+import pytest
+
+from pyraf import gki
+
+pytest.importorskip('matplotlib')
+
+from pyraf import GkiMplFile  # noqa: E402
+
+
+def _instruction(opcode, *args):
+    return [gki.BOI, opcode, 3 + len(args)] + list(args)
+
+
+def _page():
+    """Metacode for a page with a box and a label"""
+    text = [ord(c) for c in 'pyraf']
+    return (_instruction(gki.GKI_CLEARWS) +
+            _instruction(gki.GKI_PLSET, 1, 100, 1) +
+            _instruction(gki.GKI_POLYLINE, 5, 1000, 1000, 30000, 1000,
+                         30000, 30000, 1000, 30000, 1000, 1000) +
+            _instruction(gki.GKI_TEXT, 16000, 16000, len(text), *text))
+
+
+def _metacode(npages):
+    return numpy.array(_page() * npages, dtype=numpy.int16)
+
+
+def test_kernel_writes_one_file_per_page(tmpdir):
+    root = os.path.join(tmpdir.strpath, 'plot')
+    kernel = GkiMplFile.GkiMplFileKernel('svg', root=root)
+    kernel.append(_metacode(3))
+    kernel.flush()
+    assert kernel.outputFiles == [root + f'{i:04d}.svg' for i in (1, 2, 3)]
+    for fname in kernel.outputFiles:
+        assert os.path.getsize(fname) > 0
+    # translated metacode is not kept
+    assert len(kernel.gkibuffer) == 0
+
+
+def test_kernel_bad_format():
+    with pytest.raises(ValueError):
+        GkiMplFile.GkiMplFileKernel('gif', root='plot')
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_render_files(tmpdir, workers):
+    paths = []
+    for i in range(3):
+        path = tmpdir.join(f'meta{i}.gki')
+        path.write_binary(_metacode(i + 1).tobytes())
+        paths.append(str(path))
+    result = gki.render_files(paths, 'png', workers=workers)
+    assert [len(files) for files in result] == [1, 2, 3]
+    for files in result:
+        for fname in files:
+            with open(fname, 'rb') as fh:
+                assert fh.read(8) == b'\x89PNG\r\n\x1a\n'
+
+
+def test_stdgraph_selects_file_kernel():
+    controller = gki.GkiController()
+    controller.openKernel('mplpdf')
+    assert isinstance(controller.stdgraph, GkiMplFile.GkiMplFileKernel)
+    assert controller.stdgraph.fmt == 'pdf'
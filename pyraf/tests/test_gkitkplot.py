@@ -0,0 +1,151 @@
+import base64
+import struct
+import zlib
+
+import numpy
+import pytest
+
+from pyraf import gki
+
+try:
+    from pyraf import gkitkplot
+except Exception:
+    pytestmark = pytest.mark.skip('No graphics available')
+
+
+def _readPng(data):
+    """Return dict of the chunks in base64 PNG data"""
+    png = base64.b64decode(data)
+    assert png[:8] == b'\x89PNG\r\n\x1a\n'
+    chunks = {}
+    pos = 8
+    while pos < len(png):
+        n, = struct.unpack('>I', png[pos:pos + 4])
+        ctype = png[pos + 4:pos + 8]
+        cdata = png[pos + 8:pos + 8 + n]
+        crc, = struct.unpack('>I', png[pos + 8 + n:pos + 12 + n])
+        assert crc == zlib.crc32(ctype + cdata) & 0xffffffff
+        chunks[ctype] = cdata
+        pos += 12 + n
+    return chunks
+
+
+def _pixels(chunks, width, height):
+    raw = numpy.frombuffer(zlib.decompress(chunks[b'IDAT']), numpy.uint8)
+    rows = raw.reshape(height, -1)
+    # no filter on any row
+    assert (rows[:, 0] == 0).all()
+    return numpy.unpackbits(rows[:, 1:], axis=1)[:, :width].astype(bool)
+
+
+def test_marker_image_data():
+    width, height = 13, 5
+    points = numpy.array([[0, 0], [12, 4], [3, 2], [3, 2], [12, 0],
+                          [-1, 2], [13, 2], [5, -1], [5, 5], [-3, -3]],
+                         dtype=numpy.int32)
+    chunks = _readPng(gkitkplot.markerImageData(points, width, height,
+                                                '#ff8000'))
+    assert set(chunks) == {b'IHDR', b'PLTE', b'tRNS', b'IDAT', b'IEND'}
+    # 1-bit palette image
+    assert struct.unpack('>IIBBBBB', chunks[b'IHDR']) == \
+        (width, height, 1, 3, 0, 0, 0)
+    assert chunks[b'PLTE'] == b'\0\0\0\xff\x80\0'
+    # background is transparent
+    assert chunks[b'tRNS'] == b'\0'
+    # points off the canvas are left out
+    expected = numpy.zeros((height, width), dtype=bool)
+    for x, y in [(0, 0), (12, 4), (3, 2), (12, 0)]:
+        expected[y, x] = True
+    numpy.testing.assert_array_equal(_pixels(chunks, width, height),
+                                     expected)
+
+
+class _PhotoImage:
+
+    def __init__(self, master=None, data=None, format=None):
+        self.data = data
+
+
+class _Canvas:
+
+    def __init__(self):
+        self.size = (40, 30)
+        self.images = []
+
+    def winfo_width(self):
+        return self.size[0]
+
+    def winfo_height(self):
+        return self.size[1]
+
+    def delete(self, *args):
+        self.images = []
+
+    def create_image(self, x, y, image=None, anchor=None):
+        self.images.append(image)
+
+    def flush(self):
+        pass
+
+
+class _ColorManager:
+
+    def setDrawingColor(self, color):
+        return '#ffffff'
+
+
+class _DrawBuffer:
+
+    def __init__(self, items):
+        self.items = items
+
+    def get(self):
+        return self.items
+
+
+class _TextAttributes:
+
+    def setFontSize(self, kernel):
+        pass
+
+
+@pytest.fixture
+def kernel(monkeypatch):
+    monkeypatch.setattr(gkitkplot.tkinter, 'PhotoImage', _PhotoImage)
+    monkeypatch.setattr(gkitkplot, 'MARKER_IMAGE_THRESHOLD', 3)
+    kernel = gkitkplot.GkiTkplotKernel.__new__(gkitkplot.GkiTkplotKernel)
+    kernel.gwidget = _Canvas()
+    kernel.colorManager = _ColorManager()
+    kernel.markerAttributes = gki.MarkerAttributes()
+    kernel.textAttributes = _TextAttributes()
+    kernel._markerImages = {}
+    kernel._lastMarkerImages = {}
+    kernel.activate = lambda: None
+    kernel.tkplot_faset = lambda *args: None
+    kernel.tkplot_fillarea = lambda *args: None
+    return kernel
+
+
+def test_marker_image_reused_by_redraw(kernel):
+    vertices = numpy.array([0.1, 0.1, 0.5, 0.5, 0.9, 0.2])
+    kernel.drawBuffer = _DrawBuffer([(kernel.tkplot_polymarker,
+                                      (vertices,))])
+    kernel.redraw()
+    photo, = kernel.gwidget.images
+    # same size: the image is not built again
+    kernel.redraw()
+    assert kernel.gwidget.images == [photo]
+    assert len(kernel._markerImages) == 1
+    assert kernel._lastMarkerImages == {}
+    # new size: a new image
+    kernel.gwidget.size = (80, 60)
+    kernel.redraw()
+    newphoto, = kernel.gwidget.images
+    assert newphoto is not photo
+    chunks = _readPng(newphoto.data)
+    assert struct.unpack('>II', chunks[b'IHDR'][:8]) == (80, 60)
+    assert _pixels(chunks, 80, 60).sum() == 3
+    # images no longer drawn are released
+    kernel.drawBuffer = _DrawBuffer([])
+    kernel.redraw()
+    assert kernel._markerImages == {}
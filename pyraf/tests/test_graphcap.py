@@ -0,0 +1,47 @@
+import os
+
+from .. import filecache, graphcap
+
+_graphcap = '''# test graphcap
+stdgraph|sg|default terminal:tc=xterm:
+xterm|xt|xterm graphics:\\
+\t:xr#1024:yr#780:ch#.0294:tc=g_base:
+g_base|base|common entries:\\
+\t:kf=cl:tn=stdgraph:xr#800:zr@:LO#1:
+loop1|first half of a circular definition:tc=loop2:
+loop2|second half:a1=two:tc=loop1:
+'''
+
+
+def test_graphcap_resolves_tc_chains(tmpdir, monkeypatch):
+    cache = filecache.PersistentCache(str(tmpdir / 'graphcap'),
+                                      graphcap._cacheVersion)
+    monkeypatch.setattr(graphcap, 'deviceCache', cache)
+    gcfile = tmpdir / 'graphcap.txt'
+    gcfile.write(_graphcap)
+    gc = graphcap.GraphCap(str(gcfile))
+    assert 'sg' in gc and 'nodevice' not in gc
+    device = gc['sg']
+    assert device.devname == 'sg'
+    # attributes come from the first entry in the chain that defines them
+    assert device['xr'] == 1024
+    assert device['kf'] == 'cl'
+    assert device['zr'] is None
+    assert device['tc'] == 'xterm'
+    assert device['nd'] is None
+    assert gc['stdgraph'] == device
+    assert gc['xterm'] != device
+    assert gc['loop1']['a1'] == 'two'
+
+    # a new session takes the resolved devices from the cache
+    cache.close()
+    monkeypatch.setattr(graphcap, 'merge', None)
+    assert graphcap.GraphCap(str(gcfile))['sg']['ch'] == 0.0294
+    monkeypatch.undo()
+
+    # and parses the file again when it changes
+    monkeypatch.setattr(graphcap, 'deviceCache', cache)
+    gcfile.write(_graphcap.replace('xr#1024', 'xr#20480'))
+    assert graphcap.GraphCap(str(gcfile))['sg']['xr'] == 20480
+    assert os.path.exists(str(tmpdir / 'graphcap.sqlite3'))
+    cache.close()
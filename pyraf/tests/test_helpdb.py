@@ -0,0 +1,135 @@
+import io
+import os
+import types
+
+import pytest
+
+from .. import filecache, helpdb, iraf, irafhelp
+
+_root_hd = '''# Root help directory
+$demo = "demo$"
+
+demo\tmen = demo$demo.men,
+\thlp = ..,
+\tpkg = demo$demo.hd
+'''
+
+_demo_hd = '''# Help directory for the DEMO package
+
+$doc = "./doc/"
+
+imsum\thlp = doc$imsum.hlp, src = imsum.cl
+imavg\thlp=doc$imsum.hlp
+'''
+
+_demo_men = '''     imavg - Average a list of images
+     imsum - Sum a list of images
+'''
+
+_imsum_hlp = '''.help imsum,imavg Oct26 demo
+.ih
+NAME
+imsum -- Sum a list of \\fBimages\\fR
+.ih
+USAGE
+imsum input output
+.ih
+PARAMETERS
+.ls input
+List of input
+images.
+.le
+.ls output
+Output image.
+.le
+.ih
+EXAMPLES
+.nf
+    cl> imsum a,b c
+.fi
+.endhelp
+'''
+
+
+@pytest.fixture
+def helpdir(tmpdir, monkeypatch):
+    pkgdir = tmpdir.mkdir('demo')
+    pkgdir.mkdir('doc')
+    (tmpdir / 'root.hd').write(_root_hd)
+    (pkgdir / 'demo.hd').write(_demo_hd)
+    (pkgdir / 'demo.men').write(_demo_men)
+    (pkgdir / 'doc' / 'imsum.hlp').write(_imsum_hlp)
+    varDict = iraf.getVarDict()
+    monkeypatch.setitem(varDict, 'demo', str(pkgdir) + '/')
+    monkeypatch.setitem(varDict, 'helpdb', str(tmpdir / 'helpdb.mip'))
+    monkeypatch.setattr(helpdb, 'indexStore',
+                        filecache.PersistentCache(str(tmpdir / 'helpindex'),
+                                                  helpdb._indexVersion))
+    monkeypatch.setattr(helpdb, '_index', None)
+    return tmpdir
+
+
+def test_help_index(helpdir):
+    index = helpdb.getIndex()
+    assert index.roots == [str(helpdir / 'root.hd')]
+    entry, = index.lookup('demo.imsum')
+    assert entry.hlp == str(helpdir / 'demo' / 'doc' / 'imsum.hlp')
+    assert entry.src == str(helpdir / 'demo' / 'imsum.cl')
+    assert entry.description == 'Sum a list of images'
+    assert index.lookup('other.imsum') == []
+    assert [e.name for e in helpdb.search('LIST', 'images')] == \
+        ['imsum', 'imavg']
+    assert [e.name for e in helpdb.search('average')] == ['imavg']
+
+    # the saved index is used by a new session
+    helpdb._index = None
+    assert helpdb.getIndex().entries == index.entries
+    # and rebuilt when a file changes
+    (helpdir / 'demo' / 'demo.men').write(
+        _demo_men.replace('Average', 'Mean of'))
+    assert [e.name for e in helpdb.search('mean')] == ['imavg']
+
+
+def test_help_text(helpdir):
+    text = helpdb.getHelpText('imavg')
+    lines = text.splitlines()
+    assert lines[0].startswith('IMSUM (Oct26)')
+    assert lines[0].endswith('IMSUM (Oct26)')
+    assert 'demo' in lines[0]
+    assert '    imsum -- Sum a list of images' in lines
+    assert lines[lines.index('PARAMETERS') + 2:][:4] == \
+        ['    input', '        List of input images.', '', '    output']
+    assert '        cl> imsum a,b c' in lines
+    text = helpdb.getHelpText('imsum', section='usage')
+    assert text.split('\n') == ['', 'USAGE', '    imsum input output', '']
+    assert helpdb.getHelpText('demo') == _demo_men
+    assert helpdb.getHelpText('nosuchtask') is None
+
+
+def test_help_without_subprocess(helpdir, capsys):
+    stdout = io.StringIO()
+    irafhelp.help('imsum', page=0, Stdout=stdout)
+    assert 'USAGE' in stdout.getvalue()
+    entries = irafhelp.apropos('average')
+    assert [e.name for e in entries] == ['imavg']
+    assert capsys.readouterr().out == \
+        '              demo.imavg - Average a list of images\n'
+    assert os.path.exists(str(helpdir / 'helpindex.sqlite3'))
+
+
+def test_help_keywords_for_iraf(helpdir, monkeypatch):
+    # keywords that the local formatting does not handle go to system.help
+    calls = []
+    system = types.SimpleNamespace(
+        help=lambda taskname, **kw: calls.append((taskname, kw)))
+    monkeypatch.setattr(irafhelp, 'iraf',
+                        types.SimpleNamespace(system=system,
+                                              Expand=lambda name, noerror: name))
+    for kw in ({'device': 'lw'}, {'nlpp': 20}, {'page': 0, 'mode': 'h'}):
+        assert irafhelp._irafHelp('imsum', dict(kw)) == 1
+        assert calls.pop() == ('imsum', dict({'page': 1}, **kw))
+    stdout = io.StringIO()
+    monkeypatch.setattr('sys.stdout', stdout)
+    assert irafhelp._irafHelp('imsum', {'page': 0, 'section': 'usage'}) == 1
+    assert calls == []
+    assert 'imsum input output' in stdout.getvalue()
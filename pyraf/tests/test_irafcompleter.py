@@ -0,0 +1,34 @@
+import os
+
+from .. import irafcompleter
+
+
+def test_name_index():
+    index = irafcompleter.NameIndex(['imcopy', 'imstat', 'implot', 'xyz'])
+    assert index.matches('im') == ['imcopy', 'implot', 'imstat']
+    assert index.matches('imc') == ['imcopy']
+    assert index.matches('q') == []
+    assert index.matches('') == ['imcopy', 'implot', 'imstat', 'xyz']
+    namespace = {'imcopy': 1, 'imarith': 2, 'xyz': 3}
+    index.update(namespace.keys())
+    assert index.names == ['imarith', 'imcopy', 'xyz']
+    assert index.matches('im') == ['imarith', 'imcopy']
+
+
+def test_filename_matches(tmpdir, monkeypatch):
+    monkeypatch.chdir(tmpdir)
+    monkeypatch.setattr(irafcompleter, '_dirCache', {})
+    tmpdir.mkdir('subdir')
+    for name in ('data1.fits', 'data2.fits', '.hidden', 'subdir/data3'):
+        (tmpdir / name).write('')
+    completer = irafcompleter.IrafCompleter()
+    assert completer.filename_matches('da', 'imstat ') == \
+        ['data1.fits', 'data2.fits']
+    assert completer.filename_matches('', 'imstat ') == \
+        ['data1.fits', 'data2.fits', 'subdir' + os.sep]
+    assert completer.filename_matches('.h', 'imstat ') == ['.hidden']
+    assert completer.filename_matches('d', 'imstat subdir/') == ['data3']
+    assert completer.filename_matches('da*', 'imstat ') == []
+    # the listing is reused until the directory changes
+    (tmpdir / 'data4').write('')
+    assert 'data4' in completer.filename_matches('da', 'imstat ')
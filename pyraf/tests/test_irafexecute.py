@@ -0,0 +1,227 @@
+import hashlib
+import io
+import os
+import sys
+
+import pytest
+
+from .. import irafexecute
+
+# Stand-in for an IRAF executable speaking the CL IPC protocol: records
+# of 16-bit characters behind a 4-byte header.  After the CL sends the
+# task name, the task asks for all its parameters in one message and
+# reports in a parameter how many of the replies were as expected.
+_fakeTask = '''#!{python}
+import os
+import struct
+from array import array
+
+NPARS = {npars}
+
+
+def readn(n):
+    data = b''
+    while len(data) < n:
+        chunk = os.read(0, n - len(data))
+        if not chunk:
+            raise SystemExit(0)
+        data += chunk
+    return data
+
+
+def readLines():
+    while True:
+        header = readn(4)
+        assert header[:2] == b'P\\x02'
+        nbytes = struct.unpack('=h', header[2:])[0]
+        text = readn(nbytes)[::2].decode()
+        yield from text.splitlines()
+
+
+def send(text):
+    data = array('h', list(text.encode())).tobytes()
+    os.write(1, b'P\\x02' + struct.pack('=h', len(data)) + data)
+
+
+lines = readLines()
+while next(lines) != 'fake':
+    pass
+send(''.join(f'=p{{i}}\\n' for i in range(NPARS)))
+ok = sum(next(lines) == f'value of p{{i}}' for i in range(NPARS))
+send(f'ok={{ok}}\\nbye\\n')
+while next(lines) != 'bye':
+    pass
+'''
+
+
+# Stand-in task using the shared memory side channel when PyRAF offers
+# it: it writes a long line to stdout with xmit, reads a long line from
+# stdin with xfer, and reports a digest of that line and the segment name.
+_shmTask = '''#!{python}
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+
+NCHARS = {nchars}
+
+
+def readn(n):
+    data = b''
+    while len(data) < n:
+        chunk = os.read(0, n - len(data))
+        if not chunk:
+            raise SystemExit(0)
+        data += chunk
+    return data
+
+
+def readRecord():
+    header = readn(4)
+    assert header[:2] == b'P\\x02'
+    return readn(struct.unpack('=h', header[2:])[0])
+
+
+def send(text, data=None):
+    if data is None:
+        data = array('h', list(text.encode())).tobytes()
+    os.write(1, b'P\\x02' + struct.pack('=h', len(data)) + data)
+
+
+# the task name has the redirection flags appended
+while not readRecord()[::2].startswith(b'fake'):
+    pass
+send('shmget(1000000)\\n')
+reply = readRecord()[::2].decode().split()
+if reply:
+    name, threshold = reply[0], int(reply[1])
+    fd = os.open('/dev/shm' + name, os.O_RDWR)
+    segment = mmap.mmap(fd, 1000000)
+    os.close(fd)
+else:
+    name, threshold = '', None
+
+line = (b'0123456789' * NCHARS)[:NCHARS - 1] + b'\\n'
+data = array('h', list(line)).tobytes()
+if threshold is not None and len(data) >= threshold:
+    segment[:len(data)] = data
+    send(f'shmxmit(4,{{NCHARS}})\\n')
+else:
+    for i in range(0, NCHARS, 4000):
+        chunk = data[2 * i:2 * (i + 4000)]
+        send(f'xmit(4,{{len(chunk) // 2}})\\n')
+        send('', chunk)
+
+send(f'{{"shmxfer" if name else "xfer"}}(3,{{2 * NCHARS}})\\n')
+nchars = int(readRecord()[::2])
+data = b''
+while len(data) < 2 * nchars:
+    record = readRecord()
+    if not record:
+        data = segment[:2 * nchars]
+        break
+    data += record
+digest = hashlib.md5(data[::2]).hexdigest()
+send(f'shm={{name or "none"}}\\nline={{digest}}\\nbye\\n')
+while readRecord()[::2] != b'bye\\n':
+    pass
+'''
+
+
+class _Task:
+
+    def __init__(self):
+        self.pars = {}
+
+    def getName(self):
+        return 'fake'
+
+    def getTbflag(self):
+        return False
+
+    def getParam(self, name, native=0):
+        return f'value of {name}'
+
+    def setParam(self, name, value, check=1):
+        self.pars[name] = value
+
+
+@pytest.fixture
+def fakeTask(tmpdir):
+    executable = tmpdir / 'x_fake.e'
+    executable.write(_fakeTask.format(python=sys.executable, npars=50))
+    executable.chmod(0o755)
+    return str(executable)
+
+
+def test_replies_sent_once_per_turn(fakeTask, monkeypatch):
+    process = irafexecute.IrafProcess(fakeTask)
+    writes = []
+    write = process.process.write
+
+    def countingWrite(data, *args, **kw):
+        writes.append(len(data))
+        return write(data, *args, **kw)
+
+    monkeypatch.setattr(process.process, 'write', countingWrite)
+    process.initialize({'imtype': 'fits'})
+    assert writes == []
+    task = _Task()
+    process.run(task)
+    assert task.pars == {'ok': '50'}
+    # the environment, task name and then all 50 replies in one write each
+    assert len(writes) == 2
+    process.terminate()
+    assert len(writes) == 3
+    assert not process.isAlive()
+
+
+@pytest.mark.skipif(not os.path.isdir('/dev/shm') or
+                    irafexecute.shared_memory is None,
+                    reason='needs POSIX shared memory')
+@pytest.mark.parametrize('threshold', [irafexecute.shmThreshold, None])
+def test_shared_memory_transfers(tmpdir, monkeypatch, threshold):
+    monkeypatch.setattr(irafexecute, 'shmThreshold', threshold)
+    nchars = 60000
+    executable = tmpdir / 'x_fake.e'
+    executable.write(_shmTask.format(python=sys.executable, nchars=nchars))
+    executable.chmod(0o755)
+    process = irafexecute.IrafProcess(str(executable))
+    process.initialize({})
+    line = ('abcdefghij' * nchars)[:nchars]
+    stdout = io.StringIO()
+    task = _Task()
+    process.run(task, pstdin=io.StringIO(line), pstdout=stdout)
+    assert stdout.getvalue() == ('0123456789' * nchars)[:nchars - 1] + '\n'
+    assert task.pars['line'] == hashlib.md5(line.encode()).hexdigest()
+    name = task.pars['shm']
+    if threshold is None:
+        # the task was refused a segment and used the pipe
+        assert name == 'none' and process.shm is None
+    else:
+        assert name == '/' + process.shm.name
+        assert os.path.exists('/dev/shm' + name)
+    process.terminate()
+    assert process.shm is None
+    assert not os.path.exists('/dev/shm' + name)
+
+
+@pytest.mark.skipif(not os.path.isdir('/dev/shm') or
+                    irafexecute.shared_memory is None,
+                    reason='needs POSIX shared memory')
+def test_kill_releases_shared_memory(tmpdir):
+    # the segment is released even if the process is already gone
+    executable = tmpdir / 'x_fake.e'
+    executable.write(_shmTask.format(python=sys.executable, nchars=10))
+    executable.chmod(0o755)
+    process = irafexecute.IrafProcess(str(executable))
+    process.initialize({})
+    process.terminate()
+    assert not process.process.pid
+    process.shm = irafexecute.shared_memory.SharedMemory(create=True,
+                                                         size=1024)
+    name = process.shm.name
+    process.kill(verbose=0)
+    assert process.shm is None
+    assert not os.path.exists('/dev/shm/' + name)
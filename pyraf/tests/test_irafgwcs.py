@@ -0,0 +1,93 @@
+import math
+
+import numpy
+import pytest
+
+from pyraf import irafgwcs
+
+
+def _record(wx, wy, sx, sy, xt, yt, flag=irafgwcs.NEWFORMAT | irafgwcs.DEFINED):
+    return (tuple(numpy.float32(v) for v in wx + wy + sx + sy) +
+            tuple(numpy.int32(v) for v in (xt, yt, flag)))
+
+
+def _transform1d(gwcs, coord, dimension, wcsID):
+    """Scalar transform, as IrafGWcs.transform1d does it"""
+    wx1, wx2, wy1, wy2, sx1, sx2, sy1, sy2, xt, yt, flag = \
+        gwcs.wcs[wcsID-1]
+    if dimension == 'x':
+        w1, w2, s1, s2, type = wx1, wx2, sx1, sx2, xt
+    elif dimension == 'y':
+        w1, w2, s1, s2, type = wy1, wy2, sy1, sy2, yt
+    fract = (coord - s1) / (s2 - s1)
+    if type == irafgwcs.LINEAR:
+        val = (w2 - w1) * fract + w1
+    elif type == irafgwcs.LOG:
+        lw2, lw1 = math.log10(w2), math.log10(w1)
+        lval = (lw2 - lw1) * fract + lw1
+        val = numpy.power(10, lval)
+    else:
+        ew1, ew2 = irafgwcs.elog(w1), irafgwcs.elog(w2)
+        cs = (s2 - s1) / (ew2 - ew1)
+        c0 = s1 - cs * ew1
+        s10p = cs + c0
+        s10m = -cs + c0
+        if coord > s10p:
+            frac = (coord - s10p) / (s2 - s10p)
+            val = 10. * numpy.power(w2 / 10., frac)
+        elif coord >= s10m and coord <= s10p:
+            frac = (coord - s10m) / (s10p - s10m)
+            val = frac * 20 - 10.
+        else:
+            frac = -(coord - s10m) / (s10m - s1)
+            val = -10. * numpy.power(-w1 / 10., frac)
+    return val
+
+
+@pytest.fixture
+def gwcs():
+    undefined = _record((0, 1), (0, 1), (0, 1), (0, 1), irafgwcs.LINEAR,
+                        irafgwcs.LINEAR, irafgwcs.NEWFORMAT)
+    wcs = irafgwcs.IrafGWcs()
+    wcs.wcs = [undefined] * irafgwcs.WCS_SLOTS
+    wcs.wcs[0] = _record((-50, 300), (2, 7000), (0.1, 0.5), (0.1, 0.9),
+                         irafgwcs.LINEAR, irafgwcs.LOG)
+    wcs.wcs[1] = _record((-2000, 5000), (1, 1), (0.4, 0.9), (0.2, 0.6),
+                         irafgwcs.ELOG, irafgwcs.LINEAR)
+    wcs.wcs[2] = _record((1, 1), (-500, 40), (0.4, 0.9), (0.5, 0.9),
+                         irafgwcs.LINEAR, irafgwcs.ELOG)
+    return wcs
+
+
+def test_transform_arrays_match_scalars(gwcs):
+    rng = numpy.random.default_rng(0)
+    x = rng.uniform(-0.1, 1.1, 500)
+    y = rng.uniform(-0.1, 1.1, 500)
+    wx, wy, wnum = gwcs.getArray(x, y)
+    assert set(wnum) == {1, 2, 3}
+    assert [gwcs.get(float(a), float(b)) for a, b in zip(x, y)] == \
+        list(zip(wx, wy, wnum))
+    for wcsID in (1, 2, 3):
+        for dimension, coord in (('x', x), ('y', y)):
+            expected = [
+                _transform1d(gwcs, float(c), dimension, wcsID) for c in coord
+            ]
+            assert [gwcs.transform1d(float(c), dimension, wcsID)
+                    for c in coord] == expected
+            values = gwcs.transform1dArray(coord, dimension, wcsID)
+            assert values.tolist() == expected
+    wx, wy, wnum = gwcs.getArray(x[:5], y[:5], wcsID=0)
+    assert (wx == x[:5]).all() and (wy == y[:5]).all() and (wnum == 0).all()
+
+
+@pytest.mark.parametrize('size', [irafgwcs.WCSRCSZ_v215_32BIT,
+                                  irafgwcs.WCSRCSZ_v215_64BIT])
+def test_set_reads_packed_records(gwcs, size, monkeypatch):
+    monkeypatch.setattr(irafgwcs, '_WCS_RECORD_SIZE', size)
+    monkeypatch.setattr(irafgwcs, '_IRAF64BIT',
+                        size == irafgwcs.WCSRCSZ_v215_64BIT)
+    packed = numpy.frombuffer(gwcs.pack(), numpy.int16)
+    new = irafgwcs.IrafGWcs(numpy.concatenate([[len(packed)], packed]))
+    assert new.wcs == gwcs.wcs
+    assert type(new.wcs[0][0]) is numpy.float32
+    assert type(new.wcs[0][-1]) is numpy.int32
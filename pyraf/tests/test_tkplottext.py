@@ -0,0 +1,60 @@
+from collections import OrderedDict
+
+import numpy
+
+from pyraf import fontdata, textattrib, tkplottext
+
+
+class _Canvas:
+
+    def __init__(self):
+        self.lines = []
+
+    def winfo_width(self):
+        return 600
+
+    def winfo_height(self):
+        return 400
+
+    def create_line(self, coords, fill):
+        self.lines.append(coords)
+
+
+class _ColorManager:
+
+    def setDrawingColor(self, color):
+        return '#ffffff'
+
+
+class _Window:
+
+    def __init__(self):
+        self.textAttributes = textattrib.TextAttributes()
+        self.textAttributes.hFontSize = 8.
+        self.textAttributes.fontAspect = 1.
+        self.gwidget = _Canvas()
+        self.colorManager = _ColorManager()
+
+
+def test_soft_text_strokes(monkeypatch):
+    monkeypatch.setattr(tkplottext, '_stringCache', OrderedDict())
+    win = _Window()
+    tkplottext.softText(win, 0.5, 0.5, 'I I')
+    strokes = fontdata.font1[ord('I') - ord(' ')][0]
+    assert len(win.gwidget.lines) == 2 * len(strokes)
+    assert [len(line) for line in win.gwidget.lines] == \
+        2 * [2 * len(stroke) for stroke in strokes]
+    # the second I is drawn two character widths to the right
+    first = numpy.array(win.gwidget.lines[0])
+    second = numpy.array(win.gwidget.lines[len(strokes)])
+    assert (second[::2] - first[::2] == 16).all()
+    assert (second[1::2] == first[1::2]).all()
+    assert len(tkplottext._stringCache) == 1
+
+    # cached strokes are placed at the new position
+    lines = win.gwidget.lines
+    win.gwidget.lines = []
+    tkplottext.softText(win, 0.6, 0.5, 'I I')
+    assert len(tkplottext._stringCache) == 1
+    assert all((numpy.array(new) - old)[::2].tolist() == [60] * (len(new) // 2)
+               for new, old in zip(win.gwidget.lines, lines))
@@ -0,0 +1,69 @@
+import ctypes
+import ctypes.util
+import fcntl
+import os
+import pty
+import signal
+import struct
+import sys
+import termios
+
+import pytest
+
+from .. import wutil
+
+
+@pytest.fixture
+def tty(monkeypatch):
+    master, slave = pty.openpty()
+    stdout = os.fdopen(slave, 'w')
+    monkeypatch.setattr('sys.stdout', stdout)
+    monkeypatch.setattr(wutil, '_termSize', None)
+    calls = []
+    ioctl = fcntl.ioctl
+
+    def countingIoctl(fd, request, arg):
+        if request == termios.TIOCGWINSZ:
+            calls.append(fd)
+        return ioctl(fd, request, arg)
+
+    monkeypatch.setattr(wutil.fcntl, 'ioctl', countingIoctl)
+    yield slave, calls
+    stdout.close()
+    os.close(master)
+
+
+def _resize(fd, rows, cols):
+    fcntl.ioctl(fd, termios.TIOCSWINSZ, struct.pack('hhhh', rows, cols, 0, 0))
+
+
+def test_term_size_cached_until_invalidated(tty):
+    fd, calls = tty
+    _resize(fd, 30, 100)
+    assert wutil.getTermWindowSize() == (30, 100)
+    assert wutil.getTermWindowSize() == (30, 100)
+    assert len(calls) == 1
+    _resize(fd, 40, 120)
+    wutil.invalidateTermWindowSize()
+    assert wutil.getTermWindowSize() == (40, 120)
+    assert len(calls) == 2
+
+
+def _sigwinchAction():
+    """Return the C level SIGWINCH handler address"""
+    libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    # struct sigaction starts with the handler
+    action = ctypes.create_string_buffer(256)
+    assert libc.sigaction(signal.SIGWINCH, None, action) == 0
+    return action.raw[:ctypes.sizeof(ctypes.c_void_p)]
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'),
+                    reason='uses the Linux sigaction layout')
+def test_term_size_leaves_sigwinch_to_readline(tty):
+    pytest.importorskip('readline')
+    fd, calls = tty
+    # readline installs a C handler that Python does not know about
+    handler = _sigwinchAction()
+    assert wutil.getTermWindowSize()
+    assert _sigwinchAction() == handler
@@ -23,20 +23,108 @@ by a system-wide configuration state. See gkiopengl.py
 
 import numpy
 import math
+from collections import OrderedDict
 from .textattrib import (CHARPATH_LEFT, CHARPATH_RIGHT, CHARPATH_UP,
                         CHARPATH_DOWN, JUSTIFIED_CENTER, JUSTIFIED_RIGHT,
                         JUSTIFIED_LEFT, JUSTIFIED_NORMAL, JUSTIFIED_TOP,
                         JUSTIFIED_BOTTOM)
 
 
+# Strokes of recently drawn strings relative to the text position,
+# keyed by the string and the text attributes that determine their
+# shape, so that labels drawn again on each redraw are not transformed
+# again.  The rotated strokes of each character are kept for the most
+# recent combinations of font, size and rotation.
+stringCacheSize = 512
+_stringCache = OrderedDict()
+glyphCacheSize = 16
+_glyphCache = OrderedDict()
+
+
 def softText(win, x, y, textstr):
 
     # Generate text using software generated stroked fonts
     # except for the input x,y, all coordinates are in units of pixels
 
-    # get unit font size
     ta = win.textAttributes
     hsize, fontAspect = ta.getFontSize()
+    key = (textstr, hsize, fontAspect, ta.charSize, ta.charSpace,
+           ta.textPath, ta.charUp, ta.textHorizontalJust,
+           ta.textVerticalJust, id(ta.font))
+    strokes = _stringCache.get(key)
+    if strokes is None:
+        strokes = _textStrokes(ta, textstr, hsize, fontAspect)
+        _stringCache[key] = strokes
+        if len(_stringCache) > stringCacheSize:
+            _stringCache.popitem(last=False)
+    else:
+        _stringCache.move_to_end(key)
+    coords, ends = strokes
+
+    # Now start drawing!
+    gw = win.gwidget
+    xwin = float(gw.winfo_width())
+    ywin = float(gw.winfo_height())
+    color = win.colorManager.setDrawingColor(ta.textColor)
+    vertices = numpy.empty_like(coords)
+    vertices[:, 0] = coords[:, 0] + xwin * x
+    vertices[:, 1] = ywin - (coords[:, 1] + ywin * y)
+    flat = vertices.astype(numpy.int32).ravel().tolist()
+    start = 0
+    for end in ends:
+        gw.create_line(flat[start:end], fill=color)
+        start = end
+
+
+def _glyphs(font, size, fontAspect, charUp):
+    """Return dictionary for rotated character strokes
+
+    The dictionary is filled by _glyphStrokes.
+    """
+
+    key = (id(font), size, fontAspect, charUp)
+    glyphs = _glyphCache.get(key)
+    if glyphs is None:
+        glyphs = _glyphCache[key] = {}
+        if len(_glyphCache) > glyphCacheSize:
+            _glyphCache.popitem(last=False)
+    else:
+        _glyphCache.move_to_end(key)
+    return glyphs
+
+
+def _glyphStrokes(glyphs, font, char, size, vsize, fontAspect, cosrot,
+                  sinrot):
+    """Return (vertices, stroke lengths) for char rotated by charUp
+
+    The origin is the center of the character box.
+    """
+
+    strokes = glyphs.get(char)
+    if strokes is None:
+        charstrokes = font[ord(char) - ord(' ')]
+        if charstrokes[0]:
+            xf = size * numpy.concatenate(charstrokes[0]) / 27. - size / 2.
+            yf = (size * numpy.concatenate(charstrokes[1]) * fontAspect / 27.
+                  - vsize / 2.)
+        else:
+            xf = yf = numpy.zeros(0)
+        vertices = numpy.empty((len(xf), 2))
+        vertices[:, 0] = cosrot * xf - sinrot * yf
+        vertices[:, 1] = sinrot * xf + cosrot * yf
+        strokes = glyphs[char] = (vertices,
+                                  [len(stroke) for stroke in charstrokes[0]])
+    return strokes
+
+
+def _textStrokes(ta, textstr, hsize, fontAspect):
+    """Return strokes of textstr relative to the text position
+
+    Returns tuple (vertices, ends) where vertices is an (n, 2) array
+    of pixel offsets (y up) and ends lists the end index of the
+    coordinates of each stroke in the flattened vertex array.
+    """
+
     vsize = hsize * fontAspect
     # get current size in unit font units (!)
     fsize = ta.charSize
@@ -115,29 +203,27 @@ def softText(win, x, y, textstr):
     # is the center of the character box. This will be taken into account
     # when drawing the character.
 
-    # Now start drawing!
-    gw = win.gwidget
-    xwin = float(gw.winfo_width())
-    ywin = float(gw.winfo_height())
-    color = win.colorManager.setDrawingColor(ta.textColor)
-    options = {"fill": color}
     size = fsize * hsize
-    cosrot = numpy.cos((charUp - 90) * numpy.pi / 180)
-    sinrot = numpy.sin((charUp - 90) * numpy.pi / 180)
-    nchar = 0
-    # The main event!
-    for char in textstr:
-        # draw character with origin at bottom left corner of character box
-        charstrokes = ta.font[ord(char) - ord(' ')]
-        for i in range(len(charstrokes[0])):
-            vertex = numpy.zeros((len(charstrokes[0][i]), 2), numpy.float64)
-            xf = size * charstrokes[0][i] / 27. - fsize * hsize / 2.
-            yf = size * charstrokes[1][
-                i] * fontAspect / 27. - fsize * vsize / 2.
-            vertex[:, 0]= cosrot*(xf + nchar*dx) \
-                - sinrot*(yf + nchar*dy) + xNetOffset + xwin*x
-            vertex[:, 1] = ywin - (sinrot * (xf + nchar * dx) + cosrot *
-                                   (yf + nchar * dy) + yNetOffset + ywin * y)
-            gw.create_line(*(tuple(vertex.ravel().astype(numpy.int32))),
-                           **options)
-        nchar = nchar + 1
+    cosrot = math.cos((charUp - 90.) * deg2rad)
+    sinrot = math.sin((charUp - 90.) * deg2rad)
+    glyphs = _glyphs(ta.font, size, fontAspect, charUp)
+    parts = []
+    ends = []
+    nvertex = 0
+    for nchar, char in enumerate(textstr):
+        vertices, lengths = _glyphStrokes(glyphs, ta.font, char, size,
+                                          fsize * vsize, fontAspect, cosrot,
+                                          sinrot)
+        # move character box to its place in the string
+        xchar = nchar * dx
+        ychar = nchar * dy
+        parts.append(vertices + (cosrot * xchar - sinrot * ychar + xNetOffset,
+                                 sinrot * xchar + cosrot * ychar + yNetOffset))
+        for length in lengths:
+            nvertex += length
+            ends.append(2 * nvertex)
+    if parts:
+        vertices = numpy.concatenate(parts)
+    else:
+        vertices = numpy.zeros((0, 2))
+    return vertices, ends
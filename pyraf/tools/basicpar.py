@@ -5,6 +5,7 @@ $Id$
 """
 import re
 import sys
+import numpy
 from . import irafutils, minmatch
 from .irafglobals import INDEF, Verbose, yes, no, clFloat
 
@@ -767,13 +768,159 @@ class IrafPar:
         raise NotImplementedError("class IrafPar cannot be used directly")
 
 
+# -----------------------------------------------------
+# typed storage for array parameter values
+# -----------------------------------------------------
+
+# element states in _ParArray mask
+_VALID = 0
+_NONE = 1
+_INDEF = 2
+_OTHER = 3
+
+_INDEFType = type(INDEF)
+
+# convert a native element of the typed array back to the object
+# the parameter would hold for it
+_boxElement = {
+    'f': clFloat,
+    'i': int,
+    'b': lambda v: yes if v else no,
+    'O': lambda v: v,
+    }
+
+# test whether a value can go in the typed array of a given kind
+_storable = {
+    'f': lambda v: isinstance(v, float),
+    'i': lambda v: type(v) is int and -2**63 <= v < 2**63,
+    'b': lambda v: v is yes or v is no,
+    'O': lambda v: isinstance(v, str),
+    }
+
+# element types that numpy converts without surprises
+_plainNumberTypes = frozenset((int, float, clFloat))
+
+
+class _ParArray:
+
+    """Typed storage for the values of an array parameter
+
+    Values are kept in a numpy array of the parameter's native type,
+    together with a mask flagging the elements that are None, INDEF or
+    some other object (e.g. an indirection string) that does not fit
+    in the typed array.  Indexing and iteration return the same objects
+    a list of coerced values would hold, so this can be used wherever
+    the value list was used before.
+    """
+
+    def __init__(self, dtype, size):
+        self.data = numpy.zeros(size, dtype=dtype)
+        self.mask = numpy.full(size, _NONE, dtype=numpy.int8)
+        self.extra = {}
+        self._kind = self.data.dtype.kind
+
+    @classmethod
+    def fromArray(cls, dtype, data):
+        """Create from a numpy array of valid (already coerced) values"""
+        new = cls(dtype, len(data))
+        new.data[:] = data
+        new.mask[:] = _VALID
+        return new
+
+    def copy(self):
+        new = _ParArray(self.data.dtype, 0)
+        new.data = self.data.copy()
+        new.mask = self.mask.copy()
+        new.extra = self.extra.copy()
+        return new
+
+    def tolist(self):
+        box = _boxElement[self._kind]
+        values = list(map(box, self.data.tolist()))
+        for i in numpy.flatnonzero(self.mask).tolist():
+            values[i] = self._special(i)
+        return values
+
+    def format(self, validFormat, special):
+        """Return list of strings for the elements
+
+        validFormat is applied to the native value of the ordinary
+        elements, special to the None, INDEF and other values.
+        """
+        strings = list(map(validFormat, self.data.tolist()))
+        for i in numpy.flatnonzero(self.mask).tolist():
+            strings[i] = special(self._special(i))
+        return strings
+
+    def _special(self, i):
+        m = self.mask[i]
+        if m == _NONE:
+            return None
+        elif m == _INDEF:
+            return INDEF
+        return self.extra[i]
+
+    def __len__(self):
+        return len(self.mask)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.tolist()[index]
+        if self.mask[index] == _VALID:
+            return _boxElement[self._kind](self.data.item(index))
+        return self._special(range(len(self.mask))[index])
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            for i, v in zip(range(len(self.mask))[index], value):
+                self[i] = v
+            return
+        index = range(len(self.mask))[index]
+        self.extra.pop(index, None)
+        if value is None:
+            self.mask[index] = _NONE
+        elif isinstance(value, _INDEFType):
+            self.mask[index] = _INDEF
+        elif _storable[self._kind](value):
+            self.data[index] = value
+            self.mask[index] = _VALID
+        else:
+            self.extra[index] = value
+            self.mask[index] = _OTHER
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __eq__(self, other):
+        try:
+            return self.tolist() == list(other)
+        except TypeError:
+            return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+
 # -----------------------------------------------------
 # IRAF array parameter base class
 # -----------------------------------------------------
 
 class IrafArrayPar(IrafPar):
 
-    """IRAF array parameter class"""
+    """IRAF array parameter class
+
+    Values are stored in a _ParArray of the type given by _dtype.
+    """
+
+    _dtype = object
+
+    # format function for the native values in the typed array
+    _validFormat = str
 
     def __init__(self,fields,strict=0):
         orig_len = len(fields)
@@ -809,7 +956,7 @@ class IrafArrayPar(IrafPar):
             raise SyntaxError("Too many values for array" +
                     " for parameter " + self.name)
         #
-        self.value = [None]*array_size
+        self.value = _ParArray(self._dtype, array_size)
         self.value = self._coerceValue(fields[nvstart:],strict)
         if fields[nvstart-3] is not None and '|' in fields[nvstart-3]:
             self._setChoice(fields[nvstart-3].strip(),strict)
@@ -903,8 +1050,8 @@ class IrafArrayPar(IrafPar):
             sprompt = sprompt.replace(r'\012', '\n')
             sprompt = sprompt.replace(r'\n', '\n')
             fields[nvstart-1] = sprompt
-        for i in range(len(self.value)):
-            fields[nvstart+i] = self.toString(self.value[i],quoted=quoted)
+        fields[nvstart:] = self._formatValues(
+            lambda v: self.toString(v, quoted=quoted), quoted=quoted)
         # insert an escaped line break before value fields
         if dolist:
             return fields
@@ -920,10 +1067,8 @@ class IrafArrayPar(IrafPar):
         dpar doesn't even work for arrays in the CL, so we just use
         Python syntax here.
         """
-        sval = list(map(self.toString, self.value, len(self.value)*[1]))
-        for i in range(len(sval)):
-            if sval[i] == "":
-                sval[i] = "None"
+        sval = self._formatValues(lambda v: self.toString(v, 1) or "None",
+                                  quoted=1)
         s = "%s = [%s]" % (self.name, ', '.join(sval))
         return s
 
@@ -995,7 +1140,22 @@ class IrafArrayPar(IrafPar):
         right type.)
         """
         v = self._coerceValue(value,strict)
-        for i in range(len(v)):
+        if self.choice is not None:
+            for i in range(len(v)):
+                self.checkOneValue(v[i],strict=strict)
+            return v
+        # only elements outside the range or not held in the typed
+        # array need the full check, which raises the usual error
+        valid = v.mask == _VALID
+        data = v.data[valid]
+        bad = numpy.zeros(len(data), dtype=bool)
+        if self.min not in [None, INDEF]:
+            bad |= data < self.min
+        if self.max not in [None, INDEF]:
+            bad |= data > self.max
+        check = numpy.flatnonzero(valid)[bad].tolist()
+        check.extend(sorted(v.extra))
+        for i in sorted(check):
             self.checkOneValue(v[i],strict=strict)
         return v
 
@@ -1018,15 +1178,34 @@ class IrafArrayPar(IrafPar):
         # This differs from non-arrays in that it returns a
         # print string with just the values.  That's because
         # the object itself is returned as the native value.
-        sv = list(map(str, self.value))
-        for i in range(len(sv)):
-            if self.value[i] is None:
-                sv[i] = "INDEF"
+        sv = self._formatValues(lambda v: "INDEF" if v is None else str(v))
         return ' '.join(sv)
 
     def __len__(self):
         return len(self.value)
 
+    def __setattr__(self,attr,value):
+        # keep typed storage when a plain list is assigned to value
+        if attr == 'value' and isinstance(value, list):
+            v = _ParArray(self._dtype, len(value))
+            v[:] = value
+            value = v
+        IrafPar.__setattr__(self, attr, value)
+
+    def __deepcopy__(self, memo):
+        """Deep copy of this parameter object"""
+        new = IrafPar.__deepcopy__(self, memo)
+        if self.value is not None:
+            new.value = self.value.copy()
+        return new
+
+    def __setstate__(self, state):
+        """Restore state info from pickle"""
+        IrafPar.__setstate__(self, state)
+        # values pickled before typed storage was used are lists
+        if isinstance(self.value, list):
+            self.value = self.value
+
     #--------------------------------------------
     # private methods
     #--------------------------------------------
@@ -1066,7 +1245,16 @@ class IrafArrayPar(IrafPar):
                 value = value.split()
             if len(value) != len(self.value):
                 raise IndexError
-            v = len(self.value)*[0]
+            if isinstance(value, _ParArray) and \
+                    value.data.dtype == self.value.data.dtype:
+                v = value.copy()
+                for i, item in list(v.extra.items()):
+                    v[i] = self._coerceOneValue(item,strict)
+                return v
+            data = self._fastArray(value)
+            if data is not None:
+                return _ParArray.fromArray(self._dtype, data)
+            v = _ParArray(self._dtype, len(value))
             for i in range(len(v)):
                 v[i] = self._coerceOneValue(value[i],strict)
             return v
@@ -1074,6 +1262,35 @@ class IrafArrayPar(IrafPar):
             raise ValueError("Value must be a " + repr(len(self.value)) +
                     "-element array for " + self.name)
 
+    def _fastArray(self, value):
+        """Return numeric value as array of the storage type
+
+        Returns None if the value has to be coerced element by element.
+        """
+        if isinstance(value, numpy.ndarray):
+            if value.ndim != 1:
+                return None
+        elif isinstance(value, (list, tuple)) and \
+                _plainNumberTypes.issuperset(map(type, value)):
+            value = numpy.array(value)
+        else:
+            return None
+        return self._convertArray(value)
+
+    def _convertArray(self, a):
+        """Convert numpy array a to the storage type, or return None"""
+        return None
+
+    def _formatValues(self, special, quoted=0):
+        """Return list of strings for the values
+
+        Values held in the typed array are formatted with _validFormat
+        (repr for quoted strings), others are passed to special.
+        """
+        if quoted and self._dtype is object:
+            return self.value.format(repr, special)
+        return self.value.format(self._validFormat, special)
+
     def isLegal(self):
         """Dont call checkValue for arrays"""
         try:
@@ -1292,7 +1509,19 @@ class IrafParB(_BooleanMixin,IrafPar):
 class IrafParAB(_BooleanMixin,IrafArrayPar):
 
     """IRAF boolean array parameter class"""
-    pass
+
+    _dtype = bool
+
+    @staticmethod
+    def _validFormat(v):
+        return "yes" if v else "no"
+
+    def _convertArray(self, a):
+        if a.dtype.kind == 'b':
+            return a
+        elif a.dtype.kind in 'iuf' and numpy.isin(a, (0, 1)).all():
+            return a.astype(bool)
+        return None
 
 # -----------------------------------------------------
 # IRAF integer parameter mixin class
@@ -1377,7 +1606,17 @@ class IrafParI(_IntMixin,IrafPar):
 class IrafParAI(_IntMixin,IrafArrayPar):
 
     """IRAF integer array parameter class"""
-    pass
+
+    _dtype = numpy.int64
+
+    def _convertArray(self, a):
+        if a.dtype.kind == 'i' or (a.dtype.kind == 'u' and a.itemsize < 8):
+            return a.astype(numpy.int64)
+        elif a.dtype.kind == 'f' and numpy.isfinite(a).all() and \
+                (len(a) == 0 or numpy.abs(a).max() < 2.0**63):
+            # truncates like int()
+            return a.astype(numpy.int64)
+        return None
 
 # -----------------------------------------------------
 # Strict integer parameter mixin class
@@ -1537,7 +1776,16 @@ class IrafParR(_RealMixin,IrafPar):
 class IrafParAR(_RealMixin,IrafArrayPar):
 
     """IRAF real array parameter class"""
-    pass
+
+    _dtype = numpy.float64
+
+    # same as str() for clFloat
+    _validFormat = '{:.12}'.format
+
+    def _convertArray(self, a):
+        if a.dtype.kind in 'iuf':
+            return a.astype(numpy.float64)
+        return None
 
 # -----------------------------------------------------
 # Strict real parameter mixin class
@@ -0,0 +1,81 @@
+import copy
+import pickle
+
+import numpy
+import pytest
+
+from ..basicpar import parFactory
+from ..irafglobals import INDEF, clFloat, yes, no
+
+
+def _real_array():
+    return parFactory(['x', 'ar', 'h', '1', '4', '1', '1.', '5.', '',
+                       '1', '2', 'INDEF', ''])
+
+
+def test_array_values_keep_types():
+    par = _real_array()
+    assert par.value == [1.0, 2.0, INDEF, None]
+    assert isinstance(par[0], clFloat)
+    assert str(par) == '1.0 2.0 INDEF INDEF'
+    assert par.save() == 'x,ar,h,1,4,1,\\\n1.0,5.0,,\\\n1.0,2.0,INDEF,'
+    assert par.dpar() == 'x = [1.0, 2.0, INDEF, None]'
+
+
+@pytest.mark.parametrize('value', [
+    [1, 2.5, 3, 4],
+    (1, 2.5, 3, 4),
+    numpy.array([1, 2.5, 3, 4]),
+    '1 2.5 3 4',
+])
+def test_array_set(value):
+    par = _real_array()
+    par.set(value)
+    assert par.value == [1.0, 2.5, 3.0, 4.0]
+    assert isinstance(par[1], clFloat)
+
+
+def test_array_range_check():
+    par = _real_array()
+    with pytest.raises(ValueError, match='greater than maximum'):
+        par.set(numpy.array([1., 2., 3., 9.]))
+    with pytest.raises(ValueError, match='less than minimum'):
+        par.set([1, 0, 3, 4])
+    with pytest.raises(ValueError, match='4-element array'):
+        par.set([1, 2])
+
+
+def test_array_index_and_indirection():
+    par = parFactory(['y', 'ai', 'h', '2', '2', '1', '3', '1', '', '', '',
+                      ')a.b', '1', '2', '3', '4', '5'])
+    assert par[0, 0] == ')a.b'
+    assert par[1, 2] == 5
+    par[1, 2] = '10x'
+    assert par.value == [')a.b', 1, 2, 3, 4, 16]
+    assert par.save(dolist=1)[-6:] == [')a.b', '1', '2', '3', '4', '16']
+
+
+def test_boolean_and_string_arrays():
+    par = parFactory(['z', 'ab', 'h', '1', '3', '1', '', '', '',
+                      'yes', 'no', ''])
+    assert par.value == [yes, no, None]
+    par.set(numpy.array([True, False, True]))
+    assert str(par) == 'yes no yes'
+    par = parFactory(['w', 'as', 'h', '1', '2', '1', '', '', '',
+                      'a b', ')x.y'])
+    assert par.save() == "w,as,h,1,2,1,\\\n,,,\\\n'a b',')x.y'"
+
+
+def test_array_copy_and_pickle():
+    par = _real_array()
+    new = copy.deepcopy(par)
+    new[0] = 3.0
+    assert par[0] == 1.0
+    new = pickle.loads(pickle.dumps(par))
+    assert new.value == par.value
+    # state pickled when values were held in a list
+    state = par.__getstate__().copy()
+    state['value'] = list(par.value)
+    new = par.__class__.__new__(par.__class__)
+    new.__setstate__(state)
+    assert str(new) == str(par)
@@ -198,27 +198,50 @@ def isViewable(WindowID):
         return 1
 
 
+# terminal size cache, keyed by the stdout file descriptor.  SIGWINCH
+# belongs to readline (which has to hear about resizes itself), so the
+# cache is reset by the command line before each prompt and by stty
+# resize instead.
+_termSize = None
+_termSizeFd = None
+
+
+def invalidateTermWindowSize():
+    """Discard the cached terminal size so it is read again on next use"""
+    global _termSize
+    _termSize = None
+
+
 def getTermWindowSize():
     """return a tuple containing the y,x (rows,cols) size of the terminal window
     in characters"""
 
+    global _termSize, _termSizeFd
     if magicConstant is None:
         raise Exception("platform isn't supported: " + sys.platform)
 
+    try:
+        fd = sys.stdout.fileno()
+    except OSError:
+        return (24, 80)
+    if _termSize is not None and fd == _termSizeFd:
+        return _termSize
+
     # define string to serve as memory area to receive copy of structure
     # created by IOCTL call
     tstruct = ' ' * 20  # that should be more than enough memory
     try:
-        rstruct = fcntl.ioctl(sys.stdout.fileno(), magicConstant, tstruct)
+        rstruct = fcntl.ioctl(fd, magicConstant, tstruct)
         ysize, xsize = struct.unpack('hh', rstruct[0:4])
         # handle bug in konsole (and maybe other bad cases)
         if ysize <= 0:
             ysize = 24
         if xsize <= 0:
             xsize = 80
-        return ysize, xsize
     except OSError:
         return (24, 80)  # assume generic size
+    _termSize, _termSizeFd = (ysize, xsize), fd
+    return ysize, xsize
 
 
 class FocusEntity:
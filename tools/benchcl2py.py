@@ -0,0 +1,82 @@
+#! /usr/bin/env python3
+"""benchcl2py.py: Time the CL to Python compiler on CL scripts
+
+Usage: benchcl2py.py [nlines] [file.cl ...]
+
+Compiles each file (default the CL scripts in pyraf/noiraf) and a
+synthetic procedure of about nlines lines (default 5000) with the
+code cache disabled, and reports the time spent scanning, parsing
+and in the AST passes that follow.
+"""
+
+
+import glob
+import os
+import sys
+import time
+
+from pyraf import cl2py, clparse, clscan
+
+
+def makeProcedure(nlines):
+    """Return CL source for a procedure with about nlines lines"""
+
+    lines = ['procedure bench (images, nloop)',
+             'string images {prompt="Input images"}',
+             'int nloop = 3 {min=1, max=100, prompt="Loop count"}',
+             'struct *list',
+             'begin',
+             '    int i, n',
+             '    real x',
+             '    string s1']
+    block = ['    for (i = 1; i <= nloop; i += 1) {',
+             '        x = (i + 0.5) * 2 ** n % 7',
+             '        if (x > 3 && i != 2)',
+             '            imstat (images, fields="mean", lower=x, upper=INDEF)',
+             '        else',
+             '            print ("value ", x, " skipped") | tee (> "log")',
+             '    }',
+             '    list = images',
+             '    while (fscan (list, s1) != EOF) {',
+             '        imcopy (s1, s1 // "_copy", verbose-)',
+             '        n += 1',
+             '    }']
+    while len(lines) < nlines:
+        lines.extend(block)
+    lines.append('end')
+    return '\n'.join(lines) + '\n'
+
+
+def bench(name, source, nloop=3):
+    t0 = time.perf_counter()
+    for i in range(nloop):
+        tokens = clscan.CLScanner().tokenize(source)
+    t1 = time.perf_counter()
+    parser = clparse.getParser()
+    for i in range(nloop):
+        parser.parse(list(tokens))
+    t2 = time.perf_counter()
+    for i in range(nloop):
+        cl2py.cl2py(string=source, usecache=False)
+    t3 = time.perf_counter()
+    scan = (t1 - t0) / nloop
+    parse = (t2 - t1) / nloop
+    total = (t3 - t2) / nloop
+    print(f"{name}: {source.count(chr(10))} lines")
+    print(f"  scan     {scan:8.4f} s")
+    print(f"  parse    {parse:8.4f} s")
+    print(f"  passes   {total - scan - parse:8.4f} s")
+    print(f"  total    {total:8.4f} s")
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    nlines = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    files = sys.argv[2:]
+    if not files:
+        noiraf = os.path.join(os.path.dirname(clparse.__file__), 'noiraf')
+        files = sorted(glob.glob(os.path.join(noiraf, '*.cl')))
+    for fname in files:
+        with open(fname) as fh:
+            bench(os.path.basename(fname), fh.read(), nloop=20)
+    bench("synthetic", makeProcedure(nlines))
@@ -0,0 +1,82 @@
+#! /usr/bin/env python3
+"""benchclparse.py: Time the CL parser on CL scripts
+
+Usage: benchclparse.py [nlines] [file.cl ...]
+
+Parses each file (default the CL scripts in pyraf/noiraf) and a
+synthetic procedure of about nlines lines (default 5000) with the
+LALR(1) parser and with the Earley parser it falls back to.
+"""
+
+
+import glob
+import os
+import sys
+import time
+
+from pyraf import clparse, clscan
+from pyraf.clast import AST
+
+
+def makeProcedure(nlines):
+    """Return CL source for a procedure with about nlines lines"""
+
+    lines = ['procedure bench (images, nloop)',
+             'string images {prompt="Input images"}',
+             'int nloop = 3 {min=1, max=100, prompt="Loop count"}',
+             'struct *list',
+             'begin',
+             '    int i, n',
+             '    real x']
+    block = ['    for (i = 1; i <= nloop; i += 1) {',
+             '        x = (i + 0.5) * 2 ** n % 7',
+             '        if (x > 3 && i != 2)',
+             '            imstat (images, fields="mean", lower=x, upper=INDEF)',
+             '        else',
+             '            print ("value ", x, " skipped") | tee (> "log")',
+             '    }',
+             '    list = images',
+             '    while (fscan (list, s1) != EOF) {',
+             '        imcopy (s1, s1 // "_copy", verbose-)',
+             '        n += 1',
+             '    }']
+    while len(lines) < nlines:
+        lines.extend(block)
+    lines.append('end')
+    return '\n'.join(lines) + '\n'
+
+
+def timeit(label, parse, tokens, nloop):
+    t0 = time.perf_counter()
+    for i in range(nloop):
+        parse(list(tokens))
+    dt = (time.perf_counter() - t0) / nloop
+    print(f"  {label:8s} {dt:8.4f} s")
+    return dt
+
+
+def bench(name, source, nloop=3):
+    tokens = clscan.CLScanner().tokenize(source)
+    print(f"{name}: {source.count(chr(10))} lines, {len(tokens)} tokens")
+    parser = clparse.CLParser(AST)
+    if parser.parseLALR(list(tokens)) is None:
+        print("  (falls back to Earley)")
+    lalr = timeit("lalr", parser.parse, tokens, nloop)
+    earley = timeit("earley", parser.parseEarley, tokens, nloop)
+    print(f"  speedup  {earley / lalr:8.1f}")
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    nlines = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    files = sys.argv[2:]
+    if not files:
+        noiraf = os.path.join(os.path.dirname(clparse.__file__), 'noiraf')
+        files = sorted(glob.glob(os.path.join(noiraf, '*.cl')))
+    t0 = time.perf_counter()
+    clparse.CLParser(AST).makeLALR()
+    print(f"table build {time.perf_counter() - t0:.3f} s")
+    for fname in files:
+        with open(fname) as fh:
+            bench(os.path.basename(fname), fh.read())
+    bench("synthetic", makeProcedure(nlines), nloop=1)
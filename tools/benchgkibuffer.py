@@ -0,0 +1,73 @@
+#! /usr/bin/env python3
+"""benchgkibuffer.py: Time gki.GkiBuffer on a long metacode stream
+
+Usage: benchgkibuffer.py [nwords [chunksize]]
+
+Appends nwords (default 10 million) words of polyline metacode to a
+GkiBuffer in messages of chunksize words (default 4096), the way
+the graphics kernels receive them from an IRAF task, in two ways:
+
+  stream   translate and reset after every message (hardcopy kernels)
+  page     keep everything, then split the page (interactive windows)
+"""
+
+
+import sys
+import time
+
+import numpy
+
+from pyraf import gki
+
+
+def makeStream(nwords, npoints=100):
+    """Return metacode array with nwords words of polylines"""
+
+    arglen = 3 + 1 + 2 * npoints
+    instruction = numpy.zeros(arglen, numpy.int16)
+    instruction[:4] = [gki.BOI, gki.GKI_POLYLINE, arglen, npoints]
+    instruction[4:] = numpy.arange(2 * npoints) % gki.GKI_MAX
+    return numpy.resize(instruction, nwords)
+
+
+def chunks(metacode, chunksize):
+    for i in range(0, len(metacode), chunksize):
+        yield metacode[i:i + chunksize]
+
+
+def stream(metacode, chunksize):
+    buffer = gki.GkiBuffer()
+    ninstructions = 0
+    for chunk in chunks(metacode, chunksize):
+        buffer.append(chunk)
+        opcode, arg = buffer.getNextCode()
+        while opcode is not None:
+            ninstructions = ninstructions + 1
+            opcode, arg = buffer.getNextCode()
+        buffer.reset()
+    return ninstructions
+
+
+def page(metacode, chunksize):
+    buffer = gki.GkiBuffer()
+    for chunk in chunks(metacode, chunksize):
+        buffer.append(chunk)
+    buffer.nextTranslate = len(buffer)
+    buffer.split()
+    return len(buffer)
+
+
+def timeit(label, func, *args):
+    t0 = time.perf_counter()
+    result = func(*args)
+    print(f"{label:8s} {time.perf_counter() - t0:8.3f} s  ({result})")
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    nwords = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+    chunksize = int(sys.argv[2]) if len(sys.argv) > 2 else 4096
+    metacode = makeStream(nwords)
+    print(f"{nwords} words in messages of {chunksize} words")
+    timeit("stream", stream, metacode, chunksize)
+    timeit("page", page, metacode, chunksize)